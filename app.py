@@ -1,13 +1,104 @@
-from flask import Flask, render_template
+import click
+from flask import Flask, g, has_request_context, render_template
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
 from config import Config
 from blueprints.admin import admin_bp
 from blueprints.public import public_bp
-from database.db_manager import init_db
+from database.db_manager import init_db, run_migrations
+from database.invalidation import start_listener
 from datetime import datetime
 import time
 import os
+# Configuration exposée aux templates : chaque valeur n'est lue qu'à sa première utilisation, puis gardée pour
+# le reste de la requête (les templates y accèdent dans leurs boucles) ; la lecture passe par le cache du process.
+class TemplateConfig:
+    UPLOAD_FOLDER = Config.UPLOAD_FOLDER
+    RAZA_TABLE_PATH = Config.RAZA_TABLE_PATH
+    def __init__(self):
+        self._values = {}
+    def _memoized(self, name, loader):
+        if name not in self._values:
+            self._values[name] = loader()
+        return self._values[name]
+    @property
+    def CLASSES(self):
+        return self._memoized('classes', Config.get_classes)
+    @property
+    def R1_QUALIFYING_CLASSES(self):
+        return self._memoized('r1_qualifying_classes', Config.get_r1_qualifying_classes)
+    @property
+    def GENDERS(self):
+        return self._memoized('genders', Config.get_genders)
+    @property
+    def RECORD_TYPES(self):
+        return self._memoized('record_types', Config.get_record_types)
+    @property
+    def RESULT_SPECIAL_VALUES(self):
+        return self._memoized('result_special_values', Config.get_result_special_values)
+    @property
+    def FIELD_EVENTS(self):
+        return self._memoized('field_events', Config.get_field_events)
+    @property
+    def TRACK_EVENTS(self):
+        return self._memoized('track_events', Config.get_track_events)
+    @property
+    def WIND_AFFECTED_FIELD_EVENTS(self):
+        return self._memoized('wind_affected_field_events', Config.get_wind_affected_field_events)
+    @property
+    def WEIGHT_FIELD_EVENTS(self):
+        return self._memoized('weight_field_events', Config.get_weight_field_events)
+    @property
+    def CURRENT_DAY(self):
+        return self._memoized('current_day', Config.get_current_day)
+    @property
+    def NPCS_COUNT(self):
+        return self._memoized('npcs_count', Config.get_npcs_count)
+    @property
+    def ATHLETES_COUNT(self):
+        return self._memoized('athletes_count', Config.get_athletes_count)
+    @property
+    def VOLUNTEERS_COUNT(self):
+        return self._memoized('volunteers_count', Config.get_volunteers_count)
+    @property
+    def LOC_COUNT(self):
+        return self._memoized('loc_count', Config.get_loc_count)
+    @property
+    def OFFICIALS_COUNT(self):
+        return self._memoized('officials_count', Config.get_officials_count)
+    def get_classes(self):
+        return self.CLASSES
+    def get_genders(self):
+        return self.GENDERS
+    def get_record_types(self):
+        return self.RECORD_TYPES
+    def get_result_special_values(self):
+        return self.RESULT_SPECIAL_VALUES
+    def get_field_events(self):
+        return self.FIELD_EVENTS
+    def get_track_events(self):
+        return self.TRACK_EVENTS
+    def get_wind_affected_field_events(self):
+        return self.WIND_AFFECTED_FIELD_EVENTS
+    def get_weight_field_events(self):
+        return self.WEIGHT_FIELD_EVENTS
+    def format_time(self, time_value, for_public=False):
+        return Config.format_time(time_value, for_public, special_values=self.RESULT_SPECIAL_VALUES)
+    def format_distance(self, distance_value):
+        return Config.format_distance(distance_value, special_values=self.RESULT_SPECIAL_VALUES)
+    def format_wind(self, wind_value):
+        return Config.format_wind(wind_value)
+    def format_weight(self, weight_value):
+        return Config.format_weight(weight_value)
+    def format_gender_for_display(self, gender):
+        return Config.format_gender_for_display(gender)
+def get_template_config():
+    if not has_request_context():
+        return TemplateConfig()
+    template_config = g.get('_template_config')
+    if template_config is None:
+        template_config = g._template_config = TemplateConfig()
+    return template_config
 def create_app():
     app = Flask(__name__,
                 static_folder='static',
@@ -33,88 +124,48 @@ def create_app():
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(public_bp)
     csrf.exempt(public_bp)
+    # Démarré à la première requête de chaque worker (le thread ne survit pas au fork de gunicorn --preload)
+    @app.before_request
+    def ensure_invalidation_listener():
+        start_listener()
     @app.context_processor
     def inject_template_vars():
         from flask_wtf.csrf import generate_csrf
         from utils.helpers import get_pending_records_count, get_pending_personal_bests_count
-        class TemplateConfig:
-            def __init__(self):
-                pass
-            @property
-            def CLASSES(self):
-                return Config.get_classes()
-            @property
-            def GENDERS(self):
-                return Config.get_genders()
-            @property
-            def RECORD_TYPES(self):
-                return Config.get_record_types()
-            @property
-            def RESULT_SPECIAL_VALUES(self):
-                return Config.get_result_special_values()
-            @property
-            def FIELD_EVENTS(self):
-                return Config.get_field_events()
-            @property
-            def TRACK_EVENTS(self):
-                return Config.get_track_events()
-            @property
-            def WIND_AFFECTED_FIELD_EVENTS(self):
-                return Config.get_wind_affected_field_events()
-            @property
-            def WEIGHT_FIELD_EVENTS(self):
-                return Config.get_weight_field_events()
-            @property
-            def CURRENT_DAY(self):
-                return Config.get_current_day()
-            @property
-            def NPCS_COUNT(self):
-                return Config.get_npcs_count()
-            @property
-            def ATHLETES_COUNT(self):
-                return Config.get_athletes_count()
-            @property
-            def VOLUNTEERS_COUNT(self):
-                return Config.get_volunteers_count()
-            @property
-            def LOC_COUNT(self):
-                return Config.get_loc_count()
-            @property
-            def OFFICIALS_COUNT(self):
-                return Config.get_officials_count()
-            def get_classes(self):
-                return Config.get_classes()
-            def get_genders(self):
-                return Config.get_genders()
-            def get_record_types(self):
-                return Config.get_record_types()
-            def get_result_special_values(self):
-                return Config.get_result_special_values()
-            def get_field_events(self):
-                return Config.get_field_events()
-            def get_track_events(self):
-                return Config.get_track_events()
-            def get_wind_affected_field_events(self):
-                return Config.get_wind_affected_field_events()
-            def get_weight_field_events(self):
-                return Config.get_weight_field_events()
-            def format_time(self, time_value):
-                return Config.format_time(time_value)
-            def format_distance(self, distance_value):
-                return Config.format_distance(distance_value)
-            def format_wind(self, wind_value):
-                return Config.format_wind(wind_value)
-            def format_weight(self, weight_value):
-                return Config.format_weight(weight_value)
-            UPLOAD_FOLDER = Config.UPLOAD_FOLDER
-            RAZA_TABLE_PATH = Config.RAZA_TABLE_PATH
         return {
-            'config': TemplateConfig(),
+            'config': get_template_config(),
             'current_date': datetime.now().strftime('%B %d, %Y'),
             'csrf_token': generate_csrf,
             'get_pending_records_count': get_pending_records_count,
             'get_pending_personal_bests_count': get_pending_personal_bests_count,
         }
+    @app.cli.command('migrate')
+    def migrate_command():
+        """Apply pending schema migrations (run on every deploy, before the app and the jobs worker start)"""
+        applied = run_migrations()
+        print(f"✓ {len(applied)} migration(s) applied")
+    @app.cli.command('export-static')
+    @click.option('--output', default=None, help='Output directory (default: STATIC_EXPORT_DIR)')
+    @click.option('--full', is_flag=True, help='Re-render every page, ignoring the previous manifest')
+    def export_static_command(output, full):
+        from utils.static_export import export_static_site
+        stats = export_static_site(app, output_dir=output, full=full)
+        print(f"✓ Static export: {stats['rendered']} rendered, {stats['unchanged']} unchanged, "
+              f"{stats['removed']} removed, {stats['failed']} failed")
+    @app.cli.command('generate-pdfs')
+    @click.option('--type', 'pdf_type', type=click.Choice(['startlists', 'results', 'both']), default='both')
+    @click.option('--workers', type=int, default=None, help='Rendering processes (default: PDF_WORKERS)')
+    def generate_pdfs_command(pdf_type, workers):
+        from utils.pdf_bulk import generate_pdfs
+        def report(done, total):
+            print(f"  {done}/{total} PDFs")
+        stats = generate_pdfs(pdf_type=pdf_type, workers=workers, on_progress=report)
+        print(f"✓ PDFs: {stats['generated']} generated, {stats['unchanged']} unchanged, {stats['failed']} failed")
+    @app.cli.command('jobs-worker')
+    @click.option('--once', is_flag=True, help='Exit once the queue is empty')
+    def jobs_worker_command(once):
+        from utils.jobs import run_worker
+        run_worker(app, once=once)
     @app.errorhandler(404)
     def not_found(error):
         return render_template('404.html'), 404
@@ -1,6 +1,6 @@
 def register_routes(bp):
     from . import auth_routes, dashboard, users, athletes, games
-    from . import results, startlists, records, config, registrations, medals, heat_groups
+    from . import results, startlists, records, config, registrations, medals, heat_groups, jobs
     auth_routes.register_routes(bp)
     dashboard.register_routes(bp)
     users.register_routes(bp)
@@ -13,3 +13,4 @@ def register_routes(bp):
     registrations.register_routes(bp)
     medals.register_routes(bp)
     heat_groups.register_heat_routes(bp)
+    jobs.register_routes(bp)
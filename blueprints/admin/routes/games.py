@@ -5,14 +5,16 @@ from flask import render_template, redirect, url_for, flash, request, jsonify, s
 from flask_login import current_user
 
 from config import Config
+from utils.pdf_bulk import merged_pdf_path, render_game_pdf
 from utils.pdf_generator import PDFGenerator
 from ..auth import admin_required, loc_required, technical_delegate_required
 from ..forms import GameForm, PDFUploadForm
-from database.models import Game, Result, Attempt, StartList
+from .jobs import enqueue_job
+from database.models import Game, Result, StartList
 from utils.helpers import save_uploaded_file
-from PyPDF2 import PdfMerger
 from werkzeug.utils import secure_filename
 from database.db_manager import execute_query
+from database.invalidation import GAME, publish
 import os
 
 def register_routes(bp):
@@ -215,13 +217,9 @@ def register_routes(bp):
                 return redirect(url_for('admin.games_list'))
 
             game['classes_list'] = [c.strip() for c in game['classes'].split(',') if c.strip()]
+            # Result.get_all charge déjà les tentatives des épreuves de terrain en une requête
             results = Result.get_all(game_id=game_id)
 
-            # Charger les tentatives pour les épreuves de terrain
-            if game['event'] in Config.get_field_events():
-                for result in results:
-                    result['attempts'] = Attempt.get_by_result(result['id'])
-
             # Check for heat group data
             heat_group = None
             combined_results = None
@@ -262,28 +260,14 @@ def register_routes(bp):
                 flash('Game not found', 'danger')
                 return redirect(url_for('admin.games_list'))
 
-            startlist = StartList.get_by_game(game_id)
-            if not startlist:
+            # Re-rendered only if the start list changed since the last generated PDF
+            filepath = render_game_pdf('startlists', game)
+            if not filepath:
                 flash('No start list found for this game', 'warning')
                 return redirect(url_for('admin.game_startlist', id=game_id))
 
-            # Generate PDF
-            pdf_generator = PDFGenerator()
-            pdf_buffer = pdf_generator.generate_startlist_pdf(game, startlist)
-
-            # Save to file
-            filename = f"startlist_game_{game_id}_{game['event'].replace(' ', '_')}.pdf"
-            filepath = os.path.join('static', 'generated_pdfs', 'startlists', filename)
-            os.makedirs(os.path.dirname(filepath), exist_ok=True)
-
-            with open(filepath, 'wb') as f:
-                f.write(pdf_buffer.getvalue())
-
-            # Update database
-            Game.update_generated_pdfs(game_id, startlist_pdf=filename)
-
             flash('Start list PDF generated successfully', 'success')
-            return send_file(filepath, as_attachment=True, download_name=filename)
+            return send_file(filepath, as_attachment=True, download_name=os.path.basename(filepath))
 
         except Exception as e:
             print(f"Error generating start list PDF: {e}")
@@ -300,28 +284,14 @@ def register_routes(bp):
                 flash('Game not found', 'danger')
                 return redirect(url_for('admin.games_list'))
 
-            results = Result.get_all(game_id=game_id)
-            if not results:
+            # Re-rendered only if the results changed since the last generated PDF
+            filepath = render_game_pdf('results', game)
+            if not filepath:
                 flash('No results found for this game', 'warning')
                 return redirect(url_for('admin.game_results', id=game_id))
 
-            # Generate PDF
-            pdf_generator = PDFGenerator()
-            pdf_buffer = pdf_generator.generate_results_pdf(game, results)
-
-            # Save to file
-            filename = f"results_game_{game_id}_{game['event'].replace(' ', '_')}.pdf"
-            filepath = os.path.join('static', 'generated_pdfs', 'results', filename)
-            os.makedirs(os.path.dirname(filepath), exist_ok=True)
-
-            with open(filepath, 'wb') as f:
-                f.write(pdf_buffer.getvalue())
-
-            # Update database
-            Game.update_generated_pdfs(game_id, results_pdf=filename)
-
             flash('Results PDF generated successfully', 'success')
-            return send_file(filepath, as_attachment=True, download_name=filename)
+            return send_file(filepath, as_attachment=True, download_name=os.path.basename(filepath))
 
         except Exception as e:
             print(f"Error generating results PDF: {e}")
@@ -410,55 +380,14 @@ def register_routes(bp):
 
             if pdf_type == 'startlist':
                 # Generate start list PDF
-                startlist = StartList.get_by_game(game_id)
-                if not startlist:
+                if not render_game_pdf('startlists', game):
                     return jsonify({'error': 'No start list found'}), 400
-
-                pdf_generator = PDFGenerator()
-                pdf_buffer = pdf_generator.generate_startlist_pdf(game, startlist)
-
-                filename = f"startlist_game_{game_id}_{game['event'].replace(' ', '_')}.pdf"
-                filepath = os.path.join('static', 'generated_pdfs', 'startlists', filename)
-                os.makedirs(os.path.dirname(filepath), exist_ok=True)
-
-                with open(filepath, 'wb') as f:
-                    f.write(pdf_buffer.getvalue())
-
-                Game.update_generated_pdfs(game_id, startlist_pdf=filename)
                 return jsonify({'success': True, 'message': 'Start list PDF generated and published'})
 
             elif pdf_type == 'results':
-                # Generate results PDF
-                results = Result.get_all(game_id=game_id)
-                if not results:
+                # Generate results PDF (heat data and combined results are loaded with the results)
+                if not render_game_pdf('results', game):
                     return jsonify({'error': 'No results found'}), 400
-
-                # Load attempts for field events
-                if game['event'] in Config.get_field_events():
-                    for result in results:
-                        result['attempts'] = Attempt.get_by_result(result['id'])
-
-                # Check for heat group data
-                heat_group = None
-                combined_results = None
-                if Game.is_heat_game(game):
-                    from database.models.heat_group import HeatGroup
-                    heat_group = HeatGroup.get_by_id(game['heat_group_id'])
-                    combined_results = HeatGroup.get_combined_results(game['heat_group_id'])
-                    for i, result in enumerate(combined_results):
-                        result['final_rank'] = i + 1
-
-                pdf_generator = PDFGenerator()
-                pdf_buffer = pdf_generator.generate_results_pdf(game, results, heat_group, combined_results)
-
-                filename = f"results_game_{game_id}_{game['event'].replace(' ', '_')}.pdf"
-                filepath = os.path.join('static', 'generated_pdfs', 'results', filename)
-                os.makedirs(os.path.dirname(filepath), exist_ok=True)
-
-                with open(filepath, 'wb') as f:
-                    f.write(pdf_buffer.getvalue())
-
-                Game.update_generated_pdfs(game_id, results_pdf=filename)
                 return jsonify({'success': True, 'message': 'Results PDF generated and published'})
 
             else:
@@ -515,116 +444,35 @@ def register_routes(bp):
     @bp.route('/bulk-generate-pdfs', methods=['POST'])
     @admin_required
     def bulk_generate_pdfs():
-        """Generate all missing PDFs"""
-        try:
-            pdf_type = request.json.get('type', 'both')  # 'startlists', 'results', or 'both'
-
-            games = Game.get_games_for_bulk_generation()
-            generated_count = 0
-
-            for game in games:
-                game_id = game['id']
-
-                if pdf_type in ['startlists', 'both']:
-                    startlist = StartList.get_by_game(game_id)
-                    if startlist:
-                        pdf_generator = PDFGenerator()
-                        pdf_buffer = pdf_generator.generate_startlist_pdf(game, startlist)
-
-                        filename = f"startlist_game_{game_id}_{game['event'].replace(' ', '_')}.pdf"
-                        filepath = os.path.join('static', 'generated_pdfs', 'startlists', filename)
-                        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        """Generate all missing PDFs in the background"""
+        pdf_type = request.json.get('type', 'both')  # 'startlists', 'results', or 'both'
+        if pdf_type not in ['startlists', 'results', 'both']:
+            return jsonify({'error': 'Invalid PDF type'}), 400
+        return enqueue_job('bulk_pdfs', type=pdf_type)
 
-                        with open(filepath, 'wb') as f:
-                            f.write(pdf_buffer.getvalue())
-
-                        Game.update_generated_pdfs(game_id, startlist_pdf=filename)
-                        generated_count += 1
-
-                if pdf_type in ['results', 'both']:
-                    results = Result.get_all(game_id=game_id)
-                    if results:
-                        pdf_generator = PDFGenerator()
-                        pdf_buffer = pdf_generator.generate_results_pdf(game, results)
-
-                        filename = f"results_game_{game_id}_{game['event'].replace(' ', '_')}.pdf"
-                        filepath = os.path.join('static', 'generated_pdfs', 'results', filename)
-                        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-
-                        with open(filepath, 'wb') as f:
-                            f.write(pdf_buffer.getvalue())
-
-                        Game.update_generated_pdfs(game_id, results_pdf=filename)
-                        generated_count += 1
-
-            return jsonify({
-                'success': True,
-                'message': f'{generated_count} PDFs generated successfully'
-            })
-
-        except Exception as e:
-            print(f"Error in bulk PDF generation: {e}")
-            return jsonify({'error': str(e)}), 500
+    @bp.route('/download-all-pdfs/<pdf_type>', methods=['POST'])
+    @admin_required
+    def merge_all_pdfs(pdf_type):
+        """Merge all PDFs of a type into one file in the background"""
+        if pdf_type not in ['startlists', 'results']:
+            return jsonify({'error': 'Invalid PDF type'}), 400
+        return enqueue_job('merge_pdfs', type=pdf_type)
 
     @bp.route('/download-all-pdfs/<pdf_type>')
     @admin_required
     def download_all_pdfs(pdf_type):
-        """Download all PDFs merged into one file"""
-        try:
-            if pdf_type not in ['startlists', 'results']:
-                flash('Invalid PDF type', 'danger')
-                return redirect(url_for('admin.games_list'))
-
-            games = Game.get_games_with_pdfs()
-            merger = PdfMerger()
-
-            pdf_files = []
-            for game in games:
-                # Check for manual PDF first, then generated
-                if pdf_type == 'startlists':
-                    filename = game.get('manual_startlist_pdf') or game.get('generated_startlist_pdf')
-                    if filename:
-                        if game.get('manual_startlist_pdf'):
-                            filepath = os.path.join('static', 'manual_pdfs', 'startlists', filename)
-                        else:
-                            filepath = os.path.join('static', 'generated_pdfs', 'startlists', filename)
-                else:  # results
-                    filename = game.get('manual_results_pdf') or game.get('generated_results_pdf')
-                    if filename:
-                        if game.get('manual_results_pdf'):
-                            filepath = os.path.join('static', 'manual_pdfs', 'results', filename)
-                        else:
-                            filepath = os.path.join('static', 'generated_pdfs', 'results', filename)
-
-                if filename and os.path.exists(filepath):
-                    pdf_files.append(filepath)
-
-            if not pdf_files:
-                flash(f'No {pdf_type} PDFs found', 'warning')
-                return redirect(url_for('admin.games_list'))
-
-            # Sort by game day and time
-            pdf_files.sort()
-
-            for pdf_file in pdf_files:
-                merger.append(pdf_file)
-
-            # Save merged file
-            merged_filename = f"all_{pdf_type}_tunis_gp_2025.pdf"
-            merged_filepath = os.path.join('static', 'merged_pdfs', merged_filename)
-            os.makedirs(os.path.dirname(merged_filepath), exist_ok=True)
-
-            with open(merged_filepath, 'wb') as f:
-                merger.write(f)
-            merger.close()
-
-            return send_file(merged_filepath, as_attachment=True, download_name=merged_filename)
+        """Download the last merged file"""
+        if pdf_type not in ['startlists', 'results']:
+            flash('Invalid PDF type', 'danger')
+            return redirect(url_for('admin.games_list'))
 
-        except Exception as e:
-            print(f"Error merging PDFs: {e}")
-            flash(f'Error merging PDFs: {str(e)}', 'danger')
+        merged_filepath = merged_pdf_path(pdf_type)
+        if not os.path.exists(merged_filepath):
+            flash(f'No merged {pdf_type} PDF yet, merge them first', 'warning')
             return redirect(url_for('admin.games_list'))
 
+        return send_file(merged_filepath, as_attachment=True, download_name=os.path.basename(merged_filepath))
+
     @bp.route('/games/<int:game_id>/add-to-startlist', methods=['POST'])
     @admin_required
     def add_athlete_to_startlist_from_results(game_id):
@@ -678,9 +526,10 @@ def register_routes(bp):
             # Clear database references
             execute_query("""
                 UPDATE games 
-                SET manual_startlist_pdf = NULL, generated_startlist_pdf = NULL 
+                SET manual_startlist_pdf = NULL, generated_startlist_pdf = NULL, generated_startlist_pdf_hash = NULL
                 WHERE id = %s
             """, (game_id,))
+            publish(GAME, game_id)
 
             return jsonify({
                 'success': True,
@@ -716,9 +565,10 @@ def register_routes(bp):
             # Clear database references
             execute_query("""
                 UPDATE games 
-                SET manual_results_pdf = NULL, generated_results_pdf = NULL 
+                SET manual_results_pdf = NULL, generated_results_pdf = NULL, generated_results_pdf_hash = NULL
                 WHERE id = %s
             """, (game_id,))
+            publish(GAME, game_id)
 
             return jsonify({
                 'success': True,
@@ -0,0 +1,53 @@
+from flask import jsonify, request, url_for
+from flask_login import current_user
+from database.models import Job
+from ..auth import admin_required
+
+
+def enqueue_job(kind, **params):
+    """Queue a background job and answer 202 with the URL to poll for its status"""
+    job_id = Job.enqueue(kind, params, current_user.id)
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('admin.job_status', job_id=job_id)
+    }), 202
+
+
+def job_payload(job):
+    payload = {
+        'id': job['id'],
+        'kind': job['kind'],
+        'params': job['params'],
+        'status': job['status'],
+        'progress_done': job['progress_done'],
+        'progress_total': job['progress_total'],
+        'message': job['message'],
+        'result': job['result'],
+        'error': job['error'],
+        'attempts': job['attempts'],
+        'created_by': job.get('created_by_username'),
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'status_url': url_for('admin.job_status', job_id=job['id'])
+    }
+    if job['kind'] == 'merge_pdfs' and job['status'] == 'succeeded':
+        payload['download_url'] = url_for('admin.download_all_pdfs', pdf_type=job['params'].get('type'))
+    return payload
+
+
+def register_routes(bp):
+    @bp.route('/jobs')
+    @admin_required
+    def jobs_list():
+        limit = min(request.args.get('limit', 50, type=int), 200)
+        return jsonify([job_payload(job) for job in Job.get_recent(limit)])
+
+    @bp.route('/jobs/<int:job_id>')
+    @admin_required
+    def job_status(job_id):
+        job = Job.get_by_id(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job_payload(job))
@@ -2,6 +2,7 @@ from flask import render_template, request, redirect, url_for, flash, jsonify
 from database.models import Medal, Result
 from database.models.npc import NPC
 from ..auth import admin_required
+from .jobs import enqueue_job
 
 
 def register_routes(bp):
@@ -15,12 +16,8 @@ def register_routes(bp):
     @bp.route('/medals/calculate', methods=['POST'])
     @admin_required
     def medals_calculate():
-        try:
-            Medal.calculate_from_results()
-            flash('Medals calculated successfully from official results', 'success')
-        except Exception as e:
-            flash(f'Error calculating medals: {str(e)}', 'danger')
-        return redirect(url_for('admin.medals_list'))
+        """Recalculate medals from official results in the background"""
+        return enqueue_job('calculate_medals')
 
     @bp.route('/medals/update', methods=['POST'])
     @admin_required
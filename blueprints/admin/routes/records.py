@@ -5,6 +5,9 @@ from ..forms import WorldRecordForm, PersonalBestForm
 from database.models import WorldRecord, PersonalBest, Athlete, Region, Game, Result
 from config import Config
 from datetime import date
+from utils.helpers import get_pending_counts
+from .jobs import enqueue_job
+from .results import get_matching_class
 
 
 def register_routes(bp):
@@ -20,7 +23,6 @@ def register_routes(bp):
     @bp.route('/records/add', methods=['GET', 'POST'])
     @technical_delegate_required
     def record_add():
-        from config import config
         form = WorldRecordForm()
 
         if form.validate_on_submit():
@@ -29,7 +31,7 @@ def register_routes(bp):
                 athlete = Athlete.get_by_sdms(form.sdms.data)
                 if not athlete:
                     flash('Athlete not found', 'danger')
-                    return render_template('admin/records/add.html', form=form, config=config)
+                    return render_template('admin/records/add.html', form=form)
 
             data = {
                 'sdms': form.sdms.data,
@@ -54,7 +56,7 @@ def register_routes(bp):
             except Exception as e:
                 flash(f'Error adding record: {str(e)}', 'danger')
 
-        return render_template('admin/records/add.html', form=form, config=config)
+        return render_template('admin/records/add.html', form=form)
 
     @bp.route('/records/<int:record_id>/approve', methods=['POST'])
     @technical_delegate_required
@@ -96,6 +98,11 @@ def register_routes(bp):
             flash(f'Error deleting pending records: {str(e)}', 'danger')
         return redirect(url_for('admin.records_list'))
 
+    @bp.route('/records/pending-counts')
+    @loc_required
+    def records_pending_counts():
+        return jsonify(get_pending_counts())
+
     @bp.route('/personal-bests')
     @loc_required
     def personal_bests_list():
@@ -207,53 +214,41 @@ def register_routes(bp):
     @bp.route('/games/<int:game_id>/check-records', methods=['POST'])
     @technical_delegate_required
     def check_game_records(game_id):
-        try:
-            game = Game.get_by_id(game_id)
-            if not game:
-                return jsonify({'error': 'Game not found'}), 404
-
-            results = Result.get_all(game_id=game_id)
-            if not results:
-                return jsonify({'error': 'No results found for this game'}), 400
-
-            # Process each result for records and personal bests
-            records_found = 0
-            pbs_found = 0
-
-            for result in results:
-                athlete = Athlete.get_by_sdms(result['athlete_sdms'])
-                if athlete:
-                    # Get the athlete's class that matches the game
-                    athlete_class = get_matching_class(athlete, game)
-                    if athlete_class:
-                        created_records, created_pbs = check_for_records_and_pbs(result, athlete, game,
-                                                                                          athlete_class)
-                        records_found += created_records
-                        pbs_found += created_pbs
-
-            message = f'Check completed: {records_found} records and {pbs_found} personal bests found'
-            return jsonify({'success': True, 'message': message})
-
-        except Exception as e:
-            print(f"Error checking records for game {game_id}: {e}")
-            return jsonify({'error': str(e)}), 500
-
-
-def get_matching_class(athlete, game):
-    """Get the athlete's class that matches the game classes"""
-    if not athlete or not athlete.get('class'):
-        return None
-
-    athlete_classes = [c.strip() for c in athlete['class'].split(',') if c.strip()]
-    game_classes = [c.strip() for c in game['classes'].split(',') if c.strip()]
-
-    # Return the first matching class
-    for athlete_class in athlete_classes:
-        if athlete_class in game_classes:
-            return athlete_class
-
-    # If no match, return the first athlete class (for backwards compatibility)
-    return athlete_classes[0] if athlete_classes else None
+        if not Game.get_by_id(game_id):
+            return jsonify({'error': 'Game not found'}), 404
+        return enqueue_job('check_records', game_id=game_id)
+
+
+def check_records_for_game(game_id, progress=None):
+    game = Game.get_by_id(game_id)
+    if not game:
+        raise ValueError('Game not found')
+
+    results = Result.get_all(game_id=game_id)
+    if not results:
+        raise ValueError('No results found for this game')
+
+    # Process each result for records and personal bests
+    records_found = 0
+    pbs_found = 0
+
+    for done, result in enumerate(results, 1):
+        athlete = Athlete.get_by_sdms(result['athlete_sdms'])
+        if athlete:
+            # Get the athlete's class that matches the game
+            athlete_class = get_matching_class(athlete, game)
+            if athlete_class:
+                created_records, created_pbs = check_for_records_and_pbs(result, athlete, game, athlete_class)
+                records_found += created_records
+                pbs_found += created_pbs
+        if progress:
+            progress(done, len(results))
+
+    return {
+        'records': records_found,
+        'personal_bests': pbs_found,
+        'message': f'Check completed: {records_found} records and {pbs_found} personal bests found'
+    }
 
 
 def check_for_records_and_pbs(result, athlete, game, athlete_class):
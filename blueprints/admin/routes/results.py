@@ -2,43 +2,43 @@ import traceback
 from datetime import datetime, date
 from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import current_user
-from utils.raza_calculation import calculate_raza, verify_combination
+from utils.raza_calculation import verify_combination
+from utils.raza_engine import RazaError, score, score_batch
 from ..auth import admin_required, technical_delegate_required
 from ..forms import ResultForm
+from .jobs import enqueue_job
 from database.models import Athlete, Game, StartList, Result, Attempt, WorldRecord, PersonalBest, HeatGroup
-from database.db_manager import execute_one, execute_query
+from database.db_manager import execute_one, execute_query, transaction
+from database.models.result import performance_of
+from database.invalidation import GAME, RESULTS, publish
 from config import Config, config
 import re
 
 
 def check_athlete_class_compatibility(athlete, game):
-    if not athlete or not athlete.get('class'):
+    if not athlete:
         return False, []
 
-    athlete_classes = [c.strip() for c in athlete['class'].split(',') if c.strip()]
-    game_classes = [c.strip() for c in game['classes'].split(',') if c.strip()]
+    classes = Athlete.get_classes_for_game(athlete['sdms'], game['id'])
+    has_compatible_class = any(c['compatible'] for c in classes)
 
-    compatible_classes = [ac for ac in athlete_classes if ac in game_classes]
-    has_compatible_class = len(compatible_classes) > 0
-
-    return has_compatible_class, athlete_classes
+    return has_compatible_class, [c['class_name'] for c in classes]
 
 
 def get_matching_class(athlete, game):
     """Get the athlete's class that matches the game classes"""
-    if not athlete or not athlete.get('class'):
+    if not athlete:
         return None
 
-    athlete_classes = [c.strip() for c in athlete['class'].split(',') if c.strip()]
-    game_classes = [c.strip() for c in game['classes'].split(',') if c.strip()]
+    classes = Athlete.get_classes_for_game(athlete['sdms'], game['id'])
 
     # Return the first matching class
-    for athlete_class in athlete_classes:
-        if athlete_class in game_classes:
-            return athlete_class
+    for athlete_class in classes:
+        if athlete_class['compatible']:
+            return athlete_class['class_name']
 
     # If no match, return the first athlete class (for backwards compatibility)
-    return athlete_classes[0] if athlete_classes else None
+    return classes[0]['class_name'] if classes else None
 
 
 def parse_time_to_seconds(time_str):
@@ -91,17 +91,16 @@ def calculate_and_store_raza(athlete, game, performance_value, specific_class=No
 
     if verify_combination(athlete['gender'], game['event'], athlete_class):
         try:
-            result = calculate_raza(
+            result = score(
                 gender=athlete['gender'],
                 event=game['event'],
                 athlete_class=athlete_class,
                 performance=float(performance_value)
             )
-            response, status = result if isinstance(result, tuple) else (result, 200)
-            if status == 200:
-                raza_data = response.get_json()
-                raza_score = int(raza_data.get('raza_score', 0))
-                raza_score_precise = float(raza_data.get('raza_score_precise', 0.0))
+            raza_score = result.raza_score
+            raza_score_precise = result.raza_score_precise
+        except RazaError:
+            pass
         except Exception as e:
             print(f"Error calculating RAZA: {e}")
 
@@ -258,6 +257,61 @@ def check_and_create_pb(athlete, event, athlete_class, performance_value, perfor
     return False
 
 
+def recalculate_game_raza(game_id):
+    game = Game.get_by_id(game_id)
+    if not game:
+        raise ValueError('Game not found')
+    results = execute_query("""
+        SELECT r.*, a.gender, a.class,
+               (SELECT ac.class_name
+                FROM athlete_classes ac
+                LEFT JOIN game_classes gc ON gc.class_name = ac.class_name AND gc.game_id = r.game_id
+                WHERE ac.sdms = a.sdms
+                ORDER BY gc.game_id IS NULL,
+                         array_position(string_to_array(replace(a.class, ' ', ''), ','), ac.class_name)
+                LIMIT 1) as matching_class
+        FROM results r
+        JOIN athletes a ON r.athlete_sdms = a.sdms
+        WHERE r.game_id = %s
+    """, (game_id,), fetch=True)
+    attempts_by_result = Attempt.get_by_results([result['id'] for result in results])
+    # Toutes les performances du game (résultats et essais) sont scorées en un seul appel vectorisé ;
+    # value_numeric donne les secondes des temps "mm:ss.xx" et exclut valeurs spéciales et saisies invalides
+    targets, genders, classes, performances = [], [], [], []
+    for result in results:
+        performance = performance_of(result)
+        if performance is None:
+            continue
+        # Même règle que get_matching_class, calculée dans la requête pour éviter un aller-retour par résultat
+        matching_class = result['matching_class'] or result['class']
+        entries = [('result', result['id'], performance)]
+        for attempt in attempts_by_result.get(result['id'], []):
+            if performance_of(attempt) is not None:
+                entries.append(('attempt', attempt['id'], performance_of(attempt)))
+        for kind, row_id, value in entries:
+            targets.append((kind, row_id))
+            genders.append(result['gender'])
+            classes.append(matching_class)
+            performances.append(value)
+    updated_count = 0
+    if targets:
+        scores, precise, _ = score_batch(genders, [game['event']] * len(targets), classes,
+                                          performances)
+        with transaction():
+            for (kind, row_id), raza_score, raza_score_precise in zip(targets, scores, precise):
+                if kind == 'result':
+                    Result.update(row_id, raza_score=int(raza_score),
+                                  raza_score_precise=float(raza_score_precise))
+                    updated_count += 1
+                else:
+                    execute_query("""
+                        UPDATE attempts 
+                        SET raza_score = %s, raza_score_precise = %s 
+                        WHERE id = %s
+                    """, (int(raza_score), float(raza_score_precise), row_id))
+    return {'updated': updated_count}
+
+
 def register_routes(bp):
     @bp.route('/games/<int:id>/results')
     @admin_required
@@ -318,7 +372,6 @@ def register_routes(bp):
                                results=results,
                                startlist=startlist,
                                form=form,
-                               config=config,
                                has_r1_qualifying=has_r1_qualifying,
                                heat_group=heat_group,
                                heat_siblings=heat_siblings,
@@ -605,19 +658,12 @@ def register_routes(bp):
                         """, (result_id, attempt_num))
 
                         if existing_attempt:
-                            execute_query("""
-                                UPDATE attempts 
-                                SET value = %s, wind_velocity = %s, height = %s, 
-                                    raza_score = %s, raza_score_precise = %s
-                                WHERE id = %s
-                            """, (
-                                attempt_data['value'],
-                                attempt_data.get('wind_velocity'),
-                                attempt_data.get('height'),
-                                attempt_data['raza_score'],
-                                attempt_data['raza_score_precise'],
-                                existing_attempt['id']
-                            ))
+                            Attempt.update(existing_attempt['id'],
+                                           value=attempt_data['value'],
+                                           wind_velocity=attempt_data.get('wind_velocity'),
+                                           height=attempt_data.get('height'),
+                                           raza_score=attempt_data['raza_score'],
+                                           raza_score_precise=attempt_data['raza_score_precise'])
                         else:
                             Attempt.create(
                                 result_id=result_id,
@@ -816,8 +862,9 @@ def register_routes(bp):
                 flash('Result not found', 'danger')
                 return redirect(url_for('admin.games_list'))
             game_id = result['game_id']
-            Attempt.delete_by_result(id)
-            Result.delete(id)
+            with transaction():
+                Attempt.delete_by_result(id)
+                Result.delete(id)
             flash('Result deleted successfully', 'success')
             return redirect(url_for('admin.game_results', id=game_id))
         except Exception as e:
@@ -900,51 +947,9 @@ def register_routes(bp):
     @bp.route('/games/<int:game_id>/recalculate-raza', methods=['POST'])
     @admin_required
     def recalculate_raza_scores(game_id):
-        try:
-            game = Game.get_by_id(game_id)
-            if not game:
-                return jsonify({'error': 'Game not found'}), 404
-            results = execute_query("""
-                SELECT r.*, a.gender, a.class
-                FROM results r
-                JOIN athletes a ON r.athlete_sdms = a.sdms
-                WHERE r.game_id = %s
-            """, (game_id,), fetch=True)
-            updated_count = 0
-            for result in results:
-                if result['value'] not in Config.get_result_special_values():
-                    try:
-                        performance = float(result['value'])
-                        athlete_data = {'gender': result['gender'], 'class': result['class']}
-                        matching_class = get_matching_class(athlete_data, game)
-                        raza_score, raza_score_precise = calculate_and_store_raza(athlete_data, game, performance,
-                                                                                  matching_class)
-                        Result.update(result['id'],
-                                      raza_score=raza_score,
-                                      raza_score_precise=raza_score_precise)
-                        updated_count += 1
-                        attempts = Attempt.get_by_result(result['id'])
-                        for attempt in attempts:
-                            if attempt['value'] and attempt['value'].upper() not in Config.get_result_special_values():
-                                try:
-                                    attempt_perf = float(attempt['value'])
-                                    attempt_raza, attempt_raza_precise = calculate_and_store_raza(athlete_data, game,
-                                                                                                  attempt_perf,
-                                                                                                  matching_class)
-                                    execute_query("""
-                                        UPDATE attempts 
-                                        SET raza_score = %s, raza_score_precise = %s 
-                                        WHERE id = %s
-                                    """, (attempt_raza, attempt_raza_precise, attempt['id']))
-                                except (ValueError, TypeError):
-                                    continue
-                    except (ValueError, TypeError):
-                        continue
-            return jsonify({'success': True, 'updated': updated_count})
-        except Exception as e:
-            print(f"Error recalculating RAZA scores: {e}")
-            traceback.print_exc()
-            return jsonify({'error': 'Server error occurred'}), 500
+        if not Game.get_by_id(game_id):
+            return jsonify({'error': 'Game not found'}), 404
+        return enqueue_job('recalculate_raza', game_id=game_id)
 
     @bp.route('/startlist/add-from-result', methods=['POST'])
     @admin_required
@@ -1054,6 +1059,7 @@ def register_routes(bp):
                     "UPDATE results SET final_order = NULL WHERE id = %s",
                     (result['id'],)
                 )
+            publish(RESULTS, game_id)
 
             # Message détaillé avec les performances
             message = f'{selected_count}/{total_athletes} athletes selected for final round.'
@@ -1265,13 +1271,11 @@ def register_routes(bp):
             # Get all results with at least 3 attempts
             results = execute_query("""
                 SELECT r.*, a.gender, a.class,
-                       (SELECT MAX(CAST(att.value AS FLOAT)) 
+                       (SELECT MAX(att.value_numeric)
                         FROM attempts att 
                         WHERE att.result_id = r.id 
                         AND att.attempt_number <= 3 
-                        AND att.value NOT IN %s
-                        AND att.value IS NOT NULL
-                        AND att.value != '') as best_of_three
+                        AND att.value_status = 'OK') as best_of_three
                 FROM results r
                 JOIN athletes a ON r.athlete_sdms = a.sdms
                 WHERE r.game_id = %s
@@ -1281,7 +1285,7 @@ def register_routes(bp):
                      AND att.value IS NOT NULL
                      AND att.value != '') >= 3
                 ORDER BY best_of_three DESC NULLS LAST
-            """, (tuple(Config.get_result_special_values()), game_id,), fetch=True)
+            """, (game_id,), fetch=True)
             if len(results) < 8:
                 # If fewer than 8 athletes, all advance
                 selected_count = len(results)
@@ -1304,6 +1308,7 @@ def register_routes(bp):
                     "UPDATE results SET final_order = NULL WHERE id = %s",
                     (result['id'],)
                 )
+            publish(RESULTS, game_id)
             message = f'{selected_count} athletes selected for final round.'
             if selected_count == 8:
                 message += f' Order: {finalists[0]["athlete_sdms"]} (1st to jump) to {finalists[-1]["athlete_sdms"]} (8th to jump)'
@@ -1336,6 +1341,7 @@ def register_routes(bp):
                         "UPDATE results SET rank = %s WHERE id = %s AND game_id = %s",
                         (new_rank, result_id, game_id)
                     )
+            publish(RESULTS, game_id)
             return jsonify({'success': True, 'message': 'Rankings updated successfully'})
         except Exception as e:
             print(f"Error updating manual ranking: {e}")
@@ -1421,30 +1427,29 @@ def time_string_to_seconds(time_str):
 def update_final_order_after_three_attempts(game_id):
     try:
         results_with_three_attempts = execute_query("""
-            SELECT r.id, r.athlete_sdms, r.value as best_performance
+            SELECT r.id, r.athlete_sdms, r.value_numeric as best_performance
             FROM results r
             WHERE r.game_id = %s 
-            AND r.value != 'NM'
+            AND r.value_status = 'OK'
             AND (
                 SELECT COUNT(*) 
                 FROM attempts a 
                 WHERE a.result_id = r.id 
                 AND a.attempt_number <= 3
             ) >= 3
+            ORDER BY r.value_numeric DESC
         """, (game_id,), fetch=True)
         if len(results_with_three_attempts) <= 8:
             return
-        sorted_results = sorted(results_with_three_attempts,
-                                key=lambda x: float(x['best_performance']) if x['best_performance'] != 'NM' else 0,
-                                reverse=True)
-        top_8 = sorted_results[:8]
-        final_order_results = sorted(top_8,
-                                     key=lambda x: float(x['best_performance']) if x['best_performance'] != 'NM' else 0)
-        for i, result in enumerate(final_order_results):
-            execute_query(
-                "UPDATE startlist SET final_order = %s WHERE game_id = %s AND athlete_sdms = %s",
-                (i + 1, game_id, result['athlete_sdms'])
-            )
+        top_8 = results_with_three_attempts[:8]
+        final_order_results = list(reversed(top_8))
+        with transaction():
+            for i, result in enumerate(final_order_results):
+                execute_query(
+                    "UPDATE startlist SET final_order = %s WHERE game_id = %s AND athlete_sdms = %s",
+                    (i + 1, game_id, result['athlete_sdms'])
+                )
+            publish(GAME, game_id)
     except Exception as e:
         print(f"Error updating final order: {e}")
 
@@ -3,6 +3,7 @@ from ..auth import admin_required
 from ..forms import StartListForm
 from database.models import Game, StartList, Athlete
 from database.db_manager import execute_query
+from database.invalidation import GAME, publish
 
 
 def register_routes(bp):
@@ -75,6 +76,7 @@ def register_routes(bp):
                 "UPDATE startlist SET lane_order = %s WHERE game_id = %s AND athlete_sdms = %s",
                 (new_order, game_id, athlete_sdms)
             )
+            publish(GAME, game_id)
             return jsonify({'success': True})
 
         except Exception as e:
@@ -1,5 +1,5 @@
 def register_routes(bp):
-    from . import home, results, startlists, athletes, records, raza, schedule, medals
+    from . import home, results, startlists, athletes, records, raza, schedule, medals, live
     home.register_routes(bp)
     results.register_routes(bp)
     startlists.register_routes(bp)
@@ -8,3 +8,4 @@ def register_routes(bp):
     raza.register_routes(bp)
     schedule.register_routes(bp)
     medals.register_routes(bp)
+    live.register_routes(bp)
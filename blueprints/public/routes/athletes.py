@@ -1,10 +1,12 @@
 from flask import render_template, request
 from database.models import Athlete
 from config import config
+from utils.response_cache import cached_page
 
 
 def register_routes(bp):
     @bp.route('/athletes')
+    @cached_page
     def athletes():
         search = request.args.get('search', '')
         gender_filter = request.args.get('gender', '')
@@ -32,8 +34,9 @@ def register_routes(bp):
                                genders=config.GENDERS)
 
     @bp.route('/athlete/<int:sdms>')
+    @cached_page
     def athlete_detail(sdms):
         athlete = Athlete.get_athlete_detail(sdms)
         if not athlete:
             return render_template('404.html'), 404
-        return render_template('public/athlete_detail.html', athlete=athlete, config=config)
\ No newline at end of file
+        return render_template('public/athlete_detail.html', athlete=athlete)
\ No newline at end of file
@@ -1,16 +1,22 @@
 from datetime import datetime
 from flask import render_template
 from database.models import Game
-from config import config
+from database.db_manager import get_pool_stats
+from database.invalidation import get_listener_stats
+from utils.live_updates import get_live_stats
+from utils.response_cache import cached_page, get_response_cache_stats
 
 def register_routes(bp):
     @bp.route('/')
+    @cached_page
     def index():
         games = Game.get_last_5()
-        return render_template('public/index.html', games=games, config=config)
+        return render_template('public/index.html', games=games)
     @bp.route('/health')
     def health_check():
-        return {'status': 'healthy', 'timestamp': datetime.now().isoformat()}
+        return {'status': 'healthy', 'timestamp': datetime.now().isoformat(), 'db_pool': get_pool_stats(),
+                'invalidation': get_listener_stats(), 'response_cache': get_response_cache_stats(),
+                'live': get_live_stats()}
     @bp.route('/bus')
     def bus():
-        return render_template('public/bus.html', config=config)
\ No newline at end of file
+        return render_template('public/bus.html')
\ No newline at end of file
@@ -0,0 +1,25 @@
+from flask import Response, jsonify
+from database.models import Game
+from utils.live_updates import GLOBAL, connect, stream
+
+
+def _event_stream(game_id):
+    client = connect(game_id)
+    if client is None:
+        return jsonify({'error': 'Too many live connections, please retry later'}), 503
+    return Response(stream(client, game_id), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+def register_routes(bp):
+    @bp.route('/game/<int:id>/stream')
+    def game_stream(id):
+        if not Game.get_by_id(id):
+            return jsonify({'error': 'Game not found'}), 404
+        return _event_stream(id)
+
+    @bp.route('/stream/results')
+    def results_stream():
+        return _event_stream(GLOBAL)
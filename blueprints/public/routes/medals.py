@@ -1,8 +1,10 @@
 from flask import render_template
 from database.models.medal import Medal
+from utils.response_cache import cached_page
 
 def register_routes(bp):
     @bp.route('/medals')
+    @cached_page
     def medals():
         medals = Medal.get_all()
         return render_template('public/medals.html', medals=medals)
\ No newline at end of file
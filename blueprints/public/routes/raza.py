@@ -1,10 +1,26 @@
-from flask import render_template, request, jsonify
+from flask import render_template, request, jsonify, Response, url_for
 from config import Config
-import pandas as pd
-import os
-import numpy as np
 import traceback
 from utils.raza_calculation import calculate_raza, calculate_performance
+from utils.raza_engine import score_batch, performance_batch, get_raza_table, get_raza_rows, get_raza_artifact
+RAZA_BATCH_MAX_ITEMS = 2000
+RAZA_TABLE_MAX_AGE = 300
+RAZA_TABLE_IMMUTABLE_MAX_AGE = 31536000
+def _raza_artifact_response(artifact, max_age, immutable=False):
+    etag = f'raza-{artifact["version"]}'
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(artifact['body'], mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if immutable:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.must_revalidate = True
+        response.headers['Link'] = f'<{url_for("public.get_raza_table_version", version=artifact["version"])}>; rel="canonical"'
+    return response
 def register_routes(bp):
     @bp.route('/raza')
     def raza():
@@ -12,25 +28,35 @@ def register_routes(bp):
     @bp.route('/api/raza-data')
     def get_raza_data():
         try:
-            if not os.path.exists(Config.RAZA_TABLE_PATH):
+            table = get_raza_table()
+            if table is None:
                 print(f"RAZA table not found at: {Config.RAZA_TABLE_PATH}")
                 return jsonify([])
-            df = pd.read_excel(Config.RAZA_TABLE_PATH)
-            data = df.to_dict('records')
-            for row in data:
-                for key, value in row.items():
-                    if pd.isna(value):
-                        row[key] = None
-                    elif isinstance(value, np.integer):
-                        row[key] = int(value)
-                    elif isinstance(value, np.floating):
-                        row[key] = float(value)
-            print(f"Successfully loaded {len(data)} RAZA table entries")
-            return jsonify(data)
+            etag = f'raza-data-{table["mtime"]}'
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = jsonify(get_raza_rows())
+            response.set_etag(etag)
+            response.cache_control.public = True
+            response.cache_control.max_age = RAZA_TABLE_MAX_AGE
+            return response
         except Exception as e:
             print(f"Error in get_raza_data: {str(e)}")
             traceback.print_exc()
             return jsonify([])
+    @bp.route('/api/raza-table')
+    def get_raza_table_latest():
+        artifact = get_raza_artifact()
+        if artifact is None:
+            return jsonify({'error': 'RAZA table not found'}), 404
+        return _raza_artifact_response(artifact, RAZA_TABLE_MAX_AGE)
+    @bp.route('/api/raza-table/<version>')
+    def get_raza_table_version(version):
+        artifact = get_raza_artifact()
+        if artifact is None or artifact['version'] != version:
+            return jsonify({'error': 'Unknown RAZA table version'}), 404
+        return _raza_artifact_response(artifact, RAZA_TABLE_IMMUTABLE_MAX_AGE, immutable=True)
     @bp.route('/api/calculate-raza', methods=['POST'])
     def calculate_raza_api():
         try:
@@ -56,6 +82,45 @@ def register_routes(bp):
             print(f"Error in calculate_raza_api: {str(e)}")
             traceback.print_exc()
             return jsonify({'error': f'Server error: {str(e)}'}), 500
+    @bp.route('/api/calculate-raza/batch', methods=['POST'])
+    def calculate_raza_batch_api():
+        try:
+            if not request.is_json:
+                return jsonify({'error': 'Invalid request format, expected JSON'}), 400
+            data = request.get_json()
+            items = data.get('items') if isinstance(data, dict) else None
+            if not isinstance(items, list) or not items:
+                return jsonify({'error': 'No items provided'}), 400
+            if len(items) > RAZA_BATCH_MAX_ITEMS:
+                return jsonify({'error': f'Too many items (max {RAZA_BATCH_MAX_ITEMS})'}), 400
+            inverse = data.get('mode') == 'performance'
+            value_key = 'raza_score' if inverse else 'performance'
+            genders, events, classes, values = [], [], [], []
+            for index, item in enumerate(items):
+                if not isinstance(item, dict) or not all([item.get('gender'), item.get('event'), item.get('class')]):
+                    return jsonify({'error': f'Item {index}: missing required fields (gender, event, class)'}), 400
+                try:
+                    values.append(float(item.get(value_key)))
+                except (ValueError, TypeError):
+                    return jsonify({'error': f'Item {index}: invalid {value_key} value - must be a number'}), 400
+                genders.append(item['gender'])
+                events.append(item['event'])
+                classes.append(item['class'])
+            if inverse:
+                performances, valid = performance_batch(genders, events, classes, values)
+                results = [{'performance': float(performance) if ok else None, 'valid': bool(ok)}
+                           for performance, ok in zip(performances, valid)]
+            else:
+                scores, precise, valid = score_batch(genders, events, classes, values)
+                results = [{'raza_score': int(score) if ok else None,
+                            'raza_score_precise': float(score_precise) if ok else None,
+                            'valid': bool(ok)}
+                           for score, score_precise, ok in zip(scores, precise, valid)]
+            return jsonify({'results': results})
+        except Exception as e:
+            print(f"Error in calculate_raza_batch_api: {str(e)}")
+            traceback.print_exc()
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
     @bp.route('/api/calculate-performance', methods=['POST'])
     def calculate_performance_api():
         try:
@@ -1,11 +1,12 @@
 from flask import render_template, request
 
-from config import config
 from database.models import WorldRecord, Region
+from utils.response_cache import cached_page
 
 
 def register_routes(bp):
     @bp.route('/records')
+    @cached_page
     def records():
         search = request.args.get('search', '')
 
@@ -42,6 +43,5 @@ def register_routes(bp):
             world_records=world_records,
             region_records=region_records,
             regions=regions,
-            search=search,
-            config=config
+            search=search
         )
\ No newline at end of file
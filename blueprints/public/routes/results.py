@@ -1,21 +1,24 @@
 from flask import render_template, request, send_file, abort
 import os
-from config import config
+from config import Config, config
 from database.models import Game, Result, StartList, HeatGroup
+from database.models.game import InvalidCursor
+from utils.response_cache import cached_page
+from utils.static_export import is_static_export
 
 
 def register_routes(bp):
     @bp.route('/results')
+    @cached_page
     def results():
         search = request.args.get('search', '')
-        games = Game.get_with_status()
-        if search:
-            games = [g for g in games if
-                     search.lower() in g['event'].lower() or
-                     search.lower() in g['genders'].lower() or
-                     search.lower() in g['classes'].lower() or
-                     str(g['day']) in search]
-        published_games = [g for g in games if g.get('published', False) and g['has_results']]
+        after = request.args.get('after', '')
+        try:
+            published_games, next_cursor = Game.get_page_with_status(
+                search=search, published_only=True, after=after,
+                limit=None if is_static_export() else Config.GAMES_PAGE_SIZE)
+        except InvalidCursor:
+            abort(400)
 
         # S'assurer que les champs PDF existent
         for game in published_games:
@@ -28,9 +31,11 @@ def register_routes(bp):
             if 'generated_results_pdf' not in game:
                 game['generated_results_pdf'] = None
 
-        return render_template('public/results.html', games=published_games, search=search, config=config)
+        return render_template('public/results.html', games=published_games, search=search,
+                               after=after, next_cursor=next_cursor)
 
     @bp.route('/game/<int:id>')
+    @cached_page
     def game_detail(id):
         game = Game.get_by_id(id)
         if not game:
@@ -85,7 +90,7 @@ def register_routes(bp):
                                all_startlists=all_startlists,
                                has_r1_qualifying=has_r1_qualifying,
                                finalists_count=finalists_count,
-                               config=config)
+                               live_updates=not is_static_export())
 
 
 
@@ -1,43 +1,42 @@
-from flask import render_template, request
+from flask import abort, render_template, request
 
-from config import config
+from config import Config
 from database.models import Game
+from database.models.game import InvalidCursor
+from utils.response_cache import cached_page
+from utils.static_export import is_static_export
 
 
 def register_routes(bp):
     @bp.route('/schedule')
+    @cached_page
     def schedule():
         day_filter = request.args.get('day', '')
         event_filter = request.args.get('event', '')
+        after = request.args.get('after', '')
 
-        games = Game.get_with_status()
-
-        if day_filter:
-            games = [g for g in games if str(g['day']) == day_filter]
-
-        if event_filter:
-            games = [g for g in games if event_filter.lower() in g['event'].lower()]
-
-        games.sort(key=lambda x: (x['day'], x['time']))
-
-        all_games = Game.get_with_status()
-        days = sorted(list(set([g['day'] for g in all_games])))
-        events = sorted(list(set([g['event'] for g in all_games])))
+        try:
+            games, next_cursor = Game.get_page_with_status(
+                day=day_filter, event=event_filter, after=after,
+                limit=None if is_static_export() else Config.GAMES_PAGE_SIZE)
+        except InvalidCursor:
+            abort(400)
+        facets = Game.get_facets()
 
         return render_template('public/schedule.html',
                                games=games,
-                               days=days,
-                               events=events,
+                               days=facets['days'],
+                               events=facets['events'],
                                day_filter=day_filter,
-                               config=config,
-                               event_filter=event_filter)
+                               event_filter=event_filter,
+                               after=after,
+                               next_cursor=next_cursor)
 
     @bp.route('/schedule/day/<int:day>')
+    @cached_page
     def schedule_day(day):
-        games = Game.get_with_status()
-        day_games = [g for g in games if g['day'] == day]
-        day_games.sort(key=lambda x: x['time'])
+        day_games, _ = Game.get_page_with_status(day=day)
 
         return render_template('public/schedule_day.html',
                                games=day_games,
-                               day=day)
\ No newline at end of file
+                               day=day)
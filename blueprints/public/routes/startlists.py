@@ -1,9 +1,10 @@
 from flask import render_template, request
 from database.models.game import Game
 from database.models import StartList
-from config import config
+from utils.response_cache import cached_page
 def register_routes(bp):
     @bp.route('/startlists')
+    @cached_page
     def startlists():
         search = request.args.get('search', '')
         games = Game.get_with_status()
@@ -13,8 +14,9 @@ def register_routes(bp):
                     search.lower() in g['gender'].lower() or
                     search.lower() in g['classes'].lower() or
                     str(g['day']) in search]
-        return render_template('public/startlists.html', games=games, search=search, config=config)
+        return render_template('public/startlists.html', games=games, search=search)
     @bp.route('/game/<int:id>/startlist')
+    @cached_page
     def game_startlist_detail(id):
         game = Game.get_by_id(id)
         if not game:
@@ -29,6 +31,5 @@ def register_routes(bp):
 
         return render_template('public/startlist_detail.html',
                                game=game,
-                               startlist=startlist,
-                               config=config)
+                               startlist=startlist)
 
@@ -1,4 +1,5 @@
 import os
+import re
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -16,12 +17,47 @@ class Config:
         DB_USER = 'root'
         DB_PASSWORD = 'root'
         DB_NAME = 'npc_tunisia_db'
+        DB_PORT = os.getenv('DATABASE_PORT', '5432')
+    DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', 10))
+    DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 1))
+    DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_PING_AFTER = float(os.getenv('DB_POOL_PING_AFTER', 30))
+    CONFIG_CACHE_CHECK_INTERVAL = float(os.getenv('CONFIG_CACHE_CHECK_INTERVAL', 2))
+    GAME_STATUS_CACHE_TTL = float(os.getenv('GAME_STATUS_CACHE_TTL', 5))
+    GAMES_PAGE_SIZE = int(os.getenv('GAMES_PAGE_SIZE', 100))
+    PENDING_COUNTS_CACHE_TTL = float(os.getenv('PENDING_COUNTS_CACHE_TTL', 30))
+    PDF_WORKERS = int(os.getenv('PDF_WORKERS', os.cpu_count() or 2))
+    PDF_WORKER_START_METHOD = os.getenv('PDF_WORKER_START_METHOD', 'forkserver')
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 1))
+    JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', 600))
+    JOB_HEARTBEAT_INTERVAL = float(os.getenv('JOB_HEARTBEAT_INTERVAL', 30))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 30))
+    RESPONSE_CACHE_MAX_AGE = int(os.getenv('RESPONSE_CACHE_MAX_AGE', 10))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 512))
+    DATA_VERSION_CHECK_INTERVAL = float(os.getenv('DATA_VERSION_CHECK_INTERVAL', 1))
+    STATIC_EXPORT_DIR = os.getenv('STATIC_EXPORT_DIR', 'static_export')
+    SSE_MAX_CLIENTS = int(os.getenv('SSE_MAX_CLIENTS', 48))
+    SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', 100))
+    SSE_KEEPALIVE_SECONDS = float(os.getenv('SSE_KEEPALIVE_SECONDS', 15))
+    SSE_STREAM_MAX_SECONDS = float(os.getenv('SSE_STREAM_MAX_SECONDS', 600))
+    SSE_RETRY_MS = int(os.getenv('SSE_RETRY_MS', 3000))
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'static/uploads')
     MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
     ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif'}
     ADMIN_USERNAME = os.getenv('ADMIN_USERNAME', 'admin')
     ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', 'admin2025')
     RAZA_TABLE_PATH = os.path.join('static', 'raza_table_tunis_gp_25.xlsx')
+    # Statut (enum performance_status) des valeurs non numériques de results.value / attempts.value
+    PERFORMANCE_STATUSES = {
+        'DNS': 'DNS', 'DNF': 'DNF', 'DQ': 'DQ', 'NM': 'NM', 'NH': 'NH',
+        'X': 'FOUL', '-': 'PASS', 'O': 'CLEARED', 'XO': 'CLEARED', 'XXO': 'CLEARED', 'XXX': 'FAILED'
+    }
+    # Mêmes règles que PERFORMANCE_STATUS_SQL (migration 003) : secondes, MM:SS ou HH:MM:SS, ou mètres,
+    # et strictement inférieur à PERFORMANCE_MAX (value_numeric est un NUMERIC(10, 4))
+    PERFORMANCE_PATTERN = re.compile(r'([0-9]+:){0,2}[0-9]+(\.[0-9]+)?')
+    PERFORMANCE_MAX = 1000000
 
     @staticmethod
     def get_classes():
@@ -160,8 +196,10 @@ class Config:
             return []
 
     @staticmethod
-    def format_time(time_value, for_public=False):
-        if not time_value or time_value in Config.get_result_special_values():
+    def format_time(time_value, for_public=False, special_values=None):
+        if special_values is None:
+            special_values = Config.get_result_special_values()
+        if not time_value or time_value in special_values:
             return time_value
         try:
             time_str = str(time_value)
@@ -181,8 +219,28 @@ class Config:
             return time_value
 
     @staticmethod
-    def format_distance(distance_value):
-        if not distance_value or str(distance_value) in Config.get_result_special_values():
+    def parse_performance(value):
+        # (secondes ou mètres, statut) ; les valeurs spéciales n'ont pas de valeur numérique
+        if value is None or str(value).strip() == '':
+            return None, None
+        text = str(value).strip().upper()
+        if text in Config.PERFORMANCE_STATUSES:
+            return None, Config.PERFORMANCE_STATUSES[text]
+        if not Config.PERFORMANCE_PATTERN.fullmatch(text):
+            return None, 'INVALID'
+        total = 0.0
+        for part in text.split(':'):
+            total = total * 60 + float(part)
+        total = round(total, 4)
+        if total >= Config.PERFORMANCE_MAX:
+            return None, 'INVALID'
+        return total, 'OK'
+
+    @staticmethod
+    def format_distance(distance_value, special_values=None):
+        if special_values is None:
+            special_values = Config.get_result_special_values()
+        if not distance_value or str(distance_value) in special_values:
             return distance_value
         try:
             return f"{float(distance_value):.2f}"
@@ -1,113 +1,88 @@
-from datetime import datetime, date
+import threading
+import time
+from datetime import date
 
-from database.db_manager import execute_one, execute_query
+from config import Config
+from database.db_manager import execute_one, execute_query, transaction
+from database.invalidation import CONFIG, publish, subscribe
+
+TAG_CONFIG_KEYS = ['classes', 'record_types', 'result_special_values', 'field_events', 'track_events',
+                   'wind_affected_field_events', 'weight_field_events', 'guide_classes']
 
 
 class ConfigManager:
     @staticmethod
     def get_config(key, default=None):
-        result = execute_one(
-            "SELECT setting_value, setting_type FROM competition_config WHERE setting_key = %s",
-            (key,)
-        )
-        if not result:
-            return default
-        value = result['setting_value']
-        setting_type = result['setting_type']
-        if setting_type == 'integer':
-            try:
-                return int(value)
-            except ValueError:
-                return default
-        elif setting_type == 'boolean':
-            return value.lower() in ('true', '1', 'yes', 'on')
-        else:
-            return value
+        return get_config_snapshot()['settings'].get(key, default)
 
     @staticmethod
     def set_config(key, value, setting_type='string', description=None, user_id=None):
         if setting_type in ['integer', 'boolean']:
             value = str(value)
-        existing = execute_one(
-            "SELECT id FROM competition_config WHERE setting_key = %s",
-            (key,)
-        )
-        if existing:
-            execute_query(
-                "UPDATE competition_config SET setting_value = %s, updated_by = %s, updated_at = CURRENT_TIMESTAMP WHERE setting_key = %s",
-                (value, user_id, key)
-            )
-        else:
-            execute_query(
-                "INSERT INTO competition_config (setting_key, setting_value, setting_type, description, updated_by) VALUES (%s, %s, %s, %s, %s)",
-                (key, value, setting_type, description, user_id)
+        with transaction():
+            existing = execute_one(
+                "SELECT id FROM competition_config WHERE setting_key = %s",
+                (key,)
             )
+            if existing:
+                execute_query(
+                    "UPDATE competition_config SET setting_value = %s, updated_by = %s, updated_at = CURRENT_TIMESTAMP WHERE setting_key = %s",
+                    (value, user_id, key)
+                )
+            else:
+                execute_query(
+                    "INSERT INTO competition_config (setting_key, setting_value, setting_type, description, updated_by) VALUES (%s, %s, %s, %s, %s)",
+                    (key, value, setting_type, description, user_id)
+                )
+            bump_config_version()
 
     @staticmethod
     def get_config_tags(key):
-        tags = execute_query(
-            "SELECT tag_value FROM config_tags WHERE config_key = %s ORDER BY tag_value",
-            (key,),
-            fetch=True
-        )
-        return [tag['tag_value'] for tag in tags] if tags else []
+        return list(get_config_snapshot()['tags'].get(key, ()))
 
     @staticmethod
     def add_config_tag(key, tag_value):
         try:
-            execute_query(
-                "INSERT INTO config_tags (config_key, tag_value) VALUES (%s, %s)",
-                (key, tag_value)
-            )
-            return True
+            with transaction():
+                execute_query(
+                    "INSERT INTO config_tags (config_key, tag_value) VALUES (%s, %s)",
+                    (key, tag_value)
+                )
+                bump_config_version()
         except:
             return False
+        return True
 
     @staticmethod
     def remove_config_tag(key, tag_value):
-        execute_query(
-            "DELETE FROM config_tags WHERE config_key = %s AND tag_value = %s",
-            (key, tag_value)
-        )
+        with transaction():
+            execute_query(
+                "DELETE FROM config_tags WHERE config_key = %s AND tag_value = %s",
+                (key, tag_value)
+            )
+            bump_config_version()
 
     @staticmethod
     def set_config_tags(key, tags):
-        execute_query(
-            "DELETE FROM config_tags WHERE config_key = %s",
-            (key,)
-        )
-        for tag in tags:
-            if tag.strip():
-                execute_query(
-                    "INSERT INTO config_tags (config_key, tag_value) VALUES (%s, %s)",
-                    (key, tag.strip())
-                )
+        with transaction():
+            execute_query(
+                "DELETE FROM config_tags WHERE config_key = %s",
+                (key,)
+            )
+            for tag in tags:
+                if tag.strip():
+                    execute_query(
+                        "INSERT INTO config_tags (config_key, tag_value) VALUES (%s, %s)",
+                        (key, tag.strip())
+                    )
+            bump_config_version()
 
     @staticmethod
     def get_all_config():
-        configs = execute_query(
-            "SELECT * FROM competition_config ORDER BY setting_key",
-            fetch=True
-        )
-        result = {}
-        for config in configs:
-            key = config['setting_key']
-            value = config['setting_value']
-            setting_type = config['setting_type']
-            if setting_type == 'integer':
-                try:
-                    result[key] = int(value)
-                except ValueError:
-                    result[key] = 0
-            elif setting_type == 'boolean':
-                result[key] = value.lower() in ('true', '1', 'yes', 'on')
-            else:
-                result[key] = value
-
-        tag_configs = ['classes', 'record_types', 'result_special_values', 'field_events', 'track_events',
-                       'wind_affected_field_events', 'weight_field_events', 'guide_classes']
-        for key in tag_configs:
-            result[key] = ConfigManager.get_config_tags(key)
+        snapshot = get_config_snapshot()
+        result = dict(snapshot['settings'])
+        for key in TAG_CONFIG_KEYS:
+            result[key] = list(snapshot['tags'].get(key, ()))
         return result
 
     @staticmethod
@@ -120,12 +95,9 @@ class ConfigManager:
     @staticmethod
     def get_current_competition_day():
         today = date.today()
-        day = execute_one(
-            "SELECT day_number FROM competition_days WHERE %s BETWEEN date_start AND COALESCE(date_end, date_start) AND is_active = true",
-            (today,)
-        )
-        if day:
-            return day['day_number']
+        for day in get_config_snapshot()['days']:
+            if day['is_active'] and day['date_start'] <= today <= (day['date_end'] or day['date_start']):
+                return day['day_number']
         return ConfigManager.get_config('current_day', 1)
 
     @staticmethod
@@ -134,23 +106,27 @@ class ConfigManager:
             "SELECT id FROM competition_days WHERE day_number = %s",
             (day_number,)
         )
-        if existing:
-            execute_query(
-                "UPDATE competition_days SET date_start = %s, date_end = %s, description = %s WHERE day_number = %s",
-                (date_start, date_end, description, day_number)
-            )
-        else:
-            execute_query(
-                "INSERT INTO competition_days (day_number, date_start, date_end, description) VALUES (%s, %s, %s, %s)",
-                (day_number, date_start, date_end, description)
-            )
+        with transaction():
+            if existing:
+                execute_query(
+                    "UPDATE competition_days SET date_start = %s, date_end = %s, description = %s WHERE day_number = %s",
+                    (date_start, date_end, description, day_number)
+                )
+            else:
+                execute_query(
+                    "INSERT INTO competition_days (day_number, date_start, date_end, description) VALUES (%s, %s, %s, %s)",
+                    (day_number, date_start, date_end, description)
+                )
+            bump_config_version()
 
     @staticmethod
     def delete_competition_day(day_number):
-        execute_query(
-            "DELETE FROM competition_days WHERE day_number = %s",
-            (day_number,)
-        )
+        with transaction():
+            execute_query(
+                "DELETE FROM competition_days WHERE day_number = %s",
+                (day_number,)
+            )
+            bump_config_version()
 
     @staticmethod
     def get_npcs():
@@ -233,20 +209,97 @@ class ConfigManager:
         )
 
 
-_config_cache = {}
-_cache_timestamp = None
+# Snapshot typé de la configuration (settings, tags, jours), partagé par tous les Config.get_*.
+# Chaque écriture incrémente config_version dans sa transaction ; les autres workers comparent
+# leur version à celle de la base au plus toutes les CONFIG_CACHE_CHECK_INTERVAL secondes.
+_config_snapshot = None
+_config_snapshot_lock = threading.Lock()
+
+
+def _coerce_setting(value, setting_type):
+    if setting_type == 'integer':
+        return int(value)
+    elif setting_type == 'boolean':
+        return value.lower() in ('true', '1', 'yes', 'on')
+    return value
+
+
+def get_config_version():
+    row = execute_one("SELECT version FROM config_version WHERE id = 1")
+    return row['version'] if row else 0
+
+
+# Le compteur reste la source de vérité (rattrape une notification perdue) ; la notification évince tout de suite
+def bump_config_version():
+    execute_query("UPDATE config_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1")
+    publish(CONFIG)
+
+
+def _load_config_snapshot():
+    version = get_config_version()
+    settings = {}
+    for row in execute_query("SELECT setting_key, setting_value, setting_type FROM competition_config", fetch=True):
+        try:
+            settings[row['setting_key']] = _coerce_setting(row['setting_value'], row['setting_type'])
+        except (ValueError, TypeError, AttributeError):
+            pass
+    tags = {}
+    for row in execute_query("SELECT config_key, tag_value FROM config_tags ORDER BY config_key, tag_value",
+                             fetch=True):
+        tags.setdefault(row['config_key'], []).append(row['tag_value'])
+    days = execute_query(
+        "SELECT day_number, date_start, date_end, is_active FROM competition_days ORDER BY day_number",
+        fetch=True
+    )
+    return {
+        'version': version,
+        'settings': settings,
+        'tags': {key: tuple(values) for key, values in tags.items()},
+        'days': days,
+        'checked_at': time.monotonic()
+    }
+
+
+def get_config_snapshot():
+    global _config_snapshot
+    if _pinned_snapshot is not None:
+        return _pinned_snapshot
+    snapshot = _config_snapshot
+    if snapshot is not None:
+        now = time.monotonic()
+        if now - snapshot['checked_at'] < Config.CONFIG_CACHE_CHECK_INTERVAL:
+            return snapshot
+        if get_config_version() == snapshot['version']:
+            snapshot['checked_at'] = now
+            return snapshot
+    with _config_snapshot_lock:
+        current = _config_snapshot
+        if current is None or current is snapshot:
+            current = _load_config_snapshot()
+            _config_snapshot = current
+        return current
+
+
+# Process de rendu sans accès à la base (pool PDF) : le snapshot transmis par le parent fait foi jusqu'à la fin du process
+_pinned_snapshot = None
+
+
+def pin_config_snapshot(snapshot):
+    global _pinned_snapshot
+    _pinned_snapshot = snapshot
+
+
+def invalidate_config_cache():
+    global _config_snapshot
+    _config_snapshot = None
+
+
+subscribe(CONFIG, lambda event: invalidate_config_cache())
 
 
-def get_cached_config(key, default=None, cache_duration=300):
-    global _config_cache, _cache_timestamp
-    now = datetime.now()
-    if _cache_timestamp is None or (now - _cache_timestamp).seconds > cache_duration:
-        _config_cache = ConfigManager.get_all_config()
-        _cache_timestamp = now
-    return _config_cache.get(key, default)
+def get_cached_config(key, default=None):
+    return ConfigManager.get_all_config().get(key, default)
 
 
 def clear_config_cache():
-    global _config_cache, _cache_timestamp
-    _config_cache = {}
-    _cache_timestamp = None
\ No newline at end of file
+    invalidate_config_cache()
@@ -1,28 +1,220 @@
+import atexit
+import os
+import threading
+import time
 import psycopg2
+from psycopg2 import pool as pg_pool
 from psycopg2.extras import RealDictCursor
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
 from config import Config
 from contextlib import contextmanager
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_pool_slots = None
+_last_used = {}
+_pool_stats = {
+    'checkouts': 0,
+    'checkins': 0,
+    'discarded': 0,
+    'reconnects': 0,
+    'health_checks': 0,
+    'timeouts': 0,
+}
+def _connection_kwargs():
+    return dict(
+        host=Config.DB_HOST,
+        port=Config.DB_PORT,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        database=Config.DB_NAME,
+        cursor_factory=RealDictCursor,
+        connect_timeout=Config.DB_CONNECT_TIMEOUT
+    )
+def get_pool():
+    global _pool, _pool_pid, _pool_slots, _last_used
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == pid:
+            return _pool
+        # Gunicorn forks workers after import: never reuse sockets inherited from the parent
+        _pool = pg_pool.ThreadedConnectionPool(
+            Config.DB_POOL_MIN,
+            Config.DB_POOL_MAX,
+            **_connection_kwargs()
+        )
+        _pool_pid = pid
+        _pool_slots = threading.BoundedSemaphore(Config.DB_POOL_MAX)
+        _last_used = {}
+        print(f"✓ Database pool created (pid {pid}, min {Config.DB_POOL_MIN}, max {Config.DB_POOL_MAX})")
+        return _pool
+def close_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            try:
+                _pool.closeall()
+            except psycopg2.Error:
+                pass
+        _pool = None
+        _pool_pid = None
+atexit.register(close_pool)
+def _is_healthy(connection):
+    if connection.closed:
+        return False
+    last_used = _last_used.get(id(connection))
+    if last_used is not None and time.monotonic() - last_used < Config.DB_POOL_PING_AFTER:
+        return True
+    _pool_stats['health_checks'] += 1
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        connection.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+def _checkout():
+    db_pool = get_pool()
+    if not _pool_slots.acquire(timeout=Config.DB_POOL_TIMEOUT):
+        _pool_stats['timeouts'] += 1
+        raise pg_pool.PoolError(f"No database connection available after {Config.DB_POOL_TIMEOUT}s")
+    try:
+        # Stale sockets (server restart, idle timeout...) are dropped until a healthy one comes out. After a
+        # restart every idle connection is dead: at most DB_POOL_MAX of them, then the pool opens a fresh one.
+        for _ in range(Config.DB_POOL_MAX + 1):
+            connection = db_pool.getconn()
+            if _is_healthy(connection):
+                break
+            _discard(db_pool, connection)
+            _pool_stats['reconnects'] += 1
+        else:
+            raise psycopg2.OperationalError("No healthy database connection available")
+    except Exception:
+        _pool_slots.release()
+        raise
+    _pool_stats['checkouts'] += 1
+    return db_pool, connection
+def _discard(db_pool, connection):
+    _pool_stats['discarded'] += 1
+    _last_used.pop(id(connection), None)
+    try:
+        db_pool.putconn(connection, close=True)
+    except pg_pool.PoolError:
+        pass
+def _checkin(db_pool, connection, broken=False):
+    try:
+        if db_pool is not _pool:
+            # Pool was recycled while the connection was out (fork or close_pool)
+            connection.close()
+            return
+        if not broken and not connection.closed:
+            try:
+                if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except psycopg2.Error:
+                broken = True
+        if broken or connection.closed:
+            _discard(db_pool, connection)
+        else:
+            _last_used[id(connection)] = time.monotonic()
+            db_pool.putconn(connection)
+            _pool_stats['checkins'] += 1
+    finally:
+        if db_pool is _pool:
+            _pool_slots.release()
+def get_pool_stats():
+    stats = dict(_pool_stats)
+    stats['pid'] = os.getpid()
+    stats['minconn'] = Config.DB_POOL_MIN
+    stats['maxconn'] = Config.DB_POOL_MAX
+    if _pool is not None and _pool_pid == os.getpid():
+        stats['in_use'] = len(_pool._used)
+        stats['idle'] = len(_pool._pool)
+    else:
+        stats['in_use'] = 0
+        stats['idle'] = 0
+    return stats
 @contextmanager
 def get_db_connection():
+    db_pool = None
     connection = None
+    broken = False
     try:
-        connection = psycopg2.connect(
-            host=Config.DB_HOST,
-            port=Config.DB_PORT,
-            user=Config.DB_USER,
-            password=Config.DB_PASSWORD,
-            database=Config.DB_NAME,
-            cursor_factory=RealDictCursor
-        )
+        db_pool, connection = _checkout()
         yield connection
     except psycopg2.Error as e:
         print(f"Database connection error: {e}")
-        if connection:
+        broken = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+        if connection and not connection.closed and not broken:
             connection.rollback()
         raise
     finally:
         if connection:
-            connection.close()
+            _checkin(db_pool, connection, broken)
+_unit_of_work = threading.local()
+def in_transaction():
+    return getattr(_unit_of_work, 'connection', None) is not None
+@contextmanager
+def transaction():
+    connection = getattr(_unit_of_work, 'connection', None)
+    if connection is not None:
+        # Nested unit of work: join the outer one behind a savepoint
+        _unit_of_work.depth += 1
+        savepoint = f"uow_{_unit_of_work.depth}"
+        pending_callbacks = len(_unit_of_work.after_commit)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SAVEPOINT {savepoint}")
+        try:
+            yield connection
+        except Exception:
+            del _unit_of_work.after_commit[pending_callbacks:]
+            if not connection.closed:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+            raise
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute(f"RELEASE SAVEPOINT {savepoint}")
+        finally:
+            _unit_of_work.depth -= 1
+        return
+    with get_db_connection() as conn:
+        _unit_of_work.connection = conn
+        _unit_of_work.depth = 0
+        _unit_of_work.after_commit = []
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            _unit_of_work.connection = None
+            callbacks, _unit_of_work.after_commit = _unit_of_work.after_commit, []
+    _run_callbacks(callbacks)
+def on_commit(callback):
+    # Run after the current unit of work commits, or right away outside of one
+    if in_transaction():
+        _unit_of_work.after_commit.append(callback)
+    else:
+        _run_callbacks([callback])
+def _run_callbacks(callbacks):
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            print(f"✗ Error in on_commit callback: {e}")
+@contextmanager
+def _query_connection():
+    connection = getattr(_unit_of_work, 'connection', None)
+    if connection is not None:
+        yield connection, False
+    else:
+        with get_db_connection() as conn:
+            yield conn, True
 def clean_params(params):
     if not params:
         return params
@@ -37,18 +229,20 @@ def execute_query(query, params=None, fetch=False):
     try:
         if params:
             params = clean_params(params)
-        with get_db_connection() as conn:
+        with _query_connection() as (conn, autocommit):
             with conn.cursor() as cursor:
                 cursor.execute(query, params)
                 if query.strip().upper().startswith('INSERT') and 'RETURNING' in query.upper():
                     result = cursor.fetchone()
-                    conn.commit()
+                    if autocommit:
+                        conn.commit()
                     print(f"✓ INSERT with RETURNING executed, result: {result}")
                     return result
                 if fetch or query.strip().upper().startswith('SELECT'):
                     result = cursor.fetchall()
                     return result
-                conn.commit()
+                if autocommit:
+                    conn.commit()
                 print(f"✓ Query executed successfully, affected rows: {cursor.rowcount}")
                 return cursor.rowcount
     except psycopg2.Error as e:
@@ -65,7 +259,7 @@ def execute_one(query, params=None):
     try:
         if params:
             params = clean_params(params)
-        with get_db_connection() as conn:
+        with _query_connection() as (conn, autocommit):
             with conn.cursor() as cursor:
                 cursor.execute(query, params)
                 return cursor.fetchone()
@@ -311,11 +505,369 @@ def init_db():
                         raise
             conn.commit()
             print("✓ Database initialization completed successfully")
+        run_migrations()
         insert_default_config()
         insert_default_regions()
     except Exception as e:
         print(f"✗ Critical error during database initialization: {e}")
         raise
+# Backfill équivalent à Config.parse_performance, appliqué à la colonne value
+PERFORMANCE_TOTAL_SQL = """CASE
+    WHEN trim(value) ~ '^[0-9]+(\\.[0-9]+)?$' THEN round(trim(value)::numeric, 4)
+    WHEN trim(value) ~ '^[0-9]+:[0-9]+(\\.[0-9]+)?$'
+        THEN round(split_part(trim(value), ':', 1)::numeric * 60 + split_part(trim(value), ':', 2)::numeric, 4)
+    WHEN trim(value) ~ '^[0-9]+:[0-9]+:[0-9]+(\\.[0-9]+)?$'
+        THEN round(split_part(trim(value), ':', 1)::numeric * 3600 + split_part(trim(value), ':', 2)::numeric * 60
+                   + split_part(trim(value), ':', 3)::numeric, 4)
+END"""
+# Au-delà de NUMERIC(10, 4) la valeur est INVALID (comme Config.PERFORMANCE_MAX) plutôt que de faire échouer l'UPDATE
+PERFORMANCE_STATUS_SQL = f"""CASE
+    WHEN value IS NULL OR trim(value) = '' THEN NULL
+    WHEN upper(trim(value)) IN ('DNS', 'DNF', 'DQ', 'NM', 'NH') THEN upper(trim(value))::performance_status
+    WHEN upper(trim(value)) = 'X' THEN 'FOUL'::performance_status
+    WHEN trim(value) = '-' THEN 'PASS'::performance_status
+    WHEN upper(trim(value)) IN ('O', 'XO', 'XXO') THEN 'CLEARED'::performance_status
+    WHEN upper(trim(value)) = 'XXX' THEN 'FAILED'::performance_status
+    WHEN ({PERFORMANCE_TOTAL_SQL}) < 1000000 THEN 'OK'::performance_status
+    ELSE 'INVALID'::performance_status
+END"""
+PERFORMANCE_NUMERIC_SQL = f"CASE WHEN ({PERFORMANCE_TOTAL_SQL}) < 1000000 THEN {PERFORMANCE_TOTAL_SQL} END"
+# Tables dont le contenu est visible sur les pages publiques : chaque écriture incrémente data_version_seq
+DATA_VERSION_TABLES = ('regions', 'npcs', 'record_types', 'athletes', 'games', 'results', 'startlist', 'attempts',
+                       'world_records', 'personal_bests', 'competition_config', 'competition_days', 'config_tags',
+                       'medals', 'heat_groups')
+# Ordered schema changes applied on top of the CREATE TABLE statements in init_db.
+# Append new entries at the end; never edit or reorder a version once deployed.
+MIGRATIONS = [
+    ('001', 'Secondary indexes for hot read paths', [
+        "CREATE INDEX IF NOT EXISTS idx_results_game_id ON results (game_id)",
+        "CREATE INDEX IF NOT EXISTS idx_results_athlete_sdms ON results (athlete_sdms)",
+        "CREATE INDEX IF NOT EXISTS idx_startlist_game_id ON startlist (game_id)",
+        "CREATE INDEX IF NOT EXISTS idx_attempts_result_id ON attempts (result_id)",
+        """CREATE INDEX IF NOT EXISTS idx_world_records_lookup
+            ON world_records (event, athlete_class, gender, record_type, approved)""",
+        "CREATE INDEX IF NOT EXISTS idx_world_records_sdms_competition ON world_records (sdms, competition_id)",
+        "CREATE INDEX IF NOT EXISTS idx_personal_bests_lookup ON personal_bests (sdms, event, athlete_class)",
+        "CREATE INDEX IF NOT EXISTS idx_registrations_event_name ON registrations (event_name)",
+    ]),
+    ('002', 'Athlete and game class junction tables', [
+        """CREATE TABLE IF NOT EXISTS athlete_classes (
+            sdms INTEGER NOT NULL REFERENCES athletes(sdms) ON DELETE CASCADE ON UPDATE CASCADE,
+            class_name VARCHAR(10) NOT NULL,
+            PRIMARY KEY (sdms, class_name)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_athlete_classes_class_name ON athlete_classes (class_name, sdms)",
+        """CREATE TABLE IF NOT EXISTS game_classes (
+            game_id INTEGER NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+            class_name VARCHAR(10) NOT NULL,
+            PRIMARY KEY (game_id, class_name)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_game_classes_class_name ON game_classes (class_name, game_id)",
+        """INSERT INTO athlete_classes (sdms, class_name)
+            SELECT DISTINCT a.sdms, trim(c.class_name)
+            FROM athletes a
+            CROSS JOIN LATERAL unnest(string_to_array(a.class, ',')) AS c(class_name)
+            WHERE trim(c.class_name) <> ''
+            ON CONFLICT DO NOTHING""",
+        """INSERT INTO game_classes (game_id, class_name)
+            SELECT DISTINCT g.id, trim(c.class_name)
+            FROM games g
+            CROSS JOIN LATERAL unnest(string_to_array(g.classes, ',')) AS c(class_name)
+            WHERE trim(c.class_name) <> ''
+            ON CONFLICT DO NOTHING""",
+    ]),
+    ('003', 'Numeric performance and status columns on results and attempts', [
+        """DO $$ BEGIN
+            CREATE TYPE performance_status AS ENUM (
+                'OK', 'DNS', 'DNF', 'DQ', 'NM', 'NH', 'FOUL', 'PASS', 'CLEARED', 'FAILED', 'INVALID'
+            );
+        EXCEPTION WHEN duplicate_object THEN NULL;
+        END $$""",
+        """ALTER TABLE results
+            ADD COLUMN IF NOT EXISTS value_numeric NUMERIC(10, 4),
+            ADD COLUMN IF NOT EXISTS value_status performance_status""",
+        """ALTER TABLE attempts
+            ADD COLUMN IF NOT EXISTS value_numeric NUMERIC(10, 4),
+            ADD COLUMN IF NOT EXISTS value_status performance_status""",
+        f"UPDATE results SET value_status = {PERFORMANCE_STATUS_SQL}, value_numeric = {PERFORMANCE_NUMERIC_SQL}",
+        f"""UPDATE attempts SET value_status = {PERFORMANCE_STATUS_SQL},
+            value_numeric = CASE WHEN ({PERFORMANCE_STATUS_SQL}) = 'CLEARED' THEN height
+                                 ELSE {PERFORMANCE_NUMERIC_SQL} END""",
+        "CREATE INDEX IF NOT EXISTS idx_results_game_value_numeric ON results (game_id, value_numeric)",
+        "CREATE INDEX IF NOT EXISTS idx_attempts_result_value_numeric ON attempts (result_id, value_numeric)",
+    ]),
+    ('004', 'Config version counter shared by all workers', [
+        """CREATE TABLE IF NOT EXISTS config_version (
+            id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+            version BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+        "INSERT INTO config_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING",
+    ]),
+    ('005', 'Per-game counts and alert flag maintained by triggers', [
+        """CREATE TABLE IF NOT EXISTS game_stats (
+            game_id INTEGER PRIMARY KEY REFERENCES games(id) ON DELETE CASCADE,
+            result_count INTEGER NOT NULL DEFAULT 0,
+            startlist_count INTEGER NOT NULL DEFAULT 0,
+            has_alerts BOOLEAN NOT NULL DEFAULT FALSE,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+        # Alert = an entrant (result or start list) whose gender differs from the game or who shares no class with it
+        """CREATE OR REPLACE FUNCTION refresh_game_stats(p_game_id INTEGER) RETURNS VOID AS $$
+        BEGIN
+            INSERT INTO game_stats (game_id, result_count, startlist_count, has_alerts, updated_at)
+            SELECT g.id,
+                   (SELECT COUNT(*) FROM results r WHERE r.game_id = g.id),
+                   (SELECT COUNT(*) FROM startlist s WHERE s.game_id = g.id),
+                   EXISTS (
+                       SELECT 1
+                       FROM (
+                           SELECT athlete_sdms FROM results WHERE game_id = g.id
+                           UNION
+                           SELECT athlete_sdms FROM startlist WHERE game_id = g.id
+                       ) p
+                       JOIN athletes a ON p.athlete_sdms = a.sdms
+                       WHERE a.gender != g.genders OR NOT EXISTS (
+                           SELECT 1 FROM athlete_classes ac
+                           JOIN game_classes gc ON gc.class_name = ac.class_name
+                           WHERE ac.sdms = p.athlete_sdms AND gc.game_id = g.id
+                       )
+                   ),
+                   CURRENT_TIMESTAMP
+            FROM games g
+            WHERE g.id = p_game_id
+            ON CONFLICT (game_id) DO UPDATE SET
+                result_count = EXCLUDED.result_count,
+                startlist_count = EXCLUDED.startlist_count,
+                has_alerts = EXCLUDED.has_alerts,
+                updated_at = EXCLUDED.updated_at;
+        END;
+        $$ LANGUAGE plpgsql""",
+        """CREATE OR REPLACE FUNCTION game_stats_entry_trigger() RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM refresh_game_stats(OLD.game_id);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND (TG_OP = 'INSERT' OR NEW.game_id IS DISTINCT FROM OLD.game_id) THEN
+                PERFORM refresh_game_stats(NEW.game_id);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql""",
+        """CREATE OR REPLACE FUNCTION game_stats_athlete_trigger() RETURNS TRIGGER AS $$
+        DECLARE
+            v_sdms INTEGER;
+            v_game_id INTEGER;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                v_sdms := OLD.sdms;
+            ELSE
+                v_sdms := NEW.sdms;
+            END IF;
+            FOR v_game_id IN
+                SELECT game_id FROM results WHERE athlete_sdms = v_sdms
+                UNION
+                SELECT game_id FROM startlist WHERE athlete_sdms = v_sdms
+            LOOP
+                PERFORM refresh_game_stats(v_game_id);
+            END LOOP;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql""",
+        """CREATE OR REPLACE FUNCTION game_stats_game_trigger() RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM refresh_game_stats(OLD.game_id);
+            ELSIF TG_TABLE_NAME = 'games' THEN
+                PERFORM refresh_game_stats(NEW.id);
+            ELSE
+                PERFORM refresh_game_stats(NEW.game_id);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql""",
+        "DROP TRIGGER IF EXISTS results_game_stats ON results",
+        """CREATE TRIGGER results_game_stats
+            AFTER INSERT OR DELETE OR UPDATE OF game_id, athlete_sdms ON results
+            FOR EACH ROW EXECUTE PROCEDURE game_stats_entry_trigger()""",
+        "DROP TRIGGER IF EXISTS startlist_game_stats ON startlist",
+        """CREATE TRIGGER startlist_game_stats
+            AFTER INSERT OR DELETE OR UPDATE OF game_id, athlete_sdms ON startlist
+            FOR EACH ROW EXECUTE PROCEDURE game_stats_entry_trigger()""",
+        "DROP TRIGGER IF EXISTS athletes_game_stats ON athletes",
+        """CREATE TRIGGER athletes_game_stats
+            AFTER UPDATE OF gender ON athletes
+            FOR EACH ROW EXECUTE PROCEDURE game_stats_athlete_trigger()""",
+        "DROP TRIGGER IF EXISTS athlete_classes_game_stats ON athlete_classes",
+        """CREATE TRIGGER athlete_classes_game_stats
+            AFTER INSERT OR DELETE ON athlete_classes
+            FOR EACH ROW EXECUTE PROCEDURE game_stats_athlete_trigger()""",
+        "DROP TRIGGER IF EXISTS games_game_stats ON games",
+        """CREATE TRIGGER games_game_stats
+            AFTER INSERT OR UPDATE OF genders ON games
+            FOR EACH ROW EXECUTE PROCEDURE game_stats_game_trigger()""",
+        "DROP TRIGGER IF EXISTS game_classes_game_stats ON game_classes",
+        """CREATE TRIGGER game_classes_game_stats
+            AFTER INSERT OR DELETE ON game_classes
+            FOR EACH ROW EXECUTE PROCEDURE game_stats_game_trigger()""",
+        "SELECT refresh_game_stats(id) FROM games",
+    ]),
+    ('006', 'Keyset index for paginated game listings', [
+        "CREATE INDEX IF NOT EXISTS idx_games_day_time_id ON games (day, time, id)",
+    ]),
+    ('007', 'Data version bumped by every write to publicly visible tables', [
+        """CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+            version BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+        "INSERT INTO data_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING",
+        """CREATE OR REPLACE FUNCTION bump_data_version() RETURNS TRIGGER AS $$
+        BEGIN
+            UPDATE data_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql""",
+    ] + [
+        statement
+        for table in DATA_VERSION_TABLES
+        for statement in (
+            f"DROP TRIGGER IF EXISTS {table}_data_version ON {table}",
+            f"""CREATE TRIGGER {table}_data_version
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+                FOR EACH STATEMENT EXECUTE PROCEDURE bump_data_version()""",
+        )
+    ]),
+    ('008', 'Partial indexes for pending record counters', [
+        "CREATE INDEX IF NOT EXISTS idx_world_records_pending ON world_records (made_in_competition) WHERE approved = FALSE",
+        "CREATE INDEX IF NOT EXISTS idx_personal_bests_pending ON personal_bests (made_in_competition) WHERE approved = FALSE",
+    ]),
+    ('009', 'Background job queue', [
+        """CREATE TABLE IF NOT EXISTS jobs (
+            id SERIAL PRIMARY KEY,
+            kind VARCHAR(50) NOT NULL,
+            params JSONB NOT NULL DEFAULT '{}',
+            status VARCHAR(20) NOT NULL DEFAULT 'queued'
+                CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+            progress_done INTEGER NOT NULL DEFAULT 0,
+            progress_total INTEGER,
+            message TEXT,
+            result JSONB,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_by INTEGER REFERENCES users(id) ON DELETE SET NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            heartbeat_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_queued ON jobs (id) WHERE status = 'queued'",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_running ON jobs (heartbeat_at) WHERE status = 'running'",
+        # Un même travail (type + paramètres) n'est jamais en file deux fois
+        """CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_unique ON jobs (kind, params)
+            WHERE status IN ('queued', 'running')""",
+    ]),
+    ('010', 'Input hash of generated PDFs', [
+        # Empreinte des données qui ont servi au PDF généré : une épreuve inchangée n'est pas re-rendue
+        "ALTER TABLE games ADD COLUMN IF NOT EXISTS generated_startlist_pdf_hash VARCHAR(64)",
+        "ALTER TABLE games ADD COLUMN IF NOT EXISTS generated_results_pdf_hash VARCHAR(64)",
+    ]),
+    ('011', 'Keep class junction tables in sync with athletes.class and games.classes', [
+        # Les tables de jonction suivent les colonnes texte pour toute écriture, y compris les imports SQL directs
+        """CREATE OR REPLACE FUNCTION sync_athlete_classes() RETURNS TRIGGER AS $$
+        BEGIN
+            DELETE FROM athlete_classes WHERE sdms = NEW.sdms;
+            INSERT INTO athlete_classes (sdms, class_name)
+                SELECT DISTINCT NEW.sdms, trim(c.class_name)
+                FROM unnest(string_to_array(NEW.class, ',')) AS c(class_name)
+                WHERE trim(c.class_name) <> '';
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql""",
+        """CREATE OR REPLACE FUNCTION sync_game_classes() RETURNS TRIGGER AS $$
+        BEGIN
+            DELETE FROM game_classes WHERE game_id = NEW.id;
+            INSERT INTO game_classes (game_id, class_name)
+                SELECT DISTINCT NEW.id, trim(c.class_name)
+                FROM unnest(string_to_array(NEW.classes, ',')) AS c(class_name)
+                WHERE trim(c.class_name) <> '';
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql""",
+        "DROP TRIGGER IF EXISTS athletes_sync_classes_insert ON athletes",
+        """CREATE TRIGGER athletes_sync_classes_insert
+            AFTER INSERT ON athletes
+            FOR EACH ROW EXECUTE PROCEDURE sync_athlete_classes()""",
+        "DROP TRIGGER IF EXISTS athletes_sync_classes_update ON athletes",
+        """CREATE TRIGGER athletes_sync_classes_update
+            AFTER UPDATE OF class ON athletes
+            FOR EACH ROW WHEN (OLD.class IS DISTINCT FROM NEW.class) EXECUTE PROCEDURE sync_athlete_classes()""",
+        "DROP TRIGGER IF EXISTS games_sync_classes_insert ON games",
+        """CREATE TRIGGER games_sync_classes_insert
+            AFTER INSERT ON games
+            FOR EACH ROW EXECUTE PROCEDURE sync_game_classes()""",
+        "DROP TRIGGER IF EXISTS games_sync_classes_update ON games",
+        """CREATE TRIGGER games_sync_classes_update
+            AFTER UPDATE OF classes ON games
+            FOR EACH ROW WHEN (OLD.classes IS DISTINCT FROM NEW.classes) EXECUTE PROCEDURE sync_game_classes()""",
+        # Rattrapage des lignes écrites directement depuis la migration 002
+        "DELETE FROM athlete_classes",
+        """INSERT INTO athlete_classes (sdms, class_name)
+            SELECT DISTINCT a.sdms, trim(c.class_name)
+            FROM athletes a
+            CROSS JOIN LATERAL unnest(string_to_array(a.class, ',')) AS c(class_name)
+            WHERE trim(c.class_name) <> ''""",
+        "DELETE FROM game_classes",
+        """INSERT INTO game_classes (game_id, class_name)
+            SELECT DISTINCT g.id, trim(c.class_name)
+            FROM games g
+            CROSS JOIN LATERAL unnest(string_to_array(g.classes, ',')) AS c(class_name)
+            WHERE trim(c.class_name) <> ''""",
+    ]),
+    ('012', 'Data version backed by a sequence', [
+        # nextval ne prend pas de verrou de ligne : les transactions d'écriture ne se sérialisent plus sur data_version
+        "CREATE SEQUENCE IF NOT EXISTS data_version_seq",
+        "SELECT setval('data_version_seq', GREATEST((SELECT MAX(version) FROM data_version), 0) + 1)",
+        """CREATE OR REPLACE FUNCTION bump_data_version() RETURNS TRIGGER AS $$
+        BEGIN
+            PERFORM nextval('data_version_seq');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql""",
+        "DROP TABLE IF EXISTS data_version",
+    ]),
+]
+_MIGRATION_LOCK_ID = 72025
+def get_applied_migrations():
+    rows = execute_query("SELECT version FROM schema_migrations ORDER BY version", fetch=True)
+    return [row['version'] for row in rows]
+def run_migrations():
+    execute_query("""CREATE TABLE IF NOT EXISTS schema_migrations (
+        version VARCHAR(20) PRIMARY KEY,
+        description VARCHAR(255),
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+    applied = set(get_applied_migrations())
+    pending = [migration for migration in MIGRATIONS if migration[0] not in applied]
+    if not pending:
+        print("✓ Database schema is up to date")
+        return []
+    newly_applied = []
+    for version, description, statements in pending:
+        with transaction():
+            # Serialise concurrent runners (several workers booting at once)
+            execute_query("SELECT pg_advisory_xact_lock(%s)", (_MIGRATION_LOCK_ID,))
+            if execute_one("SELECT 1 FROM schema_migrations WHERE version = %s", (version,)):
+                continue
+            for statement in statements:
+                execute_query(statement)
+            execute_query(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (version, description)
+            )
+        newly_applied.append(version)
+        print(f"✓ Migration applied: {version} - {description}")
+    return newly_applied
 def insert_default_regions():
     default_regions = [
         ('AFR', 'Africa', 'Africa'),
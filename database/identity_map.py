@@ -0,0 +1,34 @@
+from flask import g, has_app_context
+from database.db_manager import in_transaction
+from database.invalidation import ATHLETE, GAME, subscribe
+# Request-scoped identity map for the hot get_by_id / get_by_sdms lookups, stored on flask.g.
+# Outside of an app context (CLI, workers, listener thread) and inside a unit of work, lookups go straight to the database.
+# Rows are copied on the way out: callers are free to mutate what they get back.
+def _identity_map():
+    if not has_app_context():
+        return None
+    identity_map = g.get('_identity_map')
+    if identity_map is None:
+        identity_map = g._identity_map = {}
+    return identity_map
+def get_or_load(kind, key, loader):
+    identity_map = _identity_map()
+    if identity_map is None or in_transaction():
+        return loader(key)
+    entries = identity_map.setdefault(kind, {})
+    if str(key) not in entries:
+        entries[str(key)] = loader(key)
+    row = entries[str(key)]
+    return dict(row) if row is not None else None
+def forget(kind, key=None):
+    identity_map = _identity_map()
+    if identity_map is None:
+        return
+    if key is None:
+        identity_map.pop(kind, None)
+    else:
+        identity_map.get(kind, {}).pop(str(key), None)
+def _forget_event(event):
+    forget(event.kind, event.key)
+subscribe(GAME, _forget_event)
+subscribe(ATHLETE, _forget_event)
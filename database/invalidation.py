@@ -0,0 +1,164 @@
+import json
+import os
+import select
+import threading
+import time
+from dataclasses import dataclass
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from config import Config
+from database.db_manager import _connection_kwargs, execute_one, execute_query, in_transaction, on_commit, transaction
+# Cross-worker cache invalidation over PostgreSQL LISTEN/NOTIFY.
+# Writers publish events (delivered by Postgres only when their transaction commits);
+# every worker runs one listener thread and evicts the matching keys in its local caches.
+CHANNEL = 'cache_invalidation'
+GAME = 'game'
+ATHLETE = 'athlete'
+RESULTS = 'results'
+CONFIG = 'config'
+MEDALS = 'medals'
+RECORDS = 'records'
+ALL = '*'
+EVENT_KINDS = (GAME, ATHLETE, RESULTS, CONFIG, MEDALS, RECORDS)
+@dataclass(frozen=True)
+class InvalidationEvent:
+    kind: str
+    key: object = None
+    origin_pid: int = None
+    def to_payload(self):
+        return json.dumps({'kind': self.kind, 'key': self.key, 'pid': self.origin_pid})
+    @staticmethod
+    def from_payload(payload):
+        data = json.loads(payload)
+        return InvalidationEvent(kind=data.get('kind'), key=data.get('key'), origin_pid=data.get('pid'))
+_handlers = {}
+_handlers_lock = threading.Lock()
+_listener = None
+_listener_pid = None
+_listener_lock = threading.Lock()
+_listener_stats = {
+    'connected': False,
+    'received': 0,
+    'published': 0,
+    'reconnects': 0,
+}
+def subscribe(kind, handler):
+    # handler(event); subscribing to ALL receives every event kind
+    with _handlers_lock:
+        _handlers.setdefault(kind, []).append(handler)
+    return handler
+def dispatch(event):
+    with _handlers_lock:
+        handlers = list(_handlers.get(event.kind, ())) + list(_handlers.get(ALL, ()))
+    for handler in handlers:
+        try:
+            handler(event)
+        except Exception as e:
+            print(f"✗ Error in invalidation handler for {event.kind}: {e}")
+def dispatch_reset():
+    # Notifications sent while the listener was disconnected are lost: evict everything
+    for kind in EVENT_KINDS:
+        dispatch(InvalidationEvent(kind=kind, key=None, origin_pid=os.getpid()))
+def publish(kind, key=None):
+    if kind not in EVENT_KINDS:
+        raise ValueError(f"Unknown invalidation event kind: {kind}")
+    event = InvalidationEvent(kind=kind, key=key, origin_pid=os.getpid())
+    if in_transaction():
+        # Pas d'erreur avalée ici : la transaction de l'appelant est interrompue, ses écritures ne doivent pas
+        # être présentées comme validées
+        _notify(event)
+        # The publishing worker evicts locally after COMMIT instead of waiting for its own notification
+        on_commit(lambda: _after_publish(event))
+        return
+    # Hors unité de travail : Postgres n'envoie le NOTIFY qu'au COMMIT, il faut donc sa propre transaction
+    try:
+        with transaction():
+            _notify(event)
+    except psycopg2.Error as e:
+        print(f"✗ Could not publish invalidation {kind}/{key}: {e}")
+    _after_publish(event)
+def _after_publish(event):
+    _bump_data_version()
+    dispatch(event)
+def _notify(event):
+    execute_query("SELECT pg_notify(%s, %s)", (CHANNEL, event.to_payload()))
+    _listener_stats['published'] += 1
+def _listen_forever(poll_timeout=5.0, retry_delay=2.0):
+    connected_once = False
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(**_connection_kwargs())
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            _listener_stats['connected'] = True
+            if connected_once:
+                _listener_stats['reconnects'] += 1
+                dispatch_reset()
+            connected_once = True
+            while True:
+                if select.select([conn], [], [], poll_timeout) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        event = InvalidationEvent.from_payload(notify.payload)
+                    except (ValueError, TypeError):
+                        continue
+                    _listener_stats['received'] += 1
+                    if event.origin_pid == os.getpid():
+                        continue
+                    dispatch(event)
+        except Exception as e:
+            print(f"✗ Invalidation listener error (pid {os.getpid()}): {e}")
+        finally:
+            _listener_stats['connected'] = False
+            if conn is not None and not conn.closed:
+                try:
+                    conn.close()
+                except psycopg2.Error:
+                    pass
+        time.sleep(retry_delay)
+def start_listener():
+    global _listener, _listener_pid
+    pid = os.getpid()
+    if _listener is not None and _listener_pid == pid and _listener.is_alive():
+        return _listener
+    with _listener_lock:
+        if _listener is not None and _listener_pid == pid and _listener.is_alive():
+            return _listener
+        _listener = threading.Thread(target=_listen_forever, name='cache-invalidation-listener', daemon=True)
+        _listener_pid = pid
+        _listener.start()
+        print(f"✓ Invalidation listener started (pid {pid})")
+        return _listener
+def get_listener_stats():
+    stats = dict(_listener_stats)
+    stats['running'] = _listener is not None and _listener_pid == os.getpid() and _listener.is_alive()
+    return stats
+# data_version_seq is bumped by triggers on every write to a publicly visible table (migrations 007 and 012).
+# nextval is not transactional, so a reader can see the trigger's bump before the writer commits and cache
+# old data under the new version: publish() bumps it once more after COMMIT.
+# Read at most every DATA_VERSION_CHECK_INTERVAL seconds, and again right after any invalidation event.
+_data_version = None
+def _bump_data_version():
+    try:
+        execute_one("SELECT nextval('data_version_seq')")
+    except psycopg2.Error as e:
+        print(f"✗ Could not bump data version: {e}")
+def get_data_version():
+    global _data_version
+    cached = _data_version
+    now = time.monotonic()
+    if cached is not None and now - cached['checked_at'] < Config.DATA_VERSION_CHECK_INTERVAL:
+        return cached['version']
+    row = execute_one("SELECT last_value AS version FROM data_version_seq")
+    version = row['version'] if row else 0
+    _data_version = {'version': version, 'checked_at': now}
+    return version
+def _reset_data_version(event):
+    global _data_version
+    _data_version = None
+subscribe(ALL, _reset_data_version)
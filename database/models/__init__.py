@@ -11,6 +11,7 @@ from .attempt import Attempt
 from .registration import Registration
 from .medal import Medal
 from .heat_group import HeatGroup
+from .job import Job
 
 __all__ = [
     'User',
@@ -25,5 +26,6 @@ __all__ = [
     'Attempt',
     'Registration',
     'Medal',
-    'HeatGroup'
+    'HeatGroup',
+    'Job'
 ]
\ No newline at end of file
@@ -1,4 +1,6 @@
-from database.db_manager import execute_query, execute_one
+from database.db_manager import execute_query, execute_one, transaction
+from database.identity_map import get_or_load
+from database.invalidation import ATHLETE, publish
 
 
 class Athlete:
@@ -16,8 +18,8 @@ class Athlete:
             for key, value in filters.items():
                 if value:
                     if key == 'class':
-                        query += " AND a.class LIKE %s"
-                        params.append(f"%{value}%")
+                        query += " AND EXISTS (SELECT 1 FROM athlete_classes ac WHERE ac.sdms = a.sdms AND ac.class_name = %s)"
+                        params.append(value.strip())
                     elif key == 'region_code':
                         query += " AND n.region_code = %s"
                         params.append(value)
@@ -38,6 +40,10 @@ class Athlete:
 
     @staticmethod
     def get_by_sdms(sdms):
+        return get_or_load(ATHLETE, sdms, Athlete._load_by_sdms)
+
+    @staticmethod
+    def _load_by_sdms(sdms):
         athlete = execute_one("""
             SELECT a.*, n.name as npc_name, n.region_code, r.name as region_name 
             FROM athletes a
@@ -58,7 +64,8 @@ class Athlete:
     def search(query, guides_only=False, allowed_classes=None, event_filter=None):
         from config import Config
         all_classes = Config.get_classes()
-        is_class_search = query.upper() in [cls.upper() for cls in all_classes]
+        class_match = next((cls for cls in all_classes if cls.upper() == query.upper()), None)
+        is_class_search = class_match is not None
 
         base_query = """
             SELECT a.*, n.name as npc_name, n.region_code, r.name as region_name,
@@ -80,8 +87,8 @@ class Athlete:
             conditions.append("a.is_guide = TRUE")
 
         if is_class_search:
-            conditions.append("UPPER(a.class) LIKE UPPER(%s)")
-            params.append(f"%{query}%")
+            conditions.append("EXISTS (SELECT 1 FROM athlete_classes ac WHERE ac.sdms = a.sdms AND ac.class_name = %s)")
+            params.append(class_match)
         else:
             conditions.append("""(
                 LOWER(a.firstname) LIKE LOWER(%s) OR
@@ -93,9 +100,8 @@ class Athlete:
             params.extend([f"%{query}%"] * 5)
 
         if allowed_classes:
-            class_conditions = " OR ".join(["a.class LIKE %s"] * len(allowed_classes))
-            conditions.append(f"({class_conditions})")
-            params.extend([f"%{class_name}%" for class_name in allowed_classes])
+            conditions.append("EXISTS (SELECT 1 FROM athlete_classes ac WHERE ac.sdms = a.sdms AND ac.class_name = ANY(%s))")
+            params.append(list(allowed_classes))
 
         search_query = f"{base_query} WHERE {' AND '.join(conditions)}"
         search_query += " GROUP BY a.sdms, a.firstname, a.lastname, a.npc, a.gender, a.class, a.date_of_birth, a.photo, a.is_guide, a.created_at, n.name, n.region_code, r.name"
@@ -124,6 +130,18 @@ class Athlete:
         classes = [c.strip() for c in athlete['class'].split(',')]
         return target_class in classes
 
+    @staticmethod
+    def get_classes_for_game(sdms, game_id):
+        # Classes de l'athlète dans l'ordre déclaré, avec leur compatibilité avec le game (tables de jonction)
+        return execute_query("""
+            SELECT ac.class_name, gc.game_id IS NOT NULL as compatible
+            FROM athletes a
+            JOIN athlete_classes ac ON ac.sdms = a.sdms
+            LEFT JOIN game_classes gc ON gc.class_name = ac.class_name AND gc.game_id = %s
+            WHERE a.sdms = %s
+            ORDER BY array_position(string_to_array(replace(a.class, ' ', ''), ','), ac.class_name)
+        """, (game_id, sdms), fetch=True)
+
     @staticmethod
     def get_primary_class(athlete):
         if not athlete or not athlete.get('class'):
@@ -136,7 +154,10 @@ class Athlete:
         keys = ', '.join(data.keys())
         placeholders = ', '.join(['%s'] * len(data))
         query = f"INSERT INTO athletes ({keys}) VALUES ({placeholders}) RETURNING sdms"
-        result = execute_query(query, list(data.values()))
+        with transaction():
+            result = execute_query(query, list(data.values()))
+            if result:
+                publish(ATHLETE, result['sdms'])
         return result['sdms'] if result else None
 
     @staticmethod
@@ -144,11 +165,32 @@ class Athlete:
         set_clause = ', '.join([f"{k} = %s" for k in data.keys()])
         query = f"UPDATE athletes SET {set_clause} WHERE sdms = %s"
         params = list(data.values()) + [sdms]
-        return execute_query(query, params)
+        with transaction():
+            affected = execute_query(query, params)
+            publish(ATHLETE, sdms)
+            if data.get('sdms', sdms) != sdms:
+                publish(ATHLETE, data['sdms'])
+        return affected
 
     @staticmethod
     def delete(sdms):
-        return execute_query("DELETE FROM athletes WHERE sdms = %s", (sdms,))
+        with transaction():
+            affected = execute_query("DELETE FROM athletes WHERE sdms = %s", (sdms,))
+            publish(ATHLETE, sdms)
+        return affected
+
+    @staticmethod
+    def get_export_fingerprints():
+        rows = execute_query("""
+            SELECT a.sdms, md5(
+                row(a.*)::text
+                || COALESCE((SELECT string_agg(row(r.*)::text || row(g.*)::text, ',' ORDER BY r.id)
+                             FROM results r JOIN games g ON g.id = r.game_id
+                             WHERE r.athlete_sdms = a.sdms), '')
+            ) AS fingerprint
+            FROM athletes a
+        """, fetch=True)
+        return {row['sdms']: row['fingerprint'] for row in rows}
 
     @staticmethod
     def get_athlete_detail(sdms):
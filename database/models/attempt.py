@@ -1,6 +1,8 @@
 from config import Config
-from database.db_manager import execute_one, execute_query
-from utils.raza_calculation import calculate_raza, verify_combination
+from database.db_manager import execute_one, execute_query, transaction
+from database.models.result import Result
+from utils.raza_calculation import verify_combination
+from utils.raza_engine import RazaError, score
 
 
 class Attempt:
@@ -11,18 +13,48 @@ class Attempt:
             (result_id,), fetch=True
         )
 
+    @staticmethod
+    def get_by_results(result_ids):
+        attempts_by_result = {result_id: [] for result_id in result_ids}
+        if not attempts_by_result:
+            return attempts_by_result
+        attempts = execute_query(
+            "SELECT * FROM attempts WHERE result_id = ANY(%s) ORDER BY result_id, attempt_number",
+            (list(attempts_by_result),), fetch=True
+        )
+        for attempt in attempts:
+            attempts_by_result.setdefault(attempt['result_id'], []).append(attempt)
+        return attempts_by_result
+
+    @staticmethod
+    def parse_value(value, height=None):
+        # Saut en hauteur : un essai franchi (O, XO, XXO) vaut la barre tentée
+        value_numeric, value_status = Config.parse_performance(value)
+        if value_status == 'CLEARED' and height is not None:
+            value_numeric = float(height)
+        return value_numeric, value_status
+
     @staticmethod
     def create(result_id, attempt_number, value, wind_velocity=None, raza_score=None, raza_score_precise=None,
                height=None):
         if wind_velocity is not None:
             wind_velocity = float(Config.format_wind(wind_velocity))
+        value_numeric, value_status = Attempt.parse_value(value, height)
         return execute_query(
-            "INSERT INTO attempts (result_id, attempt_number, value, raza_score, raza_score_precise, wind_velocity, height) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-            (result_id, attempt_number, value, raza_score, raza_score_precise, wind_velocity, height)
+            "INSERT INTO attempts (result_id, attempt_number, value, value_numeric, value_status, raza_score, raza_score_precise, wind_velocity, height) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+            (result_id, attempt_number, value, value_numeric, value_status, raza_score, raza_score_precise, wind_velocity, height)
         )
 
     @staticmethod
     def update(attempt_id, **data):
+        if 'value' in data:
+            if 'height' in data:
+                height = data['height']
+            else:
+                # Essai franchi dont seule la valeur change : il vaut toujours la barre enregistrée
+                stored = execute_one("SELECT height FROM attempts WHERE id = %s", (attempt_id,))
+                height = stored['height'] if stored else None
+            data['value_numeric'], data['value_status'] = Attempt.parse_value(data['value'], height)
         set_clause = ', '.join([f"{k} = %s" for k in data.keys()])
         query = f"UPDATE attempts SET {set_clause} WHERE id = %s"
         params = list(data.values()) + [attempt_id]
@@ -32,53 +64,61 @@ class Attempt:
     def create_multiple(result_id, attempts=None):
         if attempts is None:
             return False
-        for attempt_number, attempt_data in attempts.items():
-            value = attempt_data.get('value')
-            if not value:
-                continue
-            raza_score = attempt_data.get('raza_score')
-            raza_score_decimal = attempt_data.get('raza_score_precise')
-            wind_velocity = attempt_data.get('wind_velocity')
-            height = attempt_data.get('height')
-            if wind_velocity is not None:
-                wind_velocity = float(Config.format_wind(wind_velocity))
-            execute_query(
-                "INSERT INTO attempts (result_id, attempt_number, value, raza_score, raza_score_precise, wind_velocity, height) VALUES (%s, %s, %s, %s, %s, %s, %s) ON CONFLICT (result_id, attempt_number) DO UPDATE SET value = EXCLUDED.value, raza_score = EXCLUDED.raza_score, raza_score_precise = EXCLUDED.raza_score_precise, wind_velocity = EXCLUDED.wind_velocity, height = EXCLUDED.height",
-                (result_id, attempt_number, value, raza_score, raza_score_decimal, wind_velocity, height)
-            )
+        with transaction():
+            for attempt_number, attempt_data in attempts.items():
+                value = attempt_data.get('value')
+                if not value:
+                    continue
+                raza_score = attempt_data.get('raza_score')
+                raza_score_decimal = attempt_data.get('raza_score_precise')
+                wind_velocity = attempt_data.get('wind_velocity')
+                height = attempt_data.get('height')
+                if wind_velocity is not None:
+                    wind_velocity = float(Config.format_wind(wind_velocity))
+                value_numeric, value_status = Attempt.parse_value(value, height)
+                execute_query(
+                    "INSERT INTO attempts (result_id, attempt_number, value, value_numeric, value_status, raza_score, raza_score_precise, wind_velocity, height) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) ON CONFLICT (result_id, attempt_number) DO UPDATE SET value = EXCLUDED.value, value_numeric = EXCLUDED.value_numeric, value_status = EXCLUDED.value_status, raza_score = EXCLUDED.raza_score, raza_score_precise = EXCLUDED.raza_score_precise, wind_velocity = EXCLUDED.wind_velocity, height = EXCLUDED.height",
+                    (result_id, attempt_number, value, value_numeric, value_status, raza_score, raza_score_decimal, wind_velocity, height)
+                )
+            Result.publish_change(result_id)
         return True
 
     @staticmethod
     def update_partial(result_id, attempts_data):
-        for attempt_number, attempt_data in attempts_data.items():
-            value = attempt_data.get('value')
-            if not value:
-                continue
-            raza_score = attempt_data.get('raza_score')
-            raza_score_decimal = attempt_data.get('raza_score_precise')
-            wind_velocity = attempt_data.get('wind_velocity')
-            height = attempt_data.get('height')
-            if wind_velocity is not None:
-                wind_velocity = float(Config.format_wind(wind_velocity))
-            existing = execute_one(
-                "SELECT id FROM attempts WHERE result_id = %s AND attempt_number = %s",
-                (result_id, attempt_number)
-            )
-            if existing:
-                execute_query(
-                    "UPDATE attempts SET value = %s, raza_score = %s, raza_score_precise = %s, wind_velocity = %s, height = %s WHERE result_id = %s AND attempt_number = %s",
-                    (value, raza_score, raza_score_decimal, wind_velocity, height, result_id, attempt_number)
-                )
-            else:
-                execute_query(
-                    "INSERT INTO attempts (result_id, attempt_number, value, raza_score, raza_score_precise, wind_velocity, height) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-                    (result_id, attempt_number, value, raza_score, raza_score_decimal, wind_velocity, height)
+        with transaction():
+            for attempt_number, attempt_data in attempts_data.items():
+                value = attempt_data.get('value')
+                if not value:
+                    continue
+                raza_score = attempt_data.get('raza_score')
+                raza_score_decimal = attempt_data.get('raza_score_precise')
+                wind_velocity = attempt_data.get('wind_velocity')
+                height = attempt_data.get('height')
+                if wind_velocity is not None:
+                    wind_velocity = float(Config.format_wind(wind_velocity))
+                value_numeric, value_status = Attempt.parse_value(value, height)
+                existing = execute_one(
+                    "SELECT id FROM attempts WHERE result_id = %s AND attempt_number = %s",
+                    (result_id, attempt_number)
                 )
+                if existing:
+                    execute_query(
+                        "UPDATE attempts SET value = %s, value_numeric = %s, value_status = %s, raza_score = %s, raza_score_precise = %s, wind_velocity = %s, height = %s WHERE result_id = %s AND attempt_number = %s",
+                        (value, value_numeric, value_status, raza_score, raza_score_decimal, wind_velocity, height, result_id, attempt_number)
+                    )
+                else:
+                    execute_query(
+                        "INSERT INTO attempts (result_id, attempt_number, value, value_numeric, value_status, raza_score, raza_score_precise, wind_velocity, height) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                        (result_id, attempt_number, value, value_numeric, value_status, raza_score, raza_score_decimal, wind_velocity, height)
+                    )
+            Result.publish_change(result_id)
         return True
 
     @staticmethod
     def delete_by_result(result_id):
-        return execute_query("DELETE FROM attempts WHERE result_id = %s", (result_id,))
+        with transaction():
+            Result.publish_change(result_id)
+            return execute_query("DELETE FROM attempts WHERE result_id = %s", (result_id,))
 
     @staticmethod
     def add_long_jump_attempt(result_id, value, height=None, wind_velocity=None):
@@ -99,18 +139,16 @@ class Attempt:
                 athlete = execute_one("SELECT * FROM athletes WHERE sdms = %s", (result['athlete_sdms'],))
                 if athlete and verify_combination(athlete['gender'], game['event'], athlete['class']):
                     try:
-                        raza_result = calculate_raza(
+                        raza_result = score(
                             gender=athlete['gender'],
                             event=game['event'],
                             athlete_class=athlete['class'],
                             performance=float(value)
                         )
-                        if isinstance(raza_result, tuple):
-                            response, status = raza_result
-                            if status == 200:
-                                raza_data = response.get_json()
-                                raza_score = int(raza_data.get('raza_score', 0))
-                                raza_score_precise = float(raza_data.get('raza_score_precise', 0))
+                        raza_score = raza_result.raza_score
+                        raza_score_decimal = raza_result.raza_score_precise
+                    except RazaError:
+                        pass
                     except Exception as e:
                         print(f"Error calculating RAZA for attempt: {e}")
-        return Attempt.create(result_id, next_attempt, value, wind_velocity, raza_score, raza_score_precise, height)
\ No newline at end of file
+        return Attempt.create(result_id, next_attempt, value, wind_velocity, raza_score, raza_score_decimal, height)
\ No newline at end of file
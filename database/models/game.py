@@ -1,4 +1,29 @@
-from database.db_manager import execute_one, execute_query
+import base64
+import json
+import threading
+import time
+from datetime import time as dt_time
+
+from config import Config
+from database.db_manager import execute_one, execute_query, transaction
+from database.identity_map import get_or_load
+from database.invalidation import ATHLETE, GAME, RESULTS, publish, subscribe
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# Compteurs et alertes lus dans game_stats, maintenue par triggers sur results/startlist/athletes/games
+GAME_STATUS_SELECT = """
+    SELECT g.*,
+           COALESCE(gs.result_count, 0) as result_count,
+           COALESCE(gs.startlist_count, 0) as startlist_count,
+           COALESCE(gs.has_alerts, FALSE) as has_alerts,
+           CASE WHEN g.start_file IS NOT NULL THEN TRUE ELSE FALSE END as has_startlist_file
+    FROM games g
+    LEFT JOIN game_stats gs ON gs.game_id = g.id
+"""
 
 
 class Game:
@@ -16,6 +41,10 @@ class Game:
 
     @staticmethod
     def get_by_id(id):
+        return get_or_load(GAME, id, Game._load_by_id)
+
+    @staticmethod
+    def _load_by_id(id):
         game = execute_one("""
             SELECT g.*,
                    g.manual_startlist_pdf,
@@ -45,7 +74,10 @@ class Game:
         keys = ', '.join(data.keys())
         placeholders = ', '.join(['%s'] * len(data))
         query = f"INSERT INTO games ({keys}) VALUES ({placeholders}) RETURNING id"
-        result = execute_query(query, list(data.values()))
+        with transaction():
+            result = execute_query(query, list(data.values()))
+            if result:
+                publish(GAME, result['id'])
         return result['id'] if result else None
 
     @staticmethod
@@ -53,19 +85,31 @@ class Game:
         set_clause = ', '.join([f"{k} = %s" for k in data.keys()])
         query = f"UPDATE games SET {set_clause} WHERE id = %s"
         params = list(data.values()) + [id]
-        return execute_query(query, params)
+        with transaction():
+            affected = execute_query(query, params)
+            publish(GAME, id)
+        return affected
 
     @staticmethod
     def delete(id):
-        return execute_query("DELETE FROM games WHERE id = %s", (id,))
+        with transaction():
+            affected = execute_query("DELETE FROM games WHERE id = %s", (id,))
+            publish(GAME, id)
+        return affected
 
     @staticmethod
     def update_status(id, status):
-        return execute_query("UPDATE games SET status = %s WHERE id = %s", (status, id))
+        with transaction():
+            affected = execute_query("UPDATE games SET status = %s WHERE id = %s", (status, id))
+            publish(GAME, id)
+        return affected
 
     @staticmethod
     def update_velocity(id, wind_velocity):
-        return execute_query("UPDATE games SET wind_velocity = %s WHERE id = %s", (wind_velocity, id))
+        with transaction():
+            affected = execute_query("UPDATE games SET wind_velocity = %s WHERE id = %s", (wind_velocity, id))
+            publish(GAME, id)
+        return affected
 
     @staticmethod
     def toggle_publish(id):
@@ -73,6 +117,7 @@ class Game:
         if current:
             new_status = not current.get('published', False)
             execute_query("UPDATE games SET published = %s WHERE id = %s", (new_status, id))
+            publish(GAME, id)
             return new_status
         return False
 
@@ -91,6 +136,7 @@ class Game:
                     "UPDATE games SET official = %s, official_by = NULL, official_date = NULL WHERE id = %s",
                     (new_status, id)
                 )
+            publish(GAME, id)
             return new_status
         return False
 
@@ -102,36 +148,27 @@ class Game:
 
     @staticmethod
     def has_alerts(id):
-        game = execute_one("SELECT genders, classes FROM games WHERE id = %s", (id,))
+        game = execute_one("SELECT genders FROM games WHERE id = %s", (id,))
         if not game:
             return False
         game_genders = [g.strip() for g in game['genders'].split(',')]
-        game_classes = [c.strip() for c in game['classes'].split(',')]
         result = execute_one("""
-            SELECT COUNT(*) as count FROM results r
-            JOIN athletes a ON r.athlete_sdms = a.sdms
-            WHERE r.game_id = %s AND (
-                a.gender NOT IN %s OR 
-                NOT EXISTS (
-                    SELECT 1 
-                    FROM unnest(string_to_array(a.class, ',')) as athlete_class(class_name)
-                    WHERE trim(athlete_class.class_name) = ANY(%s)
+            SELECT EXISTS (
+                SELECT 1
+                FROM (
+                    SELECT athlete_sdms FROM results WHERE game_id = %s
+                    UNION
+                    SELECT athlete_sdms FROM startlist WHERE game_id = %s
+                ) p
+                JOIN athletes a ON p.athlete_sdms = a.sdms
+                WHERE a.gender NOT IN %s OR NOT EXISTS (
+                    SELECT 1 FROM athlete_classes ac
+                    JOIN game_classes gc ON gc.class_name = ac.class_name
+                    WHERE ac.sdms = a.sdms AND gc.game_id = %s
                 )
-            )
-        """, (id, tuple(game_genders), game_classes))
-        startlist_result = execute_one("""
-            SELECT COUNT(*) as count FROM startlist s
-            JOIN athletes a ON s.athlete_sdms = a.sdms
-            WHERE s.game_id = %s AND (
-                a.gender NOT IN %s OR 
-                NOT EXISTS (
-                    SELECT 1 
-                    FROM unnest(string_to_array(a.class, ',')) as athlete_class(class_name)
-                    WHERE trim(athlete_class.class_name) = ANY(%s)
-                )
-            )
-        """, (id, tuple(game_genders), game_classes))
-        return (result and result['count'] > 0) or (startlist_result and startlist_result['count'] > 0)
+            ) as has_alerts
+        """, (id, id, tuple(game_genders), id))
+        return bool(result and result['has_alerts'])
 
     @staticmethod
     def get_last_5():
@@ -153,7 +190,76 @@ class Game:
 
     @staticmethod
     def get_with_status():
-        from config import Config
+        return Game._with_computed_status(get_status_rows())
+
+    @staticmethod
+    def get_page_with_status(day=None, event=None, search=None, published_only=False, after=None, limit=None):
+        # Filtres en SQL + pagination par clé (day, time, id) : retourne (games, curseur de la page suivante)
+        conditions = []
+        params = []
+        if day:
+            try:
+                params.append(int(day))
+                conditions.append("g.day = %s")
+            except (ValueError, TypeError):
+                conditions.append("FALSE")
+        if event:
+            conditions.append("g.event ILIKE %s")
+            params.append(_contains_pattern(event))
+        if search:
+            pattern = _contains_pattern(search)
+            conditions.append("(g.event ILIKE %s OR g.genders ILIKE %s OR g.classes ILIKE %s "
+                              "OR position(g.day::text in %s) > 0)")
+            params.extend([pattern, pattern, pattern, search])
+        if published_only:
+            conditions.append("g.published = TRUE")
+        cursor = Game.decode_cursor(after)
+        if cursor:
+            conditions.append("(g.day, g.time, g.id) > (%s, %s, %s)")
+            params.extend(cursor)
+        query = GAME_STATUS_SELECT
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY g.day, g.time, g.id"
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit + 1)
+
+        rows = execute_query(query, params, fetch=True)
+        next_cursor = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = Game.encode_cursor(rows[-1])
+        return Game._with_computed_status([Game._prepare_status_row(row) for row in rows]), next_cursor
+
+    @staticmethod
+    def encode_cursor(game):
+        # Curseur opaque : JSON en base64, l'heure en isoformat (microsecondes comprises)
+        payload = json.dumps([game['day'], game['time'].isoformat(), game['id']])
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        if not cursor:
+            return None
+        try:
+            day, game_time, game_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return int(day), dt_time.fromisoformat(game_time), int(game_id)
+        except (ValueError, TypeError, UnicodeError) as e:
+            raise InvalidCursor(cursor) from e
+
+    @staticmethod
+    def get_facets():
+        return get_cached('facets', Game._load_facets)
+
+    @staticmethod
+    def _load_facets():
+        days = execute_query("SELECT DISTINCT day FROM games ORDER BY day", fetch=True)
+        events = execute_query("SELECT DISTINCT event FROM games ORDER BY event", fetch=True)
+        return {'days': [row['day'] for row in days], 'events': [row['event'] for row in events]}
+
+    @staticmethod
+    def _with_computed_status(rows):
         from datetime import datetime
 
         current_day = Config.get_current_day()
@@ -166,58 +272,9 @@ class Game:
         except (ValueError, TypeError):
             current_day = 1
 
-        games = execute_query("""
-            SELECT g.*,
-                   COALESCE(rc.result_count, 0) as result_count,
-                   COALESCE(sc.startlist_count, 0) as startlist_count,
-                   CASE WHEN g.start_file IS NOT NULL THEN TRUE ELSE FALSE END as has_startlist_file
-            FROM games g
-            LEFT JOIN (
-                SELECT game_id, COUNT(*) as result_count 
-                FROM results 
-                GROUP BY game_id
-            ) rc ON g.id = rc.game_id
-            LEFT JOIN (
-                SELECT game_id, COUNT(*) as startlist_count 
-                FROM startlist 
-                GROUP BY game_id
-            ) sc ON g.id = sc.game_id
-            ORDER BY g.day, g.time
-        """, fetch=True)
-
-        alert_games = execute_query("""
-            SELECT DISTINCT g.id
-            FROM games g
-            JOIN (
-                SELECT r.game_id FROM results r
-                JOIN athletes a ON r.athlete_sdms = a.sdms
-                JOIN games g2 ON r.game_id = g2.id
-                WHERE a.gender != g2.genders OR 
-                      NOT EXISTS (
-                          SELECT 1 FROM unnest(string_to_array(a.class, ',')) as ac(class_name)
-                          WHERE trim(ac.class_name) = ANY(
-                              SELECT trim(unnest(string_to_array(g2.classes, ',')))
-                          )
-                      )
-                UNION
-                SELECT s.game_id FROM startlist s
-                JOIN athletes a ON s.athlete_sdms = a.sdms
-                JOIN games g2 ON s.game_id = g2.id
-                WHERE a.gender != g2.genders OR 
-                      NOT EXISTS (
-                          SELECT 1 FROM unnest(string_to_array(a.class, ',')) as ac(class_name)
-                          WHERE trim(ac.class_name) = ANY(
-                              SELECT trim(unnest(string_to_array(g2.classes, ',')))
-                          )
-                      )
-            ) alerts ON g.id = alerts.game_id""", fetch=True)
-
-        alert_game_ids = {alert['id'] for alert in alert_games}
-
-        for game in games:
-            game['classes_list'] = [c.strip() for c in game['classes'].split(',')]
-            game['genders_list'] = [g.strip() for g in game['genders'].split(',')]
-            game['startlist_published'] = game.get('startlist_published', False)
+        games = []
+        for row in rows:
+            game = dict(row)
             game_day = game['day']
 
             try:
@@ -243,22 +300,63 @@ class Game:
             else:
                 game['computed_status'] = game['status']
 
-            game['has_results'] = game['result_count'] > 0 or game.get('published', False)
-            game['has_startlist'] = bool(game.get('start_file')) or game['startlist_count'] > 0 or game[
-                'has_startlist_file']
-            game['is_published'] = game.get('published', False)
-            game['has_alerts'] = game['id'] in alert_game_ids
-            game['result_is_complete'] = game['result_count'] >= game['nb_athletes']
-            game['startlist_is_complete'] = game['startlist_count'] >= game['nb_athletes']
-
-            pdf_fields = ['manual_startlist_pdf', 'generated_startlist_pdf', 'manual_results_pdf',
-                          'generated_results_pdf']
-            for field in pdf_fields:
-                if field not in game:
-                    game[field] = None
+            games.append(game)
 
         return games
 
+    @staticmethod
+    def _load_status_rows():
+        games = execute_query(GAME_STATUS_SELECT + " ORDER BY g.day, g.time", fetch=True)
+        return [Game._prepare_status_row(game) for game in games]
+
+    @staticmethod
+    def _prepare_status_row(game):
+        game['classes_list'] = [c.strip() for c in game['classes'].split(',')]
+        game['genders_list'] = [g.strip() for g in game['genders'].split(',')]
+        game['startlist_published'] = game.get('startlist_published', False)
+        game['has_results'] = game['result_count'] > 0 or game.get('published', False)
+        game['has_startlist'] = bool(game.get('start_file')) or game['startlist_count'] > 0 or game[
+            'has_startlist_file']
+        game['is_published'] = game.get('published', False)
+        game['result_is_complete'] = game['result_count'] >= game['nb_athletes']
+        game['startlist_is_complete'] = game['startlist_count'] >= game['nb_athletes']
+
+        pdf_fields = ['manual_startlist_pdf', 'generated_startlist_pdf', 'manual_results_pdf',
+                      'generated_results_pdf']
+        for field in pdf_fields:
+            if field not in game:
+                game[field] = None
+
+        return game
+
+    @staticmethod
+    def get_export_fingerprints():
+        # Empreinte par épreuve de tout ce que rendent /game/<id> et /game/<id>/startlist (séries regroupées)
+        rows = execute_query("""
+            WITH per_game AS (
+                SELECT g.id, g.heat_group_id, md5(
+                    row(g.*)::text
+                    || COALESCE((SELECT string_agg(row(r.*)::text || COALESCE(row(a.*)::text, ''), ',' ORDER BY r.id)
+                                 FROM results r LEFT JOIN athletes a ON a.sdms = r.athlete_sdms
+                                 WHERE r.game_id = g.id), '')
+                    || COALESCE((SELECT string_agg(row(t.*)::text, ',' ORDER BY t.id)
+                                 FROM attempts t JOIN results r ON r.id = t.result_id
+                                 WHERE r.game_id = g.id), '')
+                    || COALESCE((SELECT string_agg(row(s.*)::text || COALESCE(row(a.*)::text, ''), ',' ORDER BY s.id)
+                                 FROM startlist s LEFT JOIN athletes a ON a.sdms = s.athlete_sdms
+                                 WHERE s.game_id = g.id), '')
+                ) AS fingerprint
+                FROM games g
+            )
+            SELECT p.id,
+                   CASE WHEN p.heat_group_id IS NULL THEN p.fingerprint
+                        ELSE md5((SELECT string_agg(q.fingerprint, ',' ORDER BY q.id)
+                                  FROM per_game q WHERE q.heat_group_id = p.heat_group_id))
+                   END AS fingerprint
+            FROM per_game p
+        """, fetch=True)
+        return {row['id']: row['fingerprint'] for row in rows}
+
     @staticmethod
     def athlete_matches_game(athlete, game):
         if not athlete or not game:
@@ -284,17 +382,23 @@ class Game:
 
     @staticmethod
     def add_to_heat_group(game_id, heat_group_id, heat_number):
-        return execute_query(
-            "UPDATE games SET heat_group_id = %s, heat_number = %s WHERE id = %s",
-            (heat_group_id, heat_number, game_id)
-        )
+        with transaction():
+            affected = execute_query(
+                "UPDATE games SET heat_group_id = %s, heat_number = %s WHERE id = %s",
+                (heat_group_id, heat_number, game_id)
+            )
+            publish(GAME, game_id)
+        return affected
 
     @staticmethod
     def remove_from_heat_group(game_id):
-        return execute_query(
-            "UPDATE games SET heat_group_id = NULL, heat_number = NULL WHERE id = %s",
-            (game_id,)
-        )
+        with transaction():
+            affected = execute_query(
+                "UPDATE games SET heat_group_id = NULL, heat_number = NULL WHERE id = %s",
+                (game_id,)
+            )
+            publish(GAME, game_id)
+        return affected
 
     @staticmethod
     def get_heat_siblings(game):
@@ -307,18 +411,23 @@ class Game:
         """, (game['heat_group_id'], game['id']), fetch=True)
 
     @staticmethod
-    def update_generated_pdfs(game_id, startlist_pdf=None, results_pdf=None):
+    def update_generated_pdfs(game_id, startlist_pdf=None, results_pdf=None, startlist_hash=None, results_hash=None):
         data = {}
         if startlist_pdf:
             data['generated_startlist_pdf'] = startlist_pdf
+            data['generated_startlist_pdf_hash'] = startlist_hash
         if results_pdf:
             data['generated_results_pdf'] = results_pdf
+            data['generated_results_pdf_hash'] = results_hash
 
         if data:
             set_clause = ', '.join([f"{k} = %s" for k in data.keys()])
             query = f"UPDATE games SET {set_clause} WHERE id = %s"
             params = list(data.values()) + [game_id]
-            return execute_query(query, params)
+            with transaction():
+                affected = execute_query(query, params)
+                publish(GAME, game_id)
+            return affected
         return False
 
     @staticmethod
@@ -333,7 +442,10 @@ class Game:
             set_clause = ', '.join([f"{k} = %s" for k in data.keys()])
             query = f"UPDATE games SET {set_clause} WHERE id = %s"
             params = list(data.values()) + [game_id]
-            return execute_query(query, params)
+            with transaction():
+                affected = execute_query(query, params)
+                publish(GAME, game_id)
+            return affected
         return False
 
     @staticmethod
@@ -362,6 +474,7 @@ class Game:
         if current:
             new_status = not current.get('startlist_published', False)
             execute_query("UPDATE games SET startlist_published = %s WHERE id = %s", (new_status, id))
+            publish(GAME, id)
             return new_status
         return False
 
@@ -380,5 +493,41 @@ class Game:
                     "UPDATE games SET corrected = %s, corrected_by = NULL, corrected_date = NULL WHERE id = %s",
                     (new_status, id)
                 )
+            publish(GAME, id)
             return new_status
-        return False
\ No newline at end of file
+        return False
+
+
+# Lignes de get_with_status et facettes partagées par le process pendant GAME_STATUS_CACHE_TTL secondes ;
+# le statut calculé (dépend de l'heure) est recalculé à chaque appel sur une copie.
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_cached(name, loader):
+    cached = _cache.get(name)
+    if cached is not None and time.monotonic() < cached['expires_at']:
+        return cached['value']
+    with _cache_lock:
+        cached = _cache.get(name)
+        if cached is None or time.monotonic() >= cached['expires_at']:
+            cached = {'value': loader(), 'expires_at': time.monotonic() + Config.GAME_STATUS_CACHE_TTL}
+            _cache[name] = cached
+    return cached['value']
+
+
+def get_status_rows():
+    return get_cached('status_rows', Game._load_status_rows)
+
+
+def invalidate_status_cache(event=None):
+    _cache.clear()
+
+
+def _contains_pattern(text):
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+for _kind in (GAME, ATHLETE, RESULTS):
+    subscribe(_kind, invalidate_status_cache)
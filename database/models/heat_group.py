@@ -1,5 +1,7 @@
 from config import config
-from database.db_manager import execute_one, execute_query
+from database.db_manager import execute_one, execute_query, transaction
+from database.invalidation import GAME, publish
+from database.models.result import Result, RECORD_FLAGS_JOIN
 
 class HeatGroup:
     @staticmethod
@@ -18,8 +20,10 @@ class HeatGroup:
 
     @staticmethod
     def delete(id):
-        execute_query("UPDATE games SET heat_group_id = NULL, heat_number = NULL WHERE heat_group_id = %s", (id,))
-        return execute_query("DELETE FROM heat_groups WHERE id = %s", (id,))
+        with transaction():
+            execute_query("UPDATE games SET heat_group_id = NULL, heat_number = NULL WHERE heat_group_id = %s", (id,))
+            publish(GAME)
+            return execute_query("DELETE FROM heat_groups WHERE id = %s", (id,))
 
     @staticmethod
     def get_games(heat_group_id):
@@ -29,9 +33,23 @@ class HeatGroup:
             ORDER BY heat_number
         """, (heat_group_id,), fetch=True)
 
+    @staticmethod
+    def get_games_by_groups(heat_group_ids):
+        games_by_group = {heat_group_id: [] for heat_group_id in heat_group_ids}
+        if not games_by_group:
+            return games_by_group
+        games = execute_query("""
+            SELECT * FROM games 
+            WHERE heat_group_id = ANY(%s) 
+            ORDER BY heat_group_id, heat_number
+        """, (list(games_by_group),), fetch=True)
+        for game in games:
+            games_by_group.setdefault(game['heat_group_id'], []).append(game)
+        return games_by_group
+
     @staticmethod
     def get_combined_results(heat_group_id):
-        query = """
+        query = f"""
             SELECT r.*, a.firstname, a.lastname, a.npc, a.gender as athlete_gender, 
                    a.class as athlete_class,
                    g.firstname AS guide_firstname, g.lastname AS guide_lastname,
@@ -44,74 +62,12 @@ class HeatGroup:
                        WHEN gm.id = (SELECT MAX(id) FROM games WHERE heat_group_id = %s) THEN 2
                        ELSE 1
                    END as heat_number,
-
-                   -- Check for World Record
-                   CASE WHEN EXISTS (
-                       SELECT 1 FROM world_records wr 
-                       WHERE wr.sdms = r.athlete_sdms 
-                       AND wr.event = gm.event 
-                       AND wr.athlete_class = ANY(string_to_array(a.class, ','))
-                       AND wr.gender = a.gender
-                       AND wr.record_type = 'WR'
-                       AND wr.competition_id = r.game_id
-                   ) THEN TRUE ELSE FALSE END as is_world_record,
-
-                   -- Check WR approval status
-                   (SELECT wr.approved FROM world_records wr 
-                    WHERE wr.sdms = r.athlete_sdms AND wr.event = gm.event 
-                    AND wr.athlete_class = ANY(string_to_array(a.class, ','))
-                    AND wr.gender = a.gender
-                    AND wr.record_type = 'WR' AND wr.competition_id = r.game_id
-                    LIMIT 1) as wr_approved,
-
-                   -- Check for Area Record
-                   CASE WHEN EXISTS (
-                       SELECT 1 FROM world_records wr 
-                       JOIN npcs n ON wr.npc = n.code
-                       WHERE wr.sdms = r.athlete_sdms 
-                       AND wr.event = gm.event 
-                       AND wr.athlete_class = ANY(string_to_array(a.class, ','))
-                       AND wr.gender = a.gender
-                       AND wr.record_type = 'AR'
-                       AND wr.competition_id = r.game_id
-                   ) THEN TRUE ELSE FALSE END as is_area_record,
-
-                   -- Get AR region and approval status
-                   (SELECT n.region_code FROM world_records wr 
-                    JOIN npcs n ON wr.npc = n.code
-                    WHERE wr.sdms = r.athlete_sdms AND wr.event = gm.event 
-                    AND wr.athlete_class = ANY(string_to_array(a.class, ','))
-                    AND wr.gender = a.gender
-                    AND wr.record_type = 'AR' AND wr.competition_id = r.game_id
-                    LIMIT 1) as ar_region,
-
-                   (SELECT wr.approved FROM world_records wr 
-                    WHERE wr.sdms = r.athlete_sdms AND wr.event = gm.event 
-                    AND wr.athlete_class = ANY(string_to_array(a.class, ','))
-                    AND wr.gender = a.gender
-                    AND wr.record_type = 'AR' AND wr.competition_id = r.game_id
-                    LIMIT 1) as ar_approved,
-
-                   -- Check for Personal Best
-                   CASE WHEN EXISTS (
-                       SELECT 1 FROM personal_bests pb 
-                       WHERE pb.sdms = r.athlete_sdms 
-                       AND pb.event = gm.event 
-                       AND pb.athlete_class = ANY(string_to_array(a.class, ','))
-                       AND pb.competition_id = r.game_id
-                   ) THEN TRUE ELSE FALSE END as is_personal_best,
-
-                   -- Check PB approval status
-                   (SELECT pb.approved FROM personal_bests pb 
-                    WHERE pb.sdms = r.athlete_sdms AND pb.event = gm.event 
-                    AND pb.athlete_class = ANY(string_to_array(a.class, ','))
-                    AND pb.competition_id = r.game_id
-                    LIMIT 1) as pb_approved
-
+                   rf.*
             FROM results r
             JOIN athletes a ON r.athlete_sdms = a.sdms
             LEFT JOIN athletes g ON r.guide_sdms = g.sdms
             JOIN games gm ON r.game_id = gm.id
+            {RECORD_FLAGS_JOIN}
             WHERE gm.heat_group_id = %s
             ORDER BY 
                 CASE WHEN r.rank ~ '^[0-9]+' THEN CAST(r.rank AS INTEGER) ELSE 999 END,
@@ -146,15 +102,13 @@ class HeatGroup:
         current_rank = 1
         previous_value = None
         athletes_at_current_rank = 0
+        ranks = []
 
         for i, result in enumerate(results):
-            print(f"Processing result ID {result['id']} with value {result['value']}")
             current_value = result['value']
 
             if current_value in special_values:
-                execute_query("UPDATE results SET rank = %s WHERE id = %s",
-                              ('-', result['id']))
-                print(f"✓ Special value, rank set to '-'")
+                ranks.append((result['id'], '-'))
                 continue
 
             if previous_value is not None and current_value != previous_value:
@@ -163,10 +117,9 @@ class HeatGroup:
             else:
                 athletes_at_current_rank += 1
 
-            execute_query("UPDATE results SET rank = %s WHERE id = %s",
-                          (str(current_rank), result['id']))
-
-            print(f"✓ Rank {current_rank} assigned (athletes at this rank: {athletes_at_current_rank})")
+            ranks.append((result['id'], str(current_rank)))
             previous_value = current_value
 
+        Result.update_ranks(ranks)
+        print(f"✓ {len(ranks)} ranks assigned for heat group {heat_group_id}")
         return True
\ No newline at end of file
@@ -0,0 +1,103 @@
+import json
+from config import Config
+from database.db_manager import execute_one, execute_query, transaction
+
+
+class Job:
+    @staticmethod
+    def enqueue(kind, params=None, user_id=None):
+        # Renvoie l'id du travail ; si le même travail (type + paramètres) est déjà en file ou en cours, c'est le sien
+        params = json.dumps(params or {}, sort_keys=True)
+        while True:
+            with transaction():
+                created = execute_query("""
+                    INSERT INTO jobs (kind, params, created_by) VALUES (%s, %s::jsonb, %s)
+                    ON CONFLICT (kind, params) WHERE status IN ('queued', 'running') DO NOTHING
+                    RETURNING id
+                """, (kind, params, user_id))
+                if created:
+                    return created['id']
+                existing = execute_one("""
+                    SELECT id FROM jobs
+                    WHERE kind = %s AND params = %s::jsonb AND status IN ('queued', 'running')
+                """, (kind, params))
+            if existing:
+                return existing['id']
+            # Le travail en conflit s'est terminé entre l'INSERT et le SELECT : on réessaie l'insertion
+
+    @staticmethod
+    def claim_next():
+        # SKIP LOCKED : plusieurs workers se partagent la file sans jamais prendre le même travail.
+        # Un travail 'running' sans heartbeat depuis JOB_STALE_SECONDS (worker tué) est repris, jusqu'à JOB_MAX_ATTEMPTS fois.
+        with transaction():
+            execute_query("""
+                UPDATE jobs SET status = 'failed', error = 'Worker lost', finished_at = CURRENT_TIMESTAMP
+                WHERE status = 'running' AND heartbeat_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+                AND attempts >= %s
+            """, (Config.JOB_STALE_SECONDS, Config.JOB_MAX_ATTEMPTS))
+            claimed = execute_query("""
+                UPDATE jobs SET status = 'running', attempts = attempts + 1, error = NULL,
+                       started_at = CURRENT_TIMESTAMP, heartbeat_at = CURRENT_TIMESTAMP
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE status = 'queued'
+                    OR (status = 'running' AND heartbeat_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+                        AND attempts < %s)
+                    ORDER BY id
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING *
+            """, (Config.JOB_STALE_SECONDS, Config.JOB_MAX_ATTEMPTS), fetch=True)
+        return claimed[0] if claimed else None
+
+    # attempt : valeur de jobs.attempts lors de la prise du travail. Si le travail a été repris entre-temps
+    # (heartbeat perdu), les écritures de l'ancienne exécution ne touchent plus la ligne.
+    @staticmethod
+    def heartbeat(job_id, attempt):
+        return execute_query("""
+            UPDATE jobs SET heartbeat_at = CURRENT_TIMESTAMP
+            WHERE id = %s AND attempts = %s AND status = 'running'
+        """, (job_id, attempt))
+
+    @staticmethod
+    def update_progress(job_id, done, total=None, message=None, attempt=None):
+        return execute_query("""
+            UPDATE jobs SET progress_done = %s, progress_total = COALESCE(%s, progress_total),
+                   message = COALESCE(%s, message), heartbeat_at = CURRENT_TIMESTAMP
+            WHERE id = %s AND (%s IS NULL OR attempts = %s)
+        """, (done, total, message, job_id, attempt, attempt))
+
+    @staticmethod
+    def complete(job_id, result=None, attempt=None):
+        return execute_query("""
+            UPDATE jobs SET status = 'succeeded', result = %s::jsonb, finished_at = CURRENT_TIMESTAMP,
+                   progress_done = COALESCE(progress_total, progress_done)
+            WHERE id = %s AND (%s IS NULL OR attempts = %s)
+        """, (json.dumps(result or {}, default=str), job_id, attempt, attempt))
+
+    @staticmethod
+    def fail(job_id, error, attempt=None):
+        return execute_query("""
+            UPDATE jobs SET status = 'failed', error = %s, finished_at = CURRENT_TIMESTAMP
+            WHERE id = %s AND (%s IS NULL OR attempts = %s)
+        """, (error, job_id, attempt, attempt))
+
+    @staticmethod
+    def get_by_id(job_id):
+        return execute_one("""
+            SELECT j.*, u.username AS created_by_username
+            FROM jobs j
+            LEFT JOIN users u ON j.created_by = u.id
+            WHERE j.id = %s
+        """, (job_id,))
+
+    @staticmethod
+    def get_recent(limit=50):
+        return execute_query("""
+            SELECT j.*, u.username AS created_by_username
+            FROM jobs j
+            LEFT JOIN users u ON j.created_by = u.id
+            ORDER BY j.id DESC
+            LIMIT %s
+        """, (limit,), fetch=True)
@@ -1,4 +1,5 @@
-from database.db_manager import execute_query, execute_one
+from database.db_manager import execute_query, execute_one, transaction
+from database.invalidation import MEDALS, publish
 
 class Medal:
     @staticmethod
@@ -26,8 +27,6 @@ class Medal:
 
     @staticmethod
     def calculate_from_results():
-        execute_query("DELETE FROM medals WHERE manual_override = FALSE")
-
         query = """
         INSERT INTO medals (npc, gold, silver, bronze, total, manual_override, last_calculated)
         SELECT 
@@ -51,7 +50,11 @@ class Medal:
             last_calculated = EXCLUDED.last_calculated
         """
 
-        return execute_query(query)
+        with transaction():
+            execute_query("DELETE FROM medals WHERE manual_override = FALSE")
+            affected = execute_query(query)
+            publish(MEDALS)
+        return affected
 
     @staticmethod
     def update_manual(npc_code, gold, silver, bronze):
@@ -67,8 +70,14 @@ class Medal:
             manual_override = TRUE,
             updated_at = EXCLUDED.updated_at
         """
-        return execute_query(query, (npc_code, gold, silver, bronze, total))
+        with transaction():
+            affected = execute_query(query, (npc_code, gold, silver, bronze, total))
+            publish(MEDALS, npc_code)
+        return affected
 
     @staticmethod
     def delete_by_npc(npc_code):
-        return execute_query("DELETE FROM medals WHERE npc = %s", (npc_code,))
\ No newline at end of file
+        with transaction():
+            affected = execute_query("DELETE FROM medals WHERE npc = %s", (npc_code,))
+            publish(MEDALS, npc_code)
+        return affected
\ No newline at end of file
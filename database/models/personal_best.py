@@ -1,4 +1,5 @@
-from database.db_manager import execute_one, execute_query
+from database.db_manager import execute_one, execute_query, transaction
+from database.invalidation import RECORDS, publish
 
 
 class PersonalBest:
@@ -51,6 +52,15 @@ class PersonalBest:
         """
         return execute_query(query, fetch=True)
 
+    @staticmethod
+    def count_pending(competition_only=True):
+        # Compteur du badge admin : servi par l'index partiel sur approved = FALSE (migration 008)
+        query = "SELECT COUNT(*) AS count FROM personal_bests WHERE approved = FALSE"
+        if competition_only:
+            query += " AND made_in_competition = TRUE"
+        result = execute_one(query)
+        return result['count'] if result else 0
+
     @staticmethod
     def get_pending_for_athlete(sdms, event, athlete_class):
         return execute_one("""
@@ -75,29 +85,38 @@ class PersonalBest:
             competition_id = EXCLUDED.competition_id
             RETURNING id
         """
-        result = execute_query(query, list(data.values()))
+        with transaction():
+            result = execute_query(query, list(data.values()))
+            publish(RECORDS)
         return result['id'] if result else None
 
     @staticmethod
     def approve(record_id, user_id):
-        return execute_query("""
-            UPDATE personal_bests 
-            SET approved = TRUE, approved_by = %s, approved_date = CURRENT_TIMESTAMP 
-            WHERE id = %s
-        """, (user_id, record_id))
+        with transaction():
+            affected = execute_query("""
+                UPDATE personal_bests 
+                SET approved = TRUE, approved_by = %s, approved_date = CURRENT_TIMESTAMP 
+                WHERE id = %s
+            """, (user_id, record_id))
+            publish(RECORDS)
+        return affected
 
     @staticmethod
     def approve_all(user_id):
-        result = execute_query("""
-            UPDATE personal_bests 
-            SET approved = TRUE, approved_by = %s, approved_date = CURRENT_TIMESTAMP 
-            WHERE approved = FALSE
-        """, (user_id,))
+        with transaction():
+            result = execute_query("""
+                UPDATE personal_bests 
+                SET approved = TRUE, approved_by = %s, approved_date = CURRENT_TIMESTAMP 
+                WHERE approved = FALSE
+            """, (user_id,))
+            publish(RECORDS)
         return result if result else 0
 
     @staticmethod
     def delete_all_pending():
-        result = execute_query("DELETE FROM personal_bests WHERE approved = FALSE and made_in_competition = TRUE")
+        with transaction():
+            result = execute_query("DELETE FROM personal_bests WHERE approved = FALSE and made_in_competition = TRUE")
+            publish(RECORDS)
         return result if result else 0
 
     @staticmethod
@@ -111,7 +130,10 @@ class PersonalBest:
 
     @staticmethod
     def delete(record_id):
-        return execute_query("DELETE FROM personal_bests WHERE id = %s", (record_id,))
+        with transaction():
+            affected = execute_query("DELETE FROM personal_bests WHERE id = %s", (record_id,))
+            publish(RECORDS)
+        return affected
 
     @staticmethod
     def get_by_athlete(sdms, approved_only=True):
@@ -254,7 +276,10 @@ class PersonalBest:
         set_clause = ', '.join([f"{k} = %s" for k in data.keys()])
         query = f"UPDATE personal_bests SET {set_clause} WHERE id = %s"
         params = list(data.values()) + [pb_id]
-        return execute_query(query, params)
+        with transaction():
+            affected = execute_query(query, params)
+            publish(RECORDS)
+        return affected
 
     @staticmethod
     def get_by_id(pb_id):
@@ -331,7 +356,10 @@ class PersonalBest:
             WHERE id IN ({placeholders})
         """
         params = [user_id] + list(pb_ids)
-        return execute_query(query, params)
+        with transaction():
+            affected = execute_query(query, params)
+            publish(RECORDS)
+        return affected
 
     @staticmethod
     def delete_multiple(pb_ids):
@@ -340,7 +368,10 @@ class PersonalBest:
 
         placeholders = ','.join(['%s'] * len(pb_ids))
         query = f"DELETE FROM personal_bests WHERE id IN ({placeholders})"
-        return execute_query(query, list(pb_ids))
+        with transaction():
+            affected = execute_query(query, list(pb_ids))
+            publish(RECORDS)
+        return affected
 
     @staticmethod
     def check_for_better_performance(sdms, event, athlete_class, performance):
@@ -513,8 +544,11 @@ class PersonalBest:
     @staticmethod
     def bulk_approve_by_competition(competition_id, user_id):
         """Approve all pending PBs from a specific competition"""
-        return execute_query("""
-            UPDATE personal_bests 
-            SET approved = TRUE, approved_by = %s, approved_date = CURRENT_TIMESTAMP 
-            WHERE competition_id = %s AND approved = FALSE
-        """, (user_id, competition_id))
\ No newline at end of file
+        with transaction():
+            affected = execute_query("""
+                UPDATE personal_bests 
+                SET approved = TRUE, approved_by = %s, approved_date = CURRENT_TIMESTAMP 
+                WHERE competition_id = %s AND approved = FALSE
+            """, (user_id, competition_id))
+            publish(RECORDS)
+        return affected
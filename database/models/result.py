@@ -1,6 +1,60 @@
 import traceback
 from config import Config
-from database.db_manager import execute_query, execute_one
+from database.db_manager import execute_query, execute_one, transaction
+from database.invalidation import RESULTS, publish
+
+# Drapeaux WR/AR/PB d'un résultat, agrégés en une seule passe (alias attendus : r, a, gm)
+RECORD_FLAGS_JOIN = """
+    LEFT JOIN LATERAL (
+        SELECT COALESCE(BOOL_OR(f.kind = 'WR'), FALSE) AS is_world_record,
+               (ARRAY_AGG(f.approved) FILTER (WHERE f.kind = 'WR'))[1] AS wr_approved,
+               COALESCE(BOOL_OR(f.kind = 'AR' AND f.npc_code IS NOT NULL), FALSE) AS is_area_record,
+               (ARRAY_AGG(f.region_code) FILTER (WHERE f.kind = 'AR' AND f.npc_code IS NOT NULL))[1] AS ar_region,
+               (ARRAY_AGG(f.approved) FILTER (WHERE f.kind = 'AR'))[1] AS ar_approved,
+               COALESCE(BOOL_OR(f.kind = 'PB'), FALSE) AS is_personal_best,
+               (ARRAY_AGG(f.approved) FILTER (WHERE f.kind = 'PB'))[1] AS pb_approved
+        FROM (
+            SELECT wr.record_type AS kind, wr.approved, n.code AS npc_code, n.region_code
+            FROM world_records wr
+            LEFT JOIN npcs n ON wr.npc = n.code
+            WHERE wr.sdms = r.athlete_sdms
+            AND wr.competition_id = r.game_id
+            AND wr.event = gm.event
+            AND wr.gender = a.gender
+            AND wr.record_type IN ('WR', 'AR')
+            AND wr.athlete_class IN (SELECT ac.class_name FROM athlete_classes ac WHERE ac.sdms = a.sdms)
+            UNION ALL
+            SELECT 'PB', pb.approved, NULL, NULL
+            FROM personal_bests pb
+            WHERE pb.sdms = r.athlete_sdms
+            AND pb.competition_id = r.game_id
+            AND pb.event = gm.event
+            AND pb.athlete_class IN (SELECT ac.class_name FROM athlete_classes ac WHERE ac.sdms = a.sdms)
+        ) f
+    ) rf ON TRUE
+"""
+
+# Résultats enrichis (athlète, guide, épreuve, drapeaux de records), partagés par get_all et get_all_by_games
+RESULTS_SELECT = f"""
+            SELECT r.*, a.firstname, a.lastname, a.npc, a.gender as athlete_gender, 
+                   a.class as athlete_class,
+                   g.firstname AS guide_firstname, g.lastname AS guide_lastname,
+                   gm.classes as game_classes, gm.event as game_event,
+                   rf.*
+            FROM results r
+            JOIN athletes a ON r.athlete_sdms = a.sdms
+            LEFT JOIN athletes g ON r.guide_sdms = g.sdms
+            LEFT JOIN games gm ON r.game_id = gm.id
+            {RECORD_FLAGS_JOIN}
+"""
+RANK_ORDER = "CASE WHEN r.rank ~ '^[0-9]+' THEN CAST(r.rank AS INTEGER) ELSE 999 END, r.rank"
+
+
+def performance_of(row):
+    # Performance numérique (secondes ou mètres) d'un résultat ou d'un essai, None si value_status n'est pas OK
+    if row.get('value_status') != 'OK' or row.get('value_numeric') is None:
+        return None
+    return float(row['value_numeric'])
 
 
 class Result:
@@ -16,84 +70,49 @@ class Result:
                     params.append(value)
 
         query = f"""
-            SELECT r.*, a.firstname, a.lastname, a.npc, a.gender as athlete_gender, 
-                   a.class as athlete_class,
-                   g.firstname AS guide_firstname, g.lastname AS guide_lastname,
-                   gm.classes as game_classes, gm.event as game_event,
-
-                   -- Check for World Record
-                   CASE WHEN EXISTS (
-                       SELECT 1 FROM world_records wr 
-                       WHERE wr.sdms = r.athlete_sdms 
-                       AND wr.event = gm.event 
-                       AND wr.athlete_class = ANY(string_to_array(a.class, ','))
-                       AND wr.gender = a.gender
-                       AND wr.record_type = 'WR'
-                       AND wr.competition_id = r.game_id
-                   ) THEN TRUE ELSE FALSE END as is_world_record,
-
-                   -- Check WR approval status
-                   (SELECT wr.approved FROM world_records wr 
-                    WHERE wr.sdms = r.athlete_sdms AND wr.event = gm.event 
-                    AND wr.athlete_class = ANY(string_to_array(a.class, ','))
-                    AND wr.gender = a.gender
-                    AND wr.record_type = 'WR' AND wr.competition_id = r.game_id
-                    LIMIT 1) as wr_approved,
-
-                   -- Check for Area Record
-                   CASE WHEN EXISTS (
-                       SELECT 1 FROM world_records wr 
-                       JOIN npcs n ON wr.npc = n.code
-                       WHERE wr.sdms = r.athlete_sdms 
-                       AND wr.event = gm.event 
-                       AND wr.athlete_class = ANY(string_to_array(a.class, ','))
-                       AND wr.gender = a.gender
-                       AND wr.record_type = 'AR'
-                       AND wr.competition_id = r.game_id
-                   ) THEN TRUE ELSE FALSE END as is_area_record,
-
-                   -- Get AR region and approval status
-                   (SELECT n.region_code FROM world_records wr 
-                    JOIN npcs n ON wr.npc = n.code
-                    WHERE wr.sdms = r.athlete_sdms AND wr.event = gm.event 
-                    AND wr.athlete_class = ANY(string_to_array(a.class, ','))
-                    AND wr.gender = a.gender
-                    AND wr.record_type = 'AR' AND wr.competition_id = r.game_id
-                    LIMIT 1) as ar_region,
-
-                   (SELECT wr.approved FROM world_records wr 
-                    WHERE wr.sdms = r.athlete_sdms AND wr.event = gm.event 
-                    AND wr.athlete_class = ANY(string_to_array(a.class, ','))
-                    AND wr.gender = a.gender
-                    AND wr.record_type = 'AR' AND wr.competition_id = r.game_id
-                    LIMIT 1) as ar_approved,
-
-                   -- Check for Personal Best
-                   CASE WHEN EXISTS (
-                       SELECT 1 FROM personal_bests pb 
-                       WHERE pb.sdms = r.athlete_sdms 
-                       AND pb.event = gm.event 
-                       AND pb.athlete_class = ANY(string_to_array(a.class, ','))
-                       AND pb.competition_id = r.game_id
-                   ) THEN TRUE ELSE FALSE END as is_personal_best,
-
-                   -- Check PB approval status
-                   (SELECT pb.approved FROM personal_bests pb 
-                    WHERE pb.sdms = r.athlete_sdms AND pb.event = gm.event 
-                    AND pb.athlete_class = ANY(string_to_array(a.class, ','))
-                    AND pb.competition_id = r.game_id
-                    LIMIT 1) as pb_approved
-
-            FROM results r
-            JOIN athletes a ON r.athlete_sdms = a.sdms
-            LEFT JOIN athletes g ON r.guide_sdms = g.sdms
-            LEFT JOIN games gm ON r.game_id = gm.id
+            {RESULTS_SELECT}
             WHERE {' AND '.join(conditions)}
-            ORDER BY CASE WHEN r.rank ~ '^[0-9]+' THEN CAST(r.rank AS INTEGER) ELSE 999 END, r.rank
+            ORDER BY {RANK_ORDER}
         """
 
-        results = execute_query(query, params, fetch=True)
+        results = Result._with_class_lists(execute_query(query, params, fetch=True))
+
+        if results and filters.get('game_id'):
+            # Toutes les lignes partagent le même game : gm.event suffit, pas besoin de recharger le game
+            if results[0]['game_event'] in Config.get_field_events():
+                from database.models.attempt import Attempt
+                attempts_by_result = Attempt.get_by_results([result['id'] for result in results])
+                for result in results:
+                    result['attempts'] = attempts_by_result.get(result['id'], [])
+
+        return results
 
+    @staticmethod
+    def get_all_by_games(game_ids):
+        # Équivalent de get_all(game_id=...) pour plusieurs épreuves en deux requêtes, groupé par game_id
+        results_by_game = {game_id: [] for game_id in game_ids}
+        if not results_by_game:
+            return results_by_game
+        query = f"""
+            {RESULTS_SELECT}
+            WHERE r.game_id = ANY(%s)
+            ORDER BY r.game_id, {RANK_ORDER}
+        """
+        results = Result._with_class_lists(execute_query(query, (list(results_by_game),), fetch=True))
+        field_events = Config.get_field_events()
+        field_result_ids = [result['id'] for result in results if result['game_event'] in field_events]
+        if field_result_ids:
+            from database.models.attempt import Attempt
+            attempts_by_result = Attempt.get_by_results(field_result_ids)
+            for result in results:
+                if result['id'] in attempts_by_result:
+                    result['attempts'] = attempts_by_result[result['id']]
+        for result in results:
+            results_by_game.setdefault(result['game_id'], []).append(result)
+        return results_by_game
+
+    @staticmethod
+    def _with_class_lists(results):
         for result in results:
             if result['athlete_class']:
                 result['athlete_classes'] = [c.strip() for c in result['athlete_class'].split(',')]
@@ -104,17 +123,6 @@ class Result:
                 result['game_classes_list'] = [c.strip() for c in result['game_classes'].split(',')]
             else:
                 result['game_classes_list'] = []
-
-        if results and filters.get('game_id'):
-            from database.models.game import Game
-            game = Game.get_by_id(filters['game_id'])
-            if game:
-                field_events = Config.get_field_events()
-                if game['event'] in field_events:
-                    from database.models.attempt import Attempt
-                    for result in results:
-                        result['attempts'] = Attempt.get_by_result(result['id'])
-
         return results
 
     @staticmethod
@@ -147,22 +155,77 @@ class Result:
         if 'weight' in data and data['weight'] is not None:
             data['weight'] = float(data['weight'])
 
+        if 'value' in data:
+            data['value_numeric'], data['value_status'] = Config.parse_performance(data['value'])
+
         keys = ', '.join(data.keys())
         placeholders = ', '.join(['%s'] * len(data))
         query = f"INSERT INTO results ({keys}) VALUES ({placeholders}) RETURNING id"
-        result = execute_query(query, list(data.values()))
+        with transaction():
+            result = execute_query(query, list(data.values()))
+            if result:
+                publish(RESULTS, data.get('game_id'))
         return result['id'] if result else None
 
     @staticmethod
     def update(id, **data):
+        if 'value' in data:
+            data['value_numeric'], data['value_status'] = Config.parse_performance(data['value'])
         set_clause = ', '.join([f"{k} = %s" for k in data.keys()])
         query = f"UPDATE results SET {set_clause} WHERE id = %s"
         params = list(data.values()) + [id]
-        return execute_query(query, params)
+        with transaction():
+            affected = execute_query(query, params)
+            Result.publish_change(id)
+        return affected
+
+    @staticmethod
+    def publish_change(id):
+        # Clé = game_id du résultat, pour que les caches par épreuve puissent évincer finement
+        row = execute_one("SELECT game_id FROM results WHERE id = %s", (id,))
+        publish(RESULTS, row['game_id'] if row else None)
+
+    @staticmethod
+    def update_ranks(ranks):
+        if not ranks:
+            return 0
+        values = ', '.join(['(%s::integer, %s)'] * len(ranks))
+        query = f"""
+            UPDATE results AS r SET rank = v.rank
+            FROM (VALUES {values}) AS v(id, rank)
+            WHERE r.id = v.id
+        """
+        params = [value for result_id, rank in ranks for value in (result_id, rank)]
+        with transaction():
+            affected = execute_query(query, params)
+            games = execute_query(
+                "SELECT DISTINCT game_id FROM results WHERE id = ANY(%s)",
+                ([int(result_id) for result_id, rank in ranks],), fetch=True
+            )
+            for game in games or []:
+                publish(RESULTS, game['game_id'])
+        return affected
 
     @staticmethod
     def delete(id):
-        return execute_query("DELETE FROM results WHERE id = %s", (id,))
+        with transaction():
+            Result.publish_change(id)
+            return execute_query("DELETE FROM results WHERE id = %s", (id,))
+
+    @staticmethod
+    def get_live_rows(game_id):
+        # Colonnes minimales pour les diffs SSE, sans les jointures records de get_all
+        return execute_query("""
+            SELECT r.id, r.athlete_sdms, r.rank, r.value, r.wind_velocity, r.raza_score, r.final_order,
+                   COALESCE(json_agg(json_build_object('number', t.attempt_number, 'value', t.value,
+                                                       'wind_velocity', t.wind_velocity, 'height', t.height)
+                                     ORDER BY t.attempt_number) FILTER (WHERE t.id IS NOT NULL), '[]') AS attempts
+            FROM results r
+            LEFT JOIN attempts t ON t.result_id = r.id
+            WHERE r.game_id = %s
+            GROUP BY r.id
+            ORDER BY r.id
+        """, (game_id,), fetch=True)
 
     @staticmethod
     def count_by_game(game_id):
@@ -185,146 +248,136 @@ class Result:
     @staticmethod
     def auto_rank_results(game_id):
         try:
-            from database.models.game import Game
-            game = Game.get_by_id(game_id)
-            if not game:
-                return False
-
-            results = execute_query("""
-                SELECT r.*, a.gender as athlete_gender, a.class as athlete_class
-                FROM results r
-                JOIN athletes a ON r.athlete_sdms = a.sdms
-                WHERE r.game_id = %s
-            """, (game_id,), fetch=True)
-
-            if not results:
-                return False
-
-            is_track = game['event'] in Config.get_track_events()
-            is_field = game['event'] in Config.get_field_events()
-            is_high_jump = game['event'] == 'High Jump'
-            use_wpa_points = game.get('wpa_points', False)
-            special_values = Config.get_result_special_values()
-
-            # Séparer les résultats valides des valeurs spéciales
-            valid_results = []
-            special_results = []
-
-            for result in results:
-                if result['value'] in special_values:
-                    special_results.append(result)
-                else:
-                    if is_field:
-                        attempts = execute_query("""
-                            SELECT value, height FROM attempts 
-                            WHERE result_id = %s 
-                            ORDER BY attempt_number
-                        """, (result['id'],), fetch=True)
-
-                        if is_high_jump:
-                            result['high_jump_stats'] = Result.calculate_high_jump_stats(attempts,
-                                                                                         float(result['value']))
-                        else:
-                            # Pour les autres épreuves de terrain, collecter tous les essais valides
-                            all_attempts = []
-                            for attempt in attempts:
-                                val = attempt['value']
-                                if val and str(val).strip() not in special_values:
-                                    try:
-                                        attempt_float = float(val)
-                                        all_attempts.append(attempt_float)
-                                    except (ValueError, TypeError):
-                                        pass
-                            all_attempts.sort(reverse=True)  # Tri décroissant (meilleur en premier)
-                            result['sorted_attempts'] = all_attempts
-
-                    valid_results.append(result)
-
-            if not valid_results:
-                # Si aucun résultat valide, marquer tous les résultats spéciaux avec rang "-"
-                for result in special_results:
-                    execute_query("UPDATE results SET rank = %s WHERE id = %s", ('-', result['id']))
-                return True
+            with transaction():
+                from database.models.game import Game
+                game = Game.get_by_id(game_id)
+                if not game:
+                    return False
+
+                results = execute_query("""
+                    SELECT r.*, a.gender as athlete_gender, a.class as athlete_class
+                    FROM results r
+                    JOIN athletes a ON r.athlete_sdms = a.sdms
+                    WHERE r.game_id = %s
+                """, (game_id,), fetch=True)
+
+                if not results:
+                    return False
+
+                is_track = game['event'] in Config.get_track_events()
+                is_field = game['event'] in Config.get_field_events()
+                is_high_jump = game['event'] == 'High Jump'
+                use_wpa_points = game.get('wpa_points', False)
+                special_values = Config.get_result_special_values()
+
+                # Séparer les résultats valides des valeurs spéciales
+                valid_results = []
+                special_results = []
+
+                attempts_by_result = {}
+                if is_field:
+                    from database.models.attempt import Attempt
+                    attempts_by_result = Attempt.get_by_results(
+                        [result['id'] for result in results if result['value'] not in special_values]
+                    )
 
-            def get_sort_key(result):
-                if use_wpa_points:
-                    # Utiliser RAZA score au lieu des performances brutes
-                    if result.get('raza_score_precise'):
-                        primary = -float(result['raza_score_precise'])  # Négatif car plus haut = meilleur
-                    elif result.get('raza_score'):
-                        primary = -float(result['raza_score'])
+                for result in results:
+                    if result['value'] in special_values:
+                        special_results.append(result)
                     else:
-                        primary = float('inf')  # Pas de score = dernière position
-                    return (primary,)
+                        if is_field:
+                            attempts = attempts_by_result.get(result['id'], [])
 
-                elif is_high_jump:
-                    try:
-                        max_height = float(result['value'])
+                            if is_high_jump:
+                                result['high_jump_stats'] = Result.calculate_high_jump_stats(attempts,
+                                                                                             performance_of(result))
+                            else:
+                                # Pour les autres épreuves de terrain, collecter tous les essais valides
+                                all_attempts = [performance_of(attempt) for attempt in attempts
+                                                if performance_of(attempt) is not None]
+                                all_attempts.sort(reverse=True)  # Tri décroissant (meilleur en premier)
+                                result['sorted_attempts'] = all_attempts
+
+                        valid_results.append(result)
+
+                if not valid_results:
+                    # Si aucun résultat valide, marquer tous les résultats spéciaux avec rang "-"
+                    Result.update_ranks([(result['id'], '-') for result in special_results])
+                    return True
+
+                def get_sort_key(result):
+                    if use_wpa_points:
+                        # Utiliser RAZA score au lieu des performances brutes
+                        if result.get('raza_score_precise'):
+                            primary = -float(result['raza_score_precise'])  # Négatif car plus haut = meilleur
+                        elif result.get('raza_score'):
+                            primary = -float(result['raza_score'])
+                        else:
+                            primary = float('inf')  # Pas de score = dernière position
+                        return (primary,)
+
+                    # value_numeric : secondes pour les temps "mm:ss.xx", None si la valeur n'est pas une performance
+                    performance = performance_of(result)
+                    if is_high_jump:
+                        if performance is None:
+                            return (float('inf'), 999, 999)
                         hj_stats = result.get('high_jump_stats', {})
-                        primary = -max_height  # Négatif car plus haut = meilleur
+                        primary = -performance  # Négatif car plus haut = meilleur
                         failures_at_max = hj_stats.get('failures_at_max_height', 999)
                         total_failures = hj_stats.get('total_failures', 999)
                         return (primary, failures_at_max, total_failures)
-                    except (ValueError, TypeError):
-                        return (float('inf'), 999, 999)
 
-                elif is_track:
-                    # Piste : temps le plus rapide (plus petit = meilleur)
-                    try:
-                        primary = float(result['value'])
-                        return (primary,)
-                    except (ValueError, TypeError):
-                        return (float('inf'),)
-
-                elif is_field:
-                    # Autres épreuves de terrain : meilleure performance puis tie-breakers
-                    try:
-                        primary = -float(result['value'])  # Négatif car plus grand = meilleur
-                    except (ValueError, TypeError):
-                        primary = float('inf')
-
-                    tie_breakers = []
-                    if 'sorted_attempts' in result:
-                        attempts = result['sorted_attempts']
-                        for i in range(6):  # Jusqu'à 6 essais
-                            if i < len(attempts):
-                                tie_breakers.append(-attempts[i])  # Négatif car plus grand = meilleur
-                            else:
-                                tie_breakers.append(float('inf'))  # Pas d'essai = pénalité
+                    elif is_track:
+                        # Piste : temps le plus rapide (plus petit = meilleur)
+                        return (performance if performance is not None else float('inf'),)
 
-                    return (primary, *tie_breakers)
+                    elif is_field:
+                        # Autres épreuves de terrain : meilleure performance puis tie-breakers
+                        primary = -performance if performance is not None else float('inf')  # Plus grand = meilleur
 
-                # Par défaut
-                return (float('inf'),)
+                        tie_breakers = []
+                        if 'sorted_attempts' in result:
+                            attempts = result['sorted_attempts']
+                            for i in range(6):  # Jusqu'à 6 essais
+                                if i < len(attempts):
+                                    tie_breakers.append(-attempts[i])  # Négatif car plus grand = meilleur
+                                else:
+                                    tie_breakers.append(float('inf'))  # Pas d'essai = pénalité
 
-            # Trier les résultats selon les critères
-            valid_results.sort(key=get_sort_key)
+                        return (primary, *tie_breakers)
 
-            # NOUVELLE LOGIQUE DE CLASSEMENT AVEC GESTION DES ÉGALITÉS
-            current_rank = 1
-            previous_sort_key = None
-            athletes_at_current_rank = 0
+                    # Par défaut
+                    return (float('inf'),)
 
-            for result in valid_results:
-                current_sort_key = get_sort_key(result)
+                # Trier les résultats selon les critères
+                valid_results.sort(key=get_sort_key)
 
-                # Si la performance/critères sont différents de la précédente
-                if previous_sort_key is not None and current_sort_key != previous_sort_key:
-                    current_rank += athletes_at_current_rank
-                    athletes_at_current_rank = 1
-                else:
-                    athletes_at_current_rank += 1
+                # NOUVELLE LOGIQUE DE CLASSEMENT AVEC GESTION DES ÉGALITÉS
+                current_rank = 1
+                previous_sort_key = None
+                athletes_at_current_rank = 0
+                ranks = []
 
-                # Assigner le rang
-                execute_query("UPDATE results SET rank = %s WHERE id = %s", (str(current_rank), result['id']))
+                for result in valid_results:
+                    current_sort_key = get_sort_key(result)
 
-                previous_sort_key = current_sort_key
+                    # Si la performance/critères sont différents de la précédente
+                    if previous_sort_key is not None and current_sort_key != previous_sort_key:
+                        current_rank += athletes_at_current_rank
+                        athletes_at_current_rank = 1
+                    else:
+                        athletes_at_current_rank += 1
 
-            # Traiter les valeurs spéciales (DNS, DNF, DQ, NM)
-            for result in special_results:
-                execute_query("UPDATE results SET rank = %s WHERE id = %s", ('-', result['id']))
+                    # Assigner le rang
+                    ranks.append((result['id'], str(current_rank)))
 
-            return True
+                    previous_sort_key = current_sort_key
+
+                # Traiter les valeurs spéciales (DNS, DNF, DQ, NM)
+                ranks.extend((result['id'], '-') for result in special_results)
+
+                Result.update_ranks(ranks)
+                return True
 
         except Exception as e:
             print(f"Error in auto_rank_results: {e}")
@@ -1,4 +1,5 @@
-from database.db_manager import execute_query, execute_one
+from database.db_manager import execute_query, execute_one, transaction
+from database.invalidation import GAME, publish
 
 
 class StartList:
@@ -23,19 +24,45 @@ class StartList:
 
         return startlist
 
+    @staticmethod
+    def get_by_games(game_ids):
+        # Start lists de plusieurs épreuves en une requête, groupées par game_id (même ordre que get_by_game)
+        startlists = {game_id: [] for game_id in game_ids}
+        if not startlists:
+            return startlists
+        query = """
+            SELECT s.*, a.firstname, a.lastname, a.npc, a.class, a.gender,
+                   g.firstname AS guide_firstname, g.lastname AS guide_lastname
+            FROM startlist s
+            JOIN athletes a ON s.athlete_sdms = a.sdms
+            LEFT JOIN athletes g ON s.guide_sdms = g.sdms
+            WHERE s.game_id = ANY(%s)
+            ORDER BY s.game_id, s.final_order IS NULL, s.final_order, s.lane_order, a.sdms
+        """
+        for entry in execute_query(query, (list(startlists),), fetch=True):
+            entry['classes'] = [c.strip() for c in entry['class'].split(',')] if entry['class'] else []
+            startlists.setdefault(entry['game_id'], []).append(entry)
+        return startlists
+
     @staticmethod
     def create(game_id, athlete_sdms, lane_order=None, guide_sdms=None):
-        return execute_query(
-            "INSERT INTO startlist (game_id, athlete_sdms, lane_order, guide_sdms) VALUES (%s, %s, %s, %s)",
-            (game_id, athlete_sdms, lane_order, guide_sdms)
-        )
+        with transaction():
+            affected = execute_query(
+                "INSERT INTO startlist (game_id, athlete_sdms, lane_order, guide_sdms) VALUES (%s, %s, %s, %s)",
+                (game_id, athlete_sdms, lane_order, guide_sdms)
+            )
+            publish(GAME, game_id)
+        return affected
 
     @staticmethod
     def delete(game_id, athlete_sdms):
-        return execute_query(
-            "DELETE FROM startlist WHERE game_id = %s AND athlete_sdms = %s",
-            (game_id, athlete_sdms)
-        )
+        with transaction():
+            affected = execute_query(
+                "DELETE FROM startlist WHERE game_id = %s AND athlete_sdms = %s",
+                (game_id, athlete_sdms)
+            )
+            publish(GAME, game_id)
+        return affected
 
     @staticmethod
     def has_startlist(game_id):
@@ -53,13 +80,6 @@ class StartList:
                              (game_id, athlete_sdms))
         return result is not None
 
-    @staticmethod
-    def athlete_has_compatible_class(athlete_classes, game_classes):
-        if not athlete_classes or not game_classes:
-            return False
-        game_class_list = [c.strip() for c in game_classes.split(',') if c.strip()]
-        return any(ac in game_class_list for ac in athlete_classes)
-
     @staticmethod
     def update_order_for_long_jump(game_id):
         from database.models.game import Game
@@ -74,11 +94,13 @@ class StartList:
         if len(results) < 3:
             return False
         results.sort(key=lambda x: float(x['best_performance']))
-        for i, result in enumerate(results):
-            execute_query(
-                "UPDATE startlist SET final_order = %s WHERE game_id = %s AND athlete_sdms = %s",
-                (i + 1, game_id, result['athlete_sdms'])
-            )
+        with transaction():
+            for i, result in enumerate(results):
+                execute_query(
+                    "UPDATE startlist SET final_order = %s WHERE game_id = %s AND athlete_sdms = %s",
+                    (i + 1, game_id, result['athlete_sdms'])
+                )
+            publish(GAME, game_id)
         return True
 
     @staticmethod
@@ -107,9 +129,11 @@ class StartList:
         if len(final_order_results) < 8:
             return False
         final_order_results.sort(key=lambda x: float(x['best_attempt'] or x['best_performance'] or 0))
-        for i, result in enumerate(final_order_results[:8]):
-            execute_query(
-                "UPDATE startlist SET final_order = %s WHERE game_id = %s AND athlete_sdms = %s",
-                (i + 1, game_id, result['athlete_sdms'])
-            )
+        with transaction():
+            for i, result in enumerate(final_order_results[:8]):
+                execute_query(
+                    "UPDATE startlist SET final_order = %s WHERE game_id = %s AND athlete_sdms = %s",
+                    (i + 1, game_id, result['athlete_sdms'])
+                )
+            publish(GAME, game_id)
         return True
\ No newline at end of file
@@ -1,4 +1,5 @@
-from database.db_manager import execute_one, execute_query
+from database.db_manager import execute_one, execute_query, transaction
+from database.invalidation import RECORDS, publish
 
 
 class WorldRecord:
@@ -51,6 +52,15 @@ class WorldRecord:
         """
         return execute_query(query, fetch=True)
 
+    @staticmethod
+    def count_pending(competition_only=True):
+        # Compteur du badge admin : servi par l'index partiel sur approved = FALSE (migration 008)
+        query = "SELECT COUNT(*) AS count FROM world_records WHERE approved = FALSE"
+        if competition_only:
+            query += " AND made_in_competition = TRUE"
+        result = execute_one(query)
+        return result['count'] if result else 0
+
     @staticmethod
     def get_pending_for_event_class(event, athlete_class, record_type, gender):
         return execute_one("""
@@ -75,29 +85,38 @@ class WorldRecord:
         keys = ', '.join(data.keys())
         placeholders = ', '.join(['%s'] * len(data))
         query = f"INSERT INTO world_records ({keys}) VALUES ({placeholders}) RETURNING id"
-        result = execute_query(query, list(data.values()))
+        with transaction():
+            result = execute_query(query, list(data.values()))
+            publish(RECORDS)
         return result['id'] if result else None
 
     @staticmethod
     def approve(record_id, user_id):
-        return execute_query("""
-            UPDATE world_records 
-            SET approved = TRUE, approved_by = %s, approved_date = CURRENT_TIMESTAMP 
-            WHERE id = %s
-        """, (user_id, record_id))
+        with transaction():
+            affected = execute_query("""
+                UPDATE world_records 
+                SET approved = TRUE, approved_by = %s, approved_date = CURRENT_TIMESTAMP 
+                WHERE id = %s
+            """, (user_id, record_id))
+            publish(RECORDS)
+        return affected
 
     @staticmethod
     def approve_all(user_id):
-        result = execute_query("""
-            UPDATE world_records 
-            SET approved = TRUE, approved_by = %s, approved_date = CURRENT_TIMESTAMP 
-            WHERE approved = FALSE
-        """, (user_id,))
+        with transaction():
+            result = execute_query("""
+                UPDATE world_records 
+                SET approved = TRUE, approved_by = %s, approved_date = CURRENT_TIMESTAMP 
+                WHERE approved = FALSE
+            """, (user_id,))
+            publish(RECORDS)
         return result if result else 0
 
     @staticmethod
     def delete_all_pending():
-        result = execute_query("DELETE FROM world_records WHERE approved = FALSE AND made_in_competition = TRUE")
+        with transaction():
+            result = execute_query("DELETE FROM world_records WHERE approved = FALSE AND made_in_competition = TRUE")
+            publish(RECORDS)
         return result if result else 0
 
     @staticmethod
@@ -122,7 +141,10 @@ class WorldRecord:
 
     @staticmethod
     def delete(record_id):
-        return execute_query("DELETE FROM world_records WHERE id = %s", (record_id,))
+        with transaction():
+            affected = execute_query("DELETE FROM world_records WHERE id = %s", (record_id,))
+            publish(RECORDS)
+        return affected
 
     @staticmethod
     def get_all_with_competition_details(approved_only=True):
@@ -289,7 +311,10 @@ class WorldRecord:
         set_clause = ', '.join([f"{k} = %s" for k in data.keys()])
         query = f"UPDATE world_records SET {set_clause} WHERE id = %s"
         params = list(data.values()) + [record_id]
-        return execute_query(query, params)
+        with transaction():
+            affected = execute_query(query, params)
+            publish(RECORDS)
+        return affected
 
     @staticmethod
     def get_by_id(record_id):
@@ -366,7 +391,10 @@ class WorldRecord:
             WHERE id IN ({placeholders})
         """
         params = [user_id] + list(record_ids)
-        return execute_query(query, params)
+        with transaction():
+            affected = execute_query(query, params)
+            publish(RECORDS)
+        return affected
 
     @staticmethod
     def delete_multiple(record_ids):
@@ -375,7 +403,10 @@ class WorldRecord:
 
         placeholders = ','.join(['%s'] * len(record_ids))
         query = f"DELETE FROM world_records WHERE id IN ({placeholders})"
-        return execute_query(query, list(record_ids))
+        with transaction():
+            affected = execute_query(query, list(record_ids))
+            publish(RECORDS)
+        return affected
 
     @staticmethod
     def check_for_better_performance(event, athlete_class, gender, record_type, performance, npc_code=None):
@@ -53,6 +53,45 @@ function setLoadingState(button, isLoading) {
   }
 }
 
+// Polls a background job until it finishes; resolves with the job, rejects with its error
+function waitForJob(statusUrl, onProgress, interval = 1000) {
+  return new Promise((resolve, reject) => {
+    const poll = () => {
+      fetch(statusUrl)
+        .then((response) => response.json())
+        .then((job) => {
+          if (job.status === 'succeeded') {
+            resolve(job);
+          } else if (job.status === 'failed' || job.error === 'Job not found') {
+            reject(new Error(job.error || 'Job failed'));
+          } else {
+            if (onProgress) onProgress(job);
+            setTimeout(poll, interval);
+          }
+        })
+        .catch(reject);
+    };
+    poll();
+  });
+}
+
+// Starts a background job with a POST and waits for it to finish
+function runJob(url, body = null, onProgress = null) {
+  return fetch(url, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'X-CSRFToken': getCSRFToken(),
+    },
+    body: body ? JSON.stringify(body) : null,
+  })
+    .then((response) => response.json())
+    .then((data) => {
+      if (!data.success) throw new Error(data.error || 'Could not start job');
+      return waitForJob(data.status_url, onProgress);
+    });
+}
+
 // Initializes event filter dropdown with available events
 function initializeEventFilter() {
   const eventFilterSelect = document.getElementById('eventFilter');
@@ -744,29 +783,14 @@ function recalculateRaza(gameIdParam) {
     const button = event.target;
     setLoadingState(button, true);
 
-    fetch(`/admin/games/${gameIdParam}/recalculate-raza`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-        'X-CSRFToken': getCSRFToken(),
-      },
-    })
-      .then((response) => response.json())
-      .then((data) => {
-        if (data.success) {
-          showNotification(
-            `WPA Points recalculated! Updated ${data.updated} results.`,
-            'success'
-          );
-          setTimeout(() => location.reload(), 1000);
-        } else {
-          showNotification('Error: ' + (data.error || 'Unknown error'), 'error');
-          setLoadingState(button, false);
-        }
+    runJob(`/admin/games/${gameIdParam}/recalculate-raza`)
+      .then((job) => {
+        showNotification(job.result.message, 'success');
+        setTimeout(() => location.reload(), 1000);
       })
       .catch((error) => {
         console.error('Error:', error);
-        showNotification('Error recalculating WPA Points', 'error');
+        showNotification('Error recalculating WPA Points: ' + error.message, 'error');
         setLoadingState(button, false);
       });
   }
@@ -1448,33 +1472,41 @@ function bulkGeneratePdfs(type) {
   if (confirm(`Generate all missing ${typeText} PDFs? This may take a while.`)) {
     showNotification(`Generating ${typeText} PDFs...`, 'info');
 
-    fetch('/admin/bulk-generate-pdfs', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-        'X-CSRFToken': getCSRFToken(),
-      },
-      body: JSON.stringify({ type: type }),
+    runJob('/admin/bulk-generate-pdfs', { type: type }, (job) => {
+      if (job.progress_total) {
+        showNotification(
+          `Generating ${typeText} PDFs... ${job.progress_done}/${job.progress_total}`,
+          'info'
+        );
+      }
     })
-      .then((response) => response.json())
-      .then((data) => {
-        if (data.success) {
-          showNotification(data.message, 'success');
-          setTimeout(() => location.reload(), 2000);
-        } else {
-          showNotification(
-            data.error || `Error generating ${typeText}`,
-            'error'
-          );
-        }
+      .then((job) => {
+        showNotification(job.result.message, 'success');
+        setTimeout(() => location.reload(), 2000);
       })
       .catch((error) => {
         console.error('Error:', error);
-        showNotification(`Error generating ${typeText}`, 'error');
+        showNotification(`Error generating ${typeText}: ${error.message}`, 'error');
       });
   }
 }
 
+// Merges all PDFs of a type in the background, then downloads the merged file
+function mergeAllPdfs(type) {
+  const typeText = type === 'startlists' ? 'start lists' : 'results';
+  showNotification(`Merging all ${typeText} PDFs...`, 'info');
+
+  runJob(`/admin/download-all-pdfs/${type}`)
+    .then((job) => {
+      showNotification(job.result.message, 'success');
+      window.location.href = job.download_url;
+    })
+    .catch((error) => {
+      console.error('Error:', error);
+      showNotification(`Error merging ${typeText}: ${error.message}`, 'error');
+    });
+}
+
 // Adds athlete to start list with optional guide
 function addAthleteToStartlist(gameId, athleteSdms, guideSdms = null) {
   if (confirm('Add this athlete to the start list?')) {
@@ -1637,6 +1669,9 @@ window.publishAutoStartlistPdf = publishAutoStartlistPdf;
 window.publishAutoResultsPdf = publishAutoResultsPdf;
 window.publishAutoPdfs = publishAutoPdfs;
 window.bulkGeneratePdfs = bulkGeneratePdfs;
+window.mergeAllPdfs = mergeAllPdfs;
+window.runJob = runJob;
+window.waitForJob = waitForJob;
 window.addAthleteToStartlist = addAthleteToStartlist;
 window.viewStartlistPdf = viewStartlistPdf;
 window.viewResultsPdf = viewResultsPdf;
@@ -1,11 +1,27 @@
 import os
+import tempfile
+import time
 from datetime import datetime
 
 from werkzeug.routing import ValidationError
 from werkzeug.utils import secure_filename
 from config import Config
+from database.invalidation import RECORDS, subscribe
 from flask import current_app
 import uuid
+def write_atomic(filepath, data):
+    # Fichier temporaire dans le même dossier puis rename : un lecteur ne voit jamais de fichier à moitié écrit
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filepath), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp crée en 0600 ; mêmes droits qu'un open() classique pour les fichiers servis
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
 def generate_filename(original_filename):
@@ -66,13 +82,28 @@ def validate_svg_file(form, field):
         filename = field.data.filename
         if filename and not filename.lower().endswith('.svg'):
             raise ValidationError('Only SVG files are allowed!')
+# Compteurs du badge admin, rendus sur chaque page : un COUNT indexé, gardé en mémoire jusqu'au prochain
+# événement RECORDS (création, approbation, suppression) ou au plus PENDING_COUNTS_CACHE_TTL secondes
+_pending_counts = None
+def get_pending_counts():
+    global _pending_counts
+    cached = _pending_counts
+    if cached is not None and time.monotonic() < cached['expires_at']:
+        return cached['counts']
+    from database.models.personal_best import PersonalBest
+    from database.models.world_record import WorldRecord
+    counts = {'records': WorldRecord.count_pending(), 'personal_bests': PersonalBest.count_pending()}
+    _pending_counts = {'counts': counts, 'expires_at': time.monotonic() + Config.PENDING_COUNTS_CACHE_TTL}
+    return counts
+def _reset_pending_counts(event):
+    global _pending_counts
+    _pending_counts = None
+subscribe(RECORDS, _reset_pending_counts)
 def get_pending_records_count():
     try:
         if not current_app:
             return 0
-        from database.models.world_record import WorldRecord
-        pending_records = WorldRecord.get_pending()
-        return len(pending_records) if pending_records else 0
+        return get_pending_counts()['records']
     except Exception as e:
         try:
             current_app.logger.warning(f"Error getting pending records count: {e}")
@@ -83,9 +114,7 @@ def get_pending_personal_bests_count():
     try:
         if not current_app:
             return 0
-        from database.models.personal_best import PersonalBest
-        pending_pbs = PersonalBest.get_pending()
-        return len(pending_pbs) if pending_pbs else 0
+        return get_pending_counts()['personal_bests']
     except Exception as e:
         try:
             current_app.logger.warning(f"Error getting pending personal bests count: {e}")
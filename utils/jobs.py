@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+import traceback
+from flask_login import login_user
+from config import Config
+from database.models import Job
+from database.models.user import User
+# File de travaux en base (table jobs, migration 009) : les routes admin mettent en file et répondent tout de suite,
+# un ou plusieurs process `flask jobs-worker` prennent les travaux avec FOR UPDATE SKIP LOCKED et publient
+# leur avancement dans la table, lu par /admin/jobs/<id>.
+JOB_HANDLERS = {}
+PROGRESS_INTERVAL = 0.5
+def job_handler(kind):
+    # handler(params, progress) -> dict stocké dans jobs.result ; progress(done, total=None, message=None)
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+@job_handler('bulk_pdfs')
+def _bulk_pdfs(params, progress):
+    from utils.pdf_bulk import generate_pdfs
+    stats = generate_pdfs(pdf_type=params.get('type', 'both'), on_progress=progress)
+    return dict(stats, message=f"{stats['generated']} PDFs generated successfully, {stats['unchanged']} unchanged")
+@job_handler('merge_pdfs')
+def _merge_pdfs(params, progress):
+    from utils.pdf_bulk import merge_pdfs
+    merged = merge_pdfs(params['type'], on_progress=progress)
+    return dict(merged, message=f"{merged['count']} {params['type']} PDFs merged")
+@job_handler('calculate_medals')
+def _calculate_medals(params, progress):
+    from database.models import Medal
+    Medal.calculate_from_results()
+    return {'message': 'Medals calculated successfully from official results'}
+@job_handler('recalculate_raza')
+def _recalculate_raza(params, progress):
+    from blueprints.admin.routes.results import recalculate_game_raza
+    result = recalculate_game_raza(params['game_id'])
+    return dict(result, message=f"WPA Points recalculated! Updated {result['updated']} results.")
+@job_handler('check_records')
+def _check_records(params, progress):
+    from blueprints.admin.routes.records import check_records_for_game
+    return check_records_for_game(params['game_id'], progress=progress)
+def _progress_reporter(job):
+    # Écrit l'avancement au plus toutes les PROGRESS_INTERVAL secondes (et toujours la dernière étape)
+    last_write = 0.0
+    def report(done, total=None, message=None):
+        nonlocal last_write
+        now = time.monotonic()
+        if now - last_write >= PROGRESS_INTERVAL or (total is not None and done >= total):
+            last_write = now
+            Job.update_progress(job['id'], done, total, message, attempt=job['attempts'])
+    return report
+def _heartbeat(job, stop):
+    # Heartbeat indépendant de l'avancement : un handler qui ne rapporte rien (ou une longue préparation)
+    # ne doit pas faire passer le travail pour abandonné et le faire reprendre par un autre worker
+    while not stop.wait(Config.JOB_HEARTBEAT_INTERVAL):
+        try:
+            Job.heartbeat(job['id'], job['attempts'])
+        except Exception as e:
+            print(f"✗ Could not record heartbeat for job #{job['id']}: {e}")
+def run_job(app, job):
+    handler = JOB_HANDLERS.get(job['kind'])
+    if handler is None:
+        Job.fail(job['id'], f"Unknown job kind: {job['kind']}", attempt=job['attempts'])
+        return False
+    started = time.monotonic()
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job, stop), name=f"job-{job['id']}-heartbeat", daemon=True)
+    heartbeat.start()
+    try:
+        # Contexte de requête : les traitements partagés avec les routes lisent current_user (auteur du travail)
+        with app.test_request_context():
+            user = User.get(job['created_by']) if job['created_by'] else None
+            if user:
+                login_user(user)
+            result = handler(job['params'] or {}, _progress_reporter(job))
+        Job.complete(job['id'], result, attempt=job['attempts'])
+        print(f"✓ Job #{job['id']} {job['kind']} done in {time.monotonic() - started:.1f}s")
+        return True
+    except Exception as e:
+        traceback.print_exc()
+        Job.fail(job['id'], str(e), attempt=job['attempts'])
+        print(f"✗ Job #{job['id']} {job['kind']} failed: {e}")
+        return False
+    finally:
+        stop.set()
+        heartbeat.join()
+def run_worker(app, once=False):
+    print(f"✓ Job worker started (pid {os.getpid()})")
+    while True:
+        try:
+            job = Job.claim_next()
+        except Exception as e:
+            print(f"✗ Job worker could not claim a job: {e}")
+            time.sleep(Config.JOB_POLL_INTERVAL)
+            continue
+        if job is None:
+            if once:
+                return
+            time.sleep(Config.JOB_POLL_INTERVAL)
+            continue
+        run_job(app, job)
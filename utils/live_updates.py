@@ -0,0 +1,151 @@
+import json
+import os
+import queue
+import threading
+import time
+from config import Config
+from database.db_manager import execute_one
+from database.invalidation import GAME, RESULTS, subscribe
+from database.models.result import Result
+# Diffusion SSE des résultats en direct. Les écritures admin publient RESULTS / GAME sur le bus d'invalidation ;
+# chaque worker calcule une seule fois le diff d'une épreuve (par rapport au dernier état envoyé) puis le pousse
+# à tous ses clients abonnés à cette épreuve et au flux global.
+GLOBAL = '*'
+LIVE_FIELDS = ('athlete_sdms', 'rank', 'value', 'wind_velocity', 'raza_score', 'final_order', 'attempts')
+_clients = {}
+_snapshots = {}
+_pending = set()
+_lock = threading.Condition()
+_worker = None
+_worker_pid = None
+def _client_count():
+    return sum(len(queues) for queues in _clients.values())
+def _display_value(value, event):
+    if value in Config.get_result_special_values():
+        return value
+    if event in Config.get_track_events():
+        return Config.format_time(value, True)
+    if event in Config.get_field_events():
+        return f"{Config.format_distance(value)} m"
+    return value
+def _load_rows(game_id):
+    return {row['id']: {field: row[field] for field in LIVE_FIELDS} for row in Result.get_live_rows(game_id)}
+def _results_diff(game_id):
+    game = execute_one("SELECT event FROM games WHERE id = %s", (game_id,))
+    rows = _load_rows(game_id) if game else {}
+    with _lock:
+        previous = _snapshots.get(game_id, {})
+        _snapshots[game_id] = rows
+    changed = []
+    for result_id, row in rows.items():
+        if previous.get(result_id) != row:
+            entry = dict(row, id=result_id, added=result_id not in previous)
+            entry['value_display'] = _display_value(row['value'], game['event'])
+            entry['value_special'] = row['value'] in Config.get_result_special_values()
+            if result_id in previous:
+                entry['rank_changed'] = previous[result_id]['rank'] != row['rank']
+                entry['attempts_changed'] = previous[result_id]['attempts'] != row['attempts']
+            changed.append(entry)
+    removed = [result_id for result_id in previous if result_id not in rows]
+    if not changed and not removed:
+        return None
+    return {'game_id': game_id, 'changed': changed, 'removed': removed}
+def _game_update(game_id):
+    game = execute_one(
+        "SELECT id, status, wind_velocity, published, official, corrected FROM games WHERE id = %s", (game_id,)
+    )
+    if game is None:
+        return {'game_id': game_id, 'deleted': True}
+    return {'game_id': game_id, 'status': game['status'], 'wind_velocity': game['wind_velocity'],
+            'published': game['published'], 'official': game['official'], 'corrected': game['corrected']}
+def _broadcast(game_id, kind, payload):
+    message = f"event: {kind}\ndata: {json.dumps(payload, default=str)}\n\n"
+    with _lock:
+        targets = list(_clients.get(game_id, ())) + list(_clients.get(GLOBAL, ()))
+    for client in targets:
+        try:
+            client.put_nowait(message)
+        except queue.Full:
+            # Client trop lent : on le déconnecte, EventSource se reconnectera sur un état frais
+            with client.mutex:
+                client.queue.clear()
+            client.put_nowait(None)
+def _run():
+    while True:
+        with _lock:
+            while not _pending:
+                _lock.wait()
+            kind, game_id = _pending.pop()
+        try:
+            if kind == RESULTS:
+                diff = _results_diff(game_id)
+                if diff:
+                    _broadcast(game_id, 'results', diff)
+            else:
+                _broadcast(game_id, 'game', _game_update(game_id))
+        except Exception as e:
+            print(f"✗ Live update error for {kind}/{game_id}: {e}")
+def _ensure_worker():
+    global _worker, _worker_pid
+    if _worker is not None and _worker_pid == os.getpid() and _worker.is_alive():
+        return
+    _worker = threading.Thread(target=_run, name='live-results', daemon=True)
+    _worker_pid = os.getpid()
+    _worker.start()
+def _on_event(event):
+    with _lock:
+        if not _client_count():
+            # Personne n'écoute : l'état de référence serait périmé au prochain abonnement
+            _snapshots.clear()
+            return
+        if event.key is None:
+            game_ids = [game_id for game_id in set(_clients) | set(_snapshots) if game_id != GLOBAL]
+        else:
+            try:
+                game_ids = [int(event.key)]
+            except (TypeError, ValueError):
+                return
+        for game_id in game_ids:
+            _pending.add((event.kind, game_id))
+        _lock.notify()
+subscribe(RESULTS, _on_event)
+subscribe(GAME, _on_event)
+def connect(game_id=GLOBAL):
+    with _lock:
+        if _client_count() >= Config.SSE_MAX_CLIENTS:
+            return None
+        _ensure_worker()
+        client = queue.Queue(maxsize=Config.SSE_QUEUE_SIZE)
+        _clients.setdefault(game_id, set()).add(client)
+        needs_baseline = game_id != GLOBAL and game_id not in _snapshots
+    if needs_baseline:
+        rows = _load_rows(game_id)
+        with _lock:
+            _snapshots.setdefault(game_id, rows)
+    return client
+def disconnect(client, game_id=GLOBAL):
+    with _lock:
+        clients = _clients.get(game_id)
+        if clients is not None:
+            clients.discard(client)
+            if not clients:
+                del _clients[game_id]
+def stream(client, game_id=GLOBAL):
+    started = time.monotonic()
+    try:
+        yield f"retry: {Config.SSE_RETRY_MS}\n\n"
+        while time.monotonic() - started < Config.SSE_STREAM_MAX_SECONDS:
+            try:
+                message = client.get(timeout=Config.SSE_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            if message is None:
+                break
+            yield message
+    finally:
+        disconnect(client, game_id)
+def get_live_stats():
+    with _lock:
+        return {'clients': _client_count(), 'games': len([key for key in _clients if key != GLOBAL]),
+                'pending': len(_pending)}
@@ -0,0 +1,203 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PyPDF2 import PdfMerger
+from config import Config
+from database.config_manager import get_config_snapshot, pin_config_snapshot
+from database.db_manager import transaction
+from database.models import Game, HeatGroup, Result, StartList
+from utils.helpers import write_atomic
+# Génération des PDF en masse : le process parent lit les données de toutes les épreuves en quelques requêtes,
+# puis le rendu ReportLab (CPU) est réparti sur un ProcessPoolExecutor. Les workers n'ouvrent aucune connexion :
+# ils reçoivent le snapshot de configuration du parent et écrivent chaque fichier de manière atomique.
+# Chaque PDF est identifié par l'empreinte de ses données d'entrée (stockée dans games.generated_*_pdf_hash et
+# reprise dans le nom du fichier) : une épreuve dont les données n'ont pas changé n'est pas re-rendue.
+PDF_TYPES = ('startlists', 'results')
+PDF_DIRS = {
+    'startlists': os.path.join('static', 'generated_pdfs', 'startlists'),
+    'results': os.path.join('static', 'generated_pdfs', 'results'),
+}
+MANUAL_PDF_DIRS = {
+    'startlists': os.path.join('static', 'manual_pdfs', 'startlists'),
+    'results': os.path.join('static', 'manual_pdfs', 'results'),
+}
+MERGED_PDF_DIR = os.path.join('static', 'merged_pdfs')
+# À incrémenter quand la mise en page de pdf_generator change, pour invalider tous les PDF déjà générés
+PDF_RENDER_VERSION = 1
+# Seules les colonnes lues par pdf_generator entrent dans l'empreinte (pas updated_at ni les colonnes generated_*)
+PDF_GAME_FIELDS = ('id', 'event', 'genders', 'classes', 'phase', 'day', 'time', 'heat_group_id', 'heat_number',
+                   'wind_velocity', 'wpa_points', 'official', 'official_date', 'corrected', 'corrected_date')
+_generator = None
+def _pdf_column(kind):
+    return 'startlist' if kind == 'startlists' else 'results'
+def pdf_filename(kind, game, input_hash):
+    return f"{_pdf_column(kind)}_game_{game['id']}_{game['event'].replace(' ', '_')}_{input_hash[:12]}.pdf"
+def _game_fields(game):
+    return {field: game.get(field) for field in PDF_GAME_FIELDS}
+# Couvre tout ce que _render_task transmet au générateur : épreuve, start list ou résultats, données des heats
+def pdf_input_hash(task, config_tags):
+    data = {'version': PDF_RENDER_VERSION, 'config': config_tags, 'kind': task['kind'],
+            'game': _game_fields(task['game'])}
+    if task['kind'] == 'startlists':
+        data['startlist'] = task['startlist']
+    else:
+        data['results'] = task['results']
+        heat_data = task['heat_data']
+        if heat_data:
+            data['heat'] = dict(heat_data, games=[_game_fields(heat_game) for heat_game in heat_data['games']])
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+def _finish_task(task, config_tags):
+    task['hash'] = pdf_input_hash(task, config_tags)
+    task['filename'] = pdf_filename(task['kind'], task['game'], task['hash'])
+    return task
+def is_current(task):
+    # Le PDF en place a été rendu à partir des mêmes données et le fichier est toujours sur le disque
+    column = _pdf_column(task['kind'])
+    game = task['game']
+    return (game.get(f'generated_{column}_pdf') == task['filename']
+            and game.get(f'generated_{column}_pdf_hash') == task['hash']
+            and os.path.exists(os.path.join(PDF_DIRS[task['kind']], task['filename'])))
+def _init_worker(config_snapshot):
+    global _generator
+    pin_config_snapshot(config_snapshot)
+    from utils.pdf_generator import PDFGenerator
+    # Un seul PDFGenerator (feuilles de styles) par worker, réutilisé pour toutes ses épreuves
+    _generator = PDFGenerator()
+def _render_task(generator, task):
+    game = task['game']
+    if task['kind'] == 'startlists':
+        buffer = generator.generate_startlist_pdf(game, task['startlist'])
+    else:
+        buffer = generator.generate_results_pdf(game, task['results'], heat_data=task['heat_data'])
+    write_atomic(os.path.join(PDF_DIRS[task['kind']], task['filename']), buffer.getvalue())
+    return task
+def _render(task):
+    return _render_task(_generator, task)
+def _load_heat_data(games):
+    heat_group_ids = {game['heat_group_id'] for game in games if game.get('heat_group_id')}
+    if not heat_group_ids:
+        return {}
+    games_by_group = HeatGroup.get_games_by_groups(heat_group_ids)
+    results_by_game = Result.get_all_by_games(
+        [heat_game['id'] for heat_games in games_by_group.values() for heat_game in heat_games]
+    )
+    return {
+        heat_group_id: {
+            'games': heat_games,
+            'results': {heat_game['id']: results_by_game.get(heat_game['id'], []) for heat_game in heat_games},
+            'combined_results': HeatGroup.get_combined_results(heat_group_id),
+        }
+        for heat_group_id, heat_games in games_by_group.items()
+    }
+def build_tasks(games, pdf_type='both'):
+    game_ids = [game['id'] for game in games]
+    config_tags = get_config_snapshot()['tags']
+    tasks = []
+    if pdf_type in ('startlists', 'both'):
+        startlists = StartList.get_by_games(game_ids)
+        for game in games:
+            if startlists.get(game['id']):
+                tasks.append(_finish_task({'kind': 'startlists', 'game': game, 'startlist': startlists[game['id']]},
+                                          config_tags))
+    if pdf_type in ('results', 'both'):
+        results_by_game = Result.get_all_by_games(game_ids)
+        games_with_results = [game for game in games if results_by_game.get(game['id'])]
+        heat_data = _load_heat_data(games_with_results)
+        for game in games_with_results:
+            tasks.append(_finish_task({'kind': 'results', 'game': game, 'results': results_by_game[game['id']],
+                                       'heat_data': heat_data.get(game.get('heat_group_id'))}, config_tags))
+    return tasks
+def _save_generated(generated):
+    with transaction():
+        for task in generated:
+            if task['kind'] == 'startlists':
+                Game.update_generated_pdfs(task['game']['id'], startlist_pdf=task['filename'],
+                                           startlist_hash=task['hash'])
+            else:
+                Game.update_generated_pdfs(task['game']['id'], results_pdf=task['filename'],
+                                           results_hash=task['hash'])
+    # L'ancien fichier (autre empreinte) n'est plus référencé une fois la transaction validée
+    for task in generated:
+        previous = task['game'].get(f"generated_{_pdf_column(task['kind'])}_pdf")
+        if previous and previous != task['filename']:
+            try:
+                os.remove(os.path.join(PDF_DIRS[task['kind']], previous))
+            except FileNotFoundError:
+                pass
+def render_game_pdf(kind, game):
+    # Une épreuve, rendue dans le process courant (routes admin). La tâche est construite par build_tasks, avec les
+    # mêmes requêtes que la génération en masse : l'empreinte est identique quel que soit le point d'entrée.
+    # Renvoie le chemin du PDF à jour, ou None si l'épreuve n'a pas de start list / de résultats.
+    tasks = build_tasks([game], kind)
+    if not tasks:
+        return None
+    task = tasks[0]
+    if not is_current(task):
+        from utils.pdf_generator import PDFGenerator
+        _save_generated([_render_task(PDFGenerator(), task)])
+    return os.path.join(PDF_DIRS[kind], task['filename'])
+def generate_pdfs(games=None, pdf_type='both', workers=None, on_progress=None):
+    # on_progress(done, total) est appelé dans le process parent après chaque PDF terminé (ou en échec)
+    if games is None:
+        games = Game.get_games_for_bulk_generation()
+    tasks = build_tasks(games, pdf_type)
+    stale = [task for task in tasks if not is_current(task)]
+    stats = {'total': len(tasks), 'generated': 0, 'failed': 0, 'unchanged': len(tasks) - len(stale)}
+    tasks = stale
+    if on_progress:
+        on_progress(stats['unchanged'], stats['total'])
+    if not tasks:
+        return stats
+    generated = []
+    # Pas de fork direct : le worker web a des threads (listener, SSE) dont les verrous seraient copiés
+    context = multiprocessing.get_context(Config.PDF_WORKER_START_METHOD)
+    with ProcessPoolExecutor(max_workers=min(workers or Config.PDF_WORKERS, len(tasks)), mp_context=context,
+                             initializer=_init_worker, initargs=(get_config_snapshot(),)) as executor:
+        futures = {executor.submit(_render, task): task for task in tasks}
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                generated.append(future.result())
+                stats['generated'] += 1
+            except Exception as e:
+                print(f"✗ Error generating {task['kind']} PDF for game {task['game']['id']}: {e}")
+                stats['failed'] += 1
+            if on_progress:
+                on_progress(stats['unchanged'] + stats['generated'] + stats['failed'], stats['total'])
+    _save_generated(generated)
+    return stats
+def merged_pdf_path(pdf_type):
+    return os.path.join(MERGED_PDF_DIR, f"all_{pdf_type}_tunis_gp_2025.pdf")
+def merge_pdfs(pdf_type, on_progress=None):
+    # Un seul PDF par type : le PDF manuel d'une épreuve l'emporte sur le PDF généré
+    column = 'startlist' if pdf_type == 'startlists' else 'results'
+    pdf_files = []
+    for game in Game.get_games_with_pdfs():
+        if game.get(f'manual_{column}_pdf'):
+            filepath = os.path.join(MANUAL_PDF_DIRS[pdf_type], game[f'manual_{column}_pdf'])
+        elif game.get(f'generated_{column}_pdf'):
+            filepath = os.path.join(PDF_DIRS[pdf_type], game[f'generated_{column}_pdf'])
+        else:
+            continue
+        if os.path.exists(filepath):
+            pdf_files.append(filepath)
+    if not pdf_files:
+        raise ValueError(f'No {pdf_type} PDFs found')
+    pdf_files.sort()
+    merger = PdfMerger()
+    try:
+        for done, pdf_file in enumerate(pdf_files, 1):
+            merger.append(pdf_file)
+            if on_progress:
+                on_progress(done, len(pdf_files))
+        buffer = io.BytesIO()
+        merger.write(buffer)
+    finally:
+        merger.close()
+    filepath = merged_pdf_path(pdf_type)
+    write_atomic(filepath, buffer.getvalue())
+    return {'filename': os.path.basename(filepath), 'count': len(pdf_files)}
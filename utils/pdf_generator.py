@@ -231,8 +231,25 @@ class PDFGenerator:
 
         return " | ".join(status_parts) if status_parts else ""
 
+    @staticmethod
+    def load_heat_data(heat_group_id):
+        from database.models.heat_group import HeatGroup
+        from database.models.result import Result
+
+        heat_games = sorted(
+            HeatGroup.get_games(heat_group_id), key=lambda x: x.get("heat_number") or 0
+        )
+        return {
+            "games": heat_games,
+            "results": {
+                heat_game["id"]: Result.get_all(game_id=heat_game["id"])
+                for heat_game in heat_games
+            },
+            "combined_results": HeatGroup.get_combined_results(heat_group_id),
+        }
+
     def generate_results_pdf(
-        self, game, results, heat_group=None, combined_results=None
+        self, game, results, heat_group=None, combined_results=None, heat_data=None
     ):
         buffer = io.BytesIO()
 
@@ -278,20 +295,12 @@ class PDFGenerator:
         # Déterminer le statut global pour les heats ou utiliser le statut du jeu individuel
         game_heat_group_id = game.get("heat_group_id")
         if game_heat_group_id or heat_group:
-            from database.models.heat_group import HeatGroup
-            from database.models.result import Result
-            from database.models.game import Game as GameModel
-
-            heat_group_id = (
-                heat_group["id"] if heat_group else game_heat_group_id
-            )
-            all_heat_games = HeatGroup.get_games(heat_group_id)
-
-            # Enrichir les données des heat games avec les statuts
-            enriched_heat_games = []
-            for heat_game in all_heat_games:
-                enriched_game = GameModel.get_by_id(heat_game["id"])
-                enriched_heat_games.append(enriched_game)
+            # Données des heats : préchargées par la génération en masse, sinon lues ici
+            if heat_data is None:
+                heat_data = self.load_heat_data(
+                    heat_group["id"] if heat_group else game_heat_group_id
+                )
+            enriched_heat_games = heat_data["games"]
 
             # Déterminer le statut global
             all_official = all(
@@ -346,18 +355,7 @@ class PDFGenerator:
 
         # Gestion des heats ou jeu individuel
         if game_heat_group_id or heat_group:
-            from database.models.heat_group import HeatGroup
-            from database.models.result import Result
-
-            heat_group_id = (
-                heat_group["id"] if heat_group else game_heat_group_id
-            )
-            all_heat_games = HeatGroup.get_games(heat_group_id)
-            all_heat_games = sorted(
-                all_heat_games, key=lambda x: x.get("heat_number", 0)
-            )
-
-            for heat_game in all_heat_games:
+            for heat_game in heat_data["games"]:
                 story.append(
                     Paragraph(
                         f"Heat {heat_game.get('heat_number', '?')} Results",
@@ -375,7 +373,7 @@ class PDFGenerator:
                     story.append(Paragraph(wind_text, self.styles["PDFVenue"]))
                     story.append(Spacer(1, 3 * mm))
 
-                heat_results = Result.get_all(game_id=heat_game["id"])
+                heat_results = heat_data["results"].get(heat_game["id"])
 
                 if heat_results:
                     if heat_game["event"] == "High Jump":
@@ -417,9 +415,7 @@ class PDFGenerator:
                 )
                 story.append(Spacer(1, 5 * mm))
 
-                auto_combined_results = HeatGroup.get_combined_results(
-                    heat_group_id
-                )
+                auto_combined_results = heat_data["combined_results"]
                 if auto_combined_results:
                     combined_table = self.create_combined_results_table(
                         auto_combined_results, game
@@ -0,0 +1,296 @@
+import hashlib
+import json
+import math
+import os
+import threading
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_DOWN, ROUND_UP
+import numpy as np
+import pandas as pd
+from config import Config
+# Moteur RAZA sans dépendance Flask : utilisable depuis les routes, les workers, les CLI et les process pools.
+
+
+class RazaError(Exception):
+    pass
+
+
+class RazaTableNotFound(RazaError):
+    pass
+
+
+class RazaCombinationNotFound(RazaError):
+    pass
+
+
+class RazaCoefficientError(RazaError):
+    pass
+
+
+class RazaValueError(RazaError):
+    pass
+
+
+@dataclass(frozen=True)
+class RazaScore:
+    raza_score: int
+    raza_score_precise: float
+
+
+@dataclass(frozen=True)
+class RazaPerformance:
+    performance: float
+
+
+@dataclass(frozen=True)
+class RazaCoefficients:
+    a: float
+    b: float
+    c: float
+    is_track: bool
+
+
+# Table RAZA du process : lue une fois, relue seulement si le fichier xlsx change
+_raza_table = None
+_raza_table_lock = threading.Lock()
+
+
+def _load_raza_table(path, mtime):
+    df = pd.read_excel(path)
+    rows = df.to_dict('records')
+    for row in rows:
+        for key, value in row.items():
+            if pd.isna(value):
+                row[key] = None
+            elif isinstance(value, np.integer):
+                row[key] = int(value)
+            elif isinstance(value, np.floating):
+                row[key] = float(value)
+    coefficients = {}
+    for row in rows:
+        # Première ligne prioritaire, comme l'ancien df[mask].iloc[0]
+        coefficients.setdefault((row.get("Gender"), row.get("Event"), row.get("Class")), row)
+    print(f"✓ RAZA table loaded: {len(rows)} rows from {path}")
+    return {'path': path, 'mtime': mtime, 'rows': rows, 'coefficients': coefficients}
+
+
+def get_raza_table():
+    global _raza_table
+    path = Config.RAZA_TABLE_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    table = _raza_table
+    if table is not None and table['path'] == path and table['mtime'] == mtime:
+        return table
+    with _raza_table_lock:
+        table = _raza_table
+        if table is None or table['path'] != path or table['mtime'] != mtime:
+            table = _load_raza_table(path, mtime)
+            _raza_table = table
+    return table
+
+
+def get_raza_rows():
+    table = get_raza_table()
+    return table['rows'] if table else []
+
+
+def gender_mapping(gender):
+    gender_map = {
+        'Male': 'Men',
+        'Female': 'Women',
+        'M': 'Men',
+        'F': 'Women',
+        'Men': 'Men',
+        'Women': 'Women'
+    }
+    return gender_map.get(gender, gender)
+
+
+def round_down(n, decimales):
+    try:
+        return float(
+            Decimal(str(n)).quantize(
+                Decimal('0.' + '0' * decimales),
+                rounding=ROUND_DOWN
+            )
+        )
+    except:
+        return float(n)
+
+
+def round_up(n, decimales):
+    try:
+        return float(
+            Decimal(str(n)).quantize(
+                Decimal('0.' + '0' * decimales),
+                rounding=ROUND_UP
+            )
+        )
+    except:
+        return float(n)
+
+
+def has_combination(gender, event, athlete_class):
+    table = get_raza_table()
+    if table is None:
+        raise RazaTableNotFound("RAZA table not found")
+    return (gender_mapping(gender), event, athlete_class) in table['coefficients']
+
+
+def get_coefficients(gender, event, athlete_class):
+    gender = gender_mapping(gender)
+    table = get_raza_table()
+    if table is None:
+        raise RazaTableNotFound("RAZA table not found")
+    raza_row = table['coefficients'].get((gender, event, athlete_class))
+    if raza_row is None:
+        raise RazaCombinationNotFound(f"No RAZA data found for {gender} {event} {athlete_class}")
+    for col in ('a', 'b', 'c'):
+        if raza_row.get(col) is None:
+            raise RazaCoefficientError(f"Missing or invalid RAZA coefficient '{col}'")
+    return RazaCoefficients(
+        a=float(raza_row['a']),
+        b=float(raza_row['b']),
+        c=float(raza_row['c']),
+        is_track=event in Config.get_track_events()
+    )
+
+
+def score(gender, event, athlete_class, performance):
+    coefficients = get_coefficients(gender, event, athlete_class)
+    if performance <= 0:
+        raise RazaValueError("Performance must be positive")
+    a, b, c = coefficients.a, coefficients.b, coefficients.c
+    try:
+        if coefficients.is_track:
+            exponent = -math.exp(b - (c / performance))
+        else:
+            exponent = -math.exp(b - c * performance)
+        score_float = a * math.exp(exponent)
+        score_rounded = int(round_down(score_float, decimales=0))
+    except (OverflowError, ValueError) as e:
+        raise RazaValueError(f"Mathematical calculation error: {str(e)}")
+    if score_rounded < 0 or score_rounded > 2000:
+        raise RazaValueError("Calculated score out of valid range")
+    return RazaScore(raza_score=score_rounded, raza_score_precise=round(score_float, 3))
+
+
+def performance_for_score(gender, event, athlete_class, raza_score):
+    coefficients = get_coefficients(gender, event, athlete_class)
+    a, b, c = coefficients.a, coefficients.b, coefficients.c
+    if raza_score <= 0 or raza_score >= a:
+        raise RazaValueError(f"RAZA score must be between 0 and {int(a)}")
+    try:
+        ratio = a / raza_score
+        if ratio <= 1:
+            raise RazaValueError("Invalid RAZA score for calculation")
+        ln_ratio = math.log(ratio)
+        if ln_ratio <= 0:
+            raise RazaValueError("Invalid RAZA score for calculation")
+        ln_ln_ratio = math.log(ln_ratio)
+        if coefficients.is_track:
+            performance = c / (b - ln_ln_ratio)
+        else:
+            performance = (b - ln_ln_ratio) / c
+        performance_rounded = round_up(performance, decimales=2)
+    except (ValueError, ZeroDivisionError, OverflowError) as e:
+        raise RazaValueError(f"Mathematical error in calculation: {str(e)}")
+    if performance_rounded <= 0:
+        raise RazaValueError("Calculated performance is invalid")
+    return RazaPerformance(performance=performance_rounded)
+
+
+def _batch_coefficients(genders, events, classes):
+    table = get_raza_table()
+    coefficients = table['coefficients'] if table else {}
+    track_events = set(Config.get_track_events())
+    size = len(events)
+    a = np.full(size, np.nan)
+    b = np.full(size, np.nan)
+    c = np.full(size, np.nan)
+    is_track = np.zeros(size, dtype=bool)
+    for i, (gender, event, athlete_class) in enumerate(zip(genders, events, classes)):
+        row = coefficients.get((gender_mapping(gender), event, athlete_class))
+        if row and all(row.get(col) is not None for col in ('a', 'b', 'c')):
+            a[i], b[i], c[i] = float(row['a']), float(row['b']), float(row['c'])
+        is_track[i] = event in track_events
+    return a, b, c, is_track
+
+
+# Scores RAZA vectorisés : (scores arrondis int64, scores précis float64, masque de validité).
+# Les entrées invalides (combinaison inconnue, performance <= 0, score hors 0-2000) valent 0.
+def score_batch(genders, events, classes, performances):
+    a, b, c, is_track = _batch_coefficients(genders, events, classes)
+    performance = np.asarray(performances, dtype=float)
+    with np.errstate(all='ignore'):
+        exponent = np.where(is_track, b - c / performance, b - c * performance)
+        scores = a * np.exp(-np.exp(exponent))
+        rounded = np.trunc(scores)
+    valid = np.isfinite(scores) & (performance > 0) & (rounded >= 0) & (rounded <= 2000)
+    return np.where(valid, rounded, 0).astype(np.int64), np.where(valid, np.round(scores, 3), 0.0), valid
+
+
+# Inverse vectorisé : (performances arrondies au centième supérieur, masque de validité)
+def performance_batch(genders, events, classes, raza_scores):
+    a, b, c, is_track = _batch_coefficients(genders, events, classes)
+    return _performances_for_scores(a, b, c, is_track, raza_scores)
+
+
+def _performances_for_scores(a, b, c, is_track, raza_scores):
+    raza_score = np.asarray(raza_scores, dtype=float)
+    with np.errstate(all='ignore'):
+        ln_ln_ratio = np.log(np.log(a / raza_score))
+        performance = np.where(is_track, c / (b - ln_ln_ratio), (b - ln_ln_ratio) / c)
+        # Arrondi au centième supérieur comme round_up ; le round(9) absorbe le bruit flottant de * 100
+        rounded = np.ceil(np.round(performance * 100, 9)) / 100
+    valid = (raza_score > 0) & (raza_score < a) & np.isfinite(rounded) & (rounded > 0)
+    return np.where(valid, rounded, 0.0), valid
+
+
+# Artefact compilé pour le calculateur public : coefficients + grille inverse score -> performance
+# (performances pour les scores grid_step, 2 * grid_step, ... < a ; null si invalide), versionné par hash du contenu.
+RAZA_GRID_STEP = 10
+_raza_artifact = None
+_raza_artifact_lock = threading.Lock()
+
+
+def _build_raza_artifact(table, track_events):
+    entries = []
+    for (gender, event, athlete_class), row in sorted(table['coefficients'].items(), key=lambda item: tuple(map(str, item[0]))):
+        if any(row.get(col) is None for col in ('a', 'b', 'c')):
+            continue
+        a, b, c = float(row['a']), float(row['b']), float(row['c'])
+        is_track = event in track_events
+        scores = np.arange(RAZA_GRID_STEP, math.ceil(a), RAZA_GRID_STEP, dtype=float)
+        performances, valid = _performances_for_scores(a, b, c, is_track, scores)
+        grid = [float(performance) if ok else None for performance, ok in zip(performances, valid)]
+        entries.append([gender, event, athlete_class, a, b, c, is_track, grid])
+    content = {
+        'grid_step': RAZA_GRID_STEP,
+        'fields': ['gender', 'event', 'class', 'a', 'b', 'c', 'is_track', 'grid'],
+        'entries': entries
+    }
+    version = hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    body = json.dumps(dict(content, version=version), separators=(',', ':')).encode('utf-8')
+    print(f"✓ RAZA artifact compiled: {len(entries)} combinations, {len(body)} bytes, version {version}")
+    return {'table': table, 'track_events': track_events, 'version': version, 'body': body}
+
+
+def get_raza_artifact():
+    global _raza_artifact
+    table = get_raza_table()
+    if table is None:
+        return None
+    track_events = frozenset(Config.get_track_events())
+    artifact = _raza_artifact
+    if artifact is not None and artifact['table'] is table and artifact['track_events'] == track_events:
+        return artifact
+    with _raza_artifact_lock:
+        artifact = _raza_artifact
+        if artifact is None or artifact['table'] is not table or artifact['track_events'] != track_events:
+            artifact = _build_raza_artifact(table, track_events)
+            _raza_artifact = artifact
+    return artifact
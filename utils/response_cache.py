@@ -0,0 +1,81 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from flask import current_app, make_response, request, session
+from config import Config
+from database.invalidation import get_data_version
+from utils.static_export import is_static_export
+# Cache de pages publiques par process : clé = URL, valide tant que data_version et la tranche de RESPONSE_CACHE_TTL
+# secondes n'ont pas changé (la tranche borne la fraîcheur des statuts calculés à partir de l'heure).
+_entries = OrderedDict()
+_entries_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'not_modified': 0}
+def _current_token():
+    return f"{get_data_version()}.{int(time.time() // Config.RESPONSE_CACHE_TTL)}"
+def _lookup(key, token):
+    with _entries_lock:
+        entry = _entries.get(key)
+        if entry is None or entry['token'] != token:
+            return None
+        _entries.move_to_end(key)
+        return entry
+def _store(key, entry):
+    with _entries_lock:
+        _entries[key] = entry
+        _entries.move_to_end(key)
+        while len(_entries) > Config.RESPONSE_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+def _render(view, args, kwargs, key, token):
+    response = make_response(view(*args, **kwargs))
+    if response.status_code != 200 or response.direct_passthrough or response.mimetype != 'text/html':
+        return response, None
+    body = response.get_data()
+    entry = {
+        'token': token,
+        'body': body,
+        'content_type': response.headers.get('Content-Type'),
+        'etag': hashlib.sha1(body).hexdigest()[:20],
+        'last_modified': datetime.now(timezone.utc).replace(microsecond=0),
+    }
+    _store(key, entry)
+    return response, entry
+def cached_page(view):
+    @wraps(view)
+    def decorated_function(*args, **kwargs):
+        # Les pages de l'export statique diffèrent des pages servies (sans pagination ni flux SSE)
+        if request.method != 'GET' or is_static_export():
+            return view(*args, **kwargs)
+        # Les messages flash sont rendus dans base.html : une page qui en contient ne doit pas être partagée.
+        # La session n'est lue que si le cookie existe, sinon Flask ajouterait Vary: Cookie à toutes les réponses.
+        if current_app.config['SESSION_COOKIE_NAME'] in request.cookies and '_flashes' in session:
+            return view(*args, **kwargs)
+        key = request.full_path
+        token = _current_token()
+        entry = _lookup(key, token)
+        if entry is not None:
+            _stats['hits'] += 1
+            response = make_response(entry['body'])
+            response.headers['Content-Type'] = entry['content_type']
+        else:
+            _stats['misses'] += 1
+            response, entry = _render(view, args, kwargs, key, token)
+            if entry is None:
+                return response
+        response.set_etag(entry['etag'])
+        response.last_modified = entry['last_modified']
+        response.headers['Cache-Control'] = f"public, max-age={Config.RESPONSE_CACHE_MAX_AGE}"
+        response = response.make_conditional(request)
+        if response.status_code == 304:
+            _stats['not_modified'] += 1
+        return response
+    return decorated_function
+def clear_response_cache():
+    with _entries_lock:
+        _entries.clear()
+def get_response_cache_stats():
+    with _entries_lock:
+        entries = len(_entries)
+    return dict(_stats, entries=entries)
@@ -0,0 +1,81 @@
+import json
+import os
+from flask import has_request_context, request
+from config import Config
+from database.db_manager import execute_one
+from database.invalidation import get_data_version
+from database.models import Athlete, Game
+from utils.helpers import write_atomic
+# Export statique du site public : chaque page est rendue par sa vue Flask (templates/public/*) via le client de test
+# et écrite sous <output>/<chemin>/index.html. Un manifeste garde l'empreinte de chaque page pour ne re-rendre
+# que les épreuves et athlètes modifiés ; les pages de liste sont re-rendues dès que data_version a bougé.
+# Un hébergement statique ne sert ni les URL à query string (?after=) ni le flux SSE : les requêtes de l'export
+# portent STATIC_EXPORT_ENVIRON, les listes sont alors rendues sans pagination et les pages sans mise à jour en direct.
+MANIFEST_NAME = '.export-manifest.json'
+STATIC_EXPORT_ENVIRON = 'tunisgp.static_export'
+LISTING_PAGES = ['/', '/schedule', '/results', '/startlists', '/medals', '/records', '/athletes']
+def is_static_export():
+    return has_request_context() and bool(request.environ.get(STATIC_EXPORT_ENVIRON))
+def _shared_fingerprint():
+    # Données affichées par toutes les pages de détail : configuration, records, PB, NPC et régions
+    row = execute_one("""
+        SELECT md5(
+            COALESCE((SELECT version::text FROM config_version WHERE id = 1), '')
+            || COALESCE((SELECT string_agg(row(wr.*)::text, ',' ORDER BY wr.id) FROM world_records wr), '')
+            || COALESCE((SELECT string_agg(row(pb.*)::text, ',' ORDER BY pb.id) FROM personal_bests pb), '')
+            || COALESCE((SELECT string_agg(row(n.*)::text, ',' ORDER BY n.code) FROM npcs n), '')
+            || COALESCE((SELECT string_agg(row(r.*)::text, ',' ORDER BY r.code) FROM regions r), '')
+        ) AS fingerprint
+    """)
+    return row['fingerprint'] if row else ''
+def _page_file(output_dir, path):
+    return os.path.join(output_dir, path.strip('/'), 'index.html')
+def _load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+def export_static_site(app, output_dir=None, full=False):
+    output_dir = output_dir or Config.STATIC_EXPORT_DIR
+    manifest = {} if full else _load_manifest(output_dir)
+    previous_pages = manifest.get('pages', {})
+    data_version = get_data_version()
+    shared = _shared_fingerprint()
+    listing_fingerprint = f"{shared}:data-{data_version}"
+    pages = {path: listing_fingerprint for path in LISTING_PAGES}
+    for day in Game.get_facets()['days']:
+        pages[f"/schedule/day/{day}"] = listing_fingerprint
+    for game_id, fingerprint in Game.get_export_fingerprints().items():
+        pages[f"/game/{game_id}"] = f"{shared}:{fingerprint}"
+        pages[f"/game/{game_id}/startlist"] = f"{shared}:{fingerprint}"
+    for sdms, fingerprint in Athlete.get_export_fingerprints().items():
+        pages[f"/athlete/{sdms}"] = f"{shared}:{fingerprint}"
+    stats = {'rendered': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+    exported = {}
+    client = app.test_client()
+    for path, fingerprint in pages.items():
+        filepath = _page_file(output_dir, path)
+        if previous_pages.get(path) == fingerprint and os.path.exists(filepath):
+            exported[path] = fingerprint
+            stats['unchanged'] += 1
+            continue
+        response = client.get(path, environ_overrides={STATIC_EXPORT_ENVIRON: True})
+        if response.status_code != 200:
+            print(f"✗ {path}: HTTP {response.status_code}")
+            stats['failed'] += 1
+            continue
+        write_atomic(filepath, response.get_data())
+        exported[path] = fingerprint
+        stats['rendered'] += 1
+    # Pages d'épreuves ou d'athlètes supprimés depuis le dernier export
+    for path in set(previous_pages) - set(pages):
+        filepath = _page_file(output_dir, path)
+        if os.path.exists(filepath):
+            os.remove(filepath)
+            stats['removed'] += 1
+    write_atomic(os.path.join(output_dir, MANIFEST_NAME), json.dumps({
+        'data_version': data_version,
+        'pages': exported
+    }, indent=1, sort_keys=True).encode('utf-8'))
+    return stats